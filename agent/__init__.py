@@ -8,20 +8,48 @@
 """Initialize package."""
 
 
+import importlib
 import os
 import sys
 
 from loguru import logger
 
-# Expose submodule functions on top level
-from .agent import (  # noqa
-    FAILURE,
-    SUCCESS,
-    correct_n3_syntax,
-    identify_http_requests,
-    request_from_graph,
-    solve_api_composition_problem,
-)
+# Expose submodule functions on top level; they are imported on first access only
+# such that importing the package (e.g. for `invoke --list`) doesn't have to load
+# rdflib, requests and their plugins
+EXPORTS = {
+    "FAILURE": "agent",
+    "SUCCESS": "agent",
+    "correct_n3_syntax": "agent",
+    "identify_http_requests": "agent",
+    "request_from_graph": "agent",
+    "resume_api_composition_problem": "agent",
+    "solve_api_composition_problem": "agent",
+}
+
+__all__ = ["logger"] + list(EXPORTS)
+
+
+def __getattr__(name):
+    if name in EXPORTS:
+        value = getattr(importlib.import_module(f".{EXPORTS[name]}", __name__), name)
+    else:
+        try:
+            value = importlib.import_module(f".{name}", __name__)
+        except ModuleNotFoundError as e:
+            if e.name != f"{__name__}.{name}":
+                raise
+            raise AttributeError(
+                f"module '{__name__}' has no attribute '{name}'"
+            ) from None
+
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(EXPORTS))
+
 
 # Configure logging
 log_level = os.getenv("AGENT_LOG_LEVEL", "INFO")
@@ -33,4 +61,11 @@ logger.level(
 logger.level(
     "USER", no=25, color="<magenta><b>"
 )  # separate level for (fake) user input
-logger.add(sys.stdout, level=log_level, diagnose=True, backtrace=False)
+log_enqueue = os.getenv("AGENT_LOG_ENQUEUE", "0") not in ["0", "false", "no"]
+logger.add(
+    sys.stdout,
+    level=log_level,
+    diagnose=True,
+    backtrace=False,
+    enqueue=log_enqueue,  # write from a separate thread instead of the caller's
+)
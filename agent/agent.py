@@ -8,39 +8,50 @@
 """Software agent for hypermedia API composition and execution."""
 
 
+import mimetypes
 import os
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from urllib.parse import urlparse
 
 import rdflib
 import requests
 from invoke import task
 from loguru import logger
-from rdflib.namespace import OWL, RDF, NamespaceManager
+from rdflib.namespace import DCTERMS, RDF
+from rdflib.util import guess_format
 
 from . import logger
+from .cache import get_proof_cache
+from .catalog import get_rule_catalog
+from .client import get_http_client
+from .cost import get_cost_model, get_selection_strategy, request_origin
+from .knowledge import KnowledgeBase
+from .namespaces import HTTP, NAMESPACE_MANAGER, REASON, SHACL
+from .plans import (
+    get_plan_store,
+    graph_bindings,
+    instantiate,
+    is_stated_in_rule,
+    make_template,
+    plan_signature,
+    plan_step,
+    step_sources,
+)
+from .profiling import get_profiler
+from .proof import ProofIndex, ProofReader, ProofWriter
+from .queries import query
+from .reasoner import ReasonerResult, compile_rule_set, get_backend
+from .rules import prune_rules
+from .state import DONE, POST_PROOF, PRE_PROOF, REPLAY, SELECT, PPAState
+from .tracing import get_tracer
 
 # Global constants/magic variables
 SUCCESS = 0  # implies successful completion of an algorithm
 FAILURE = 1  # implies that an algorithm failed to find a solution (_not_ an error!)
 
-# Use namespace manager to enforce consistent prefixes
-# https://rdflib.readthedocs.io/en/latest/namespaces_and_bindings.html
-# --""--/apidocs/rdflib.html#rdflib.namespace.NamespaceManager
-HTTP = rdflib.Namespace("http://www.w3.org/2011/http#")
-REASON = rdflib.Namespace("http://www.w3.org/2000/10/swap/reason#")
-SHACL = rdflib.Namespace("http://www.w3.org/ns/shacl#")
-
-NAMESPACE_MANAGER = NamespaceManager(rdflib.Graph())
-
-# FIXME read prefixes/namespaces from files instead of hardcoding?
-NAMESPACE_MANAGER.bind("rdf", RDF)
-NAMESPACE_MANAGER.bind("owl", OWL)
-
-NAMESPACE_MANAGER.bind("http", HTTP)
-NAMESPACE_MANAGER.bind("r", REASON)
-NAMESPACE_MANAGER.bind("sh", SHACL)
-
 # Compare https://rdflib.readthedocs.io/en/stable/plugin_parsers.html (both incomplete!)
 RDFLIB_SERIALIZATIONS = [
     "application/ld+json",
@@ -53,6 +64,9 @@ RDFLIB_SERIALIZATIONS = [
     "text/html",
 ]
 
+# Size of the chunks in which binary message bodies are streamed from/to disk
+CHUNK_SIZE = 64 * 1024
+
 
 # Utitily functions
 def correct_n3_syntax(input):
@@ -67,6 +81,108 @@ def correct_n3_syntax(input):
     return output
 
 
+def is_binary_file(path):
+    """Tell whether a file is binary (and thus not worth trying to parse as RDF)."""
+
+    if guess_format(path) is not None:
+        return False
+
+    with open(path, "rb") as fp:
+        return b"\0" in fp.read(CHUNK_SIZE)
+
+
+class FileBody(object):
+    """A request body streamed from a file, which is only opened once it is read.
+
+    Requests are identified per query row but not all of them are sent, so no file
+    handle is held before sending; `close` releases it once the request was sent.
+    `tell` and `seek` let urllib3 rewind the body when retrying a request.
+    """
+
+    def __init__(self, path):
+        self.name = path
+        self.fp = None
+
+    def __len__(self):
+        return os.path.getsize(self.name)
+
+    def __iter__(self):
+        return iter(lambda: self.read(CHUNK_SIZE), b"")
+
+    def read(self, size=-1):
+        if self.fp is None:
+            self.fp = open(self.name, "rb")
+        return self.fp.read(size)
+
+    def tell(self):
+        return 0 if self.fp is None else self.fp.tell()
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if self.fp is None:
+            self.fp = open(self.name, "rb")
+        return self.fp.seek(offset, whence)
+
+    def close(self):
+        if self.fp is not None:
+            self.fp.close()
+            self.fp = None
+
+
+def read_request_body(body_rdfterm, shapes_and_inputs, serialization_desired=None):
+    """Read the body of a request from the file `body_rdfterm` refers to.
+
+    Return the body and its media type. Binary bodies are returned as `FileBody`,
+    such that they are streamed from disk rather than read into memory.
+    """
+
+    non_parseable = False
+    body_url = urlparse(body_rdfterm.n3().strip("<>"))
+
+    if body_url.scheme != "file":
+        raise NotImplementedError
+
+    raw = rdflib.Graph()
+    filtered = rdflib.Graph()
+
+    if (None, SHACL.targetNode, body_rdfterm) in shapes_and_inputs:
+        demand_user_input_is_ready(shapes_and_inputs, body_rdfterm)
+
+    try:
+        if is_binary_file(body_url.path):
+            raise ValueError(f"'{body_url.path}' is a binary file")
+
+        raw.parse(body_url.path)
+
+        if body_url.fragment != "":
+            filtered = raw  # XXX only send relevant subgraph
+        else:
+            filtered = raw
+    except Exception:
+        non_parseable = True
+
+    if len(raw) == 0:
+        non_parseable = True
+
+    if non_parseable == False:
+        media_type = (
+            serialization_desired
+            if (
+                serialization_desired != None
+                and serialization_desired in RDFLIB_SERIALIZATIONS
+            )
+            else "text/turtle"
+        )
+        body = filtered.serialize(format=media_type)
+
+        # Work around https://github.com/RDFLib/rdflib/issues/677
+        body = body.replace(f"file://{body_url.path}", "")
+    else:
+        body = FileBody(body_url.path)
+        media_type = "application/octet-stream"
+
+    return body, media_type
+
+
 def request_from_graph(graph, shapes_and_inputs):
     """Extract parts of an HTTP request from a graph."""
 
@@ -82,22 +198,15 @@ def request_from_graph(graph, shapes_and_inputs):
     request = None  # to be assigned later
 
     # Query graph for relevant information using SPARQL
-    a0 = graph.query(
-        (
-            "SELECT ?method ?uri ?headers ?body "
-            "WHERE { "
-            "?s http:methodName ?method. "
-            "?s http:requestURI ?uri. "
-            "OPTIONAL { ?s http:headers ?headers. }"
-            "OPTIONAL { ?s http:body ?body. }"
-            "}"
-        )
-    )
+    a0 = query(graph, "request")
 
     for method_rdfterm, uri_rdfterm, headers_rdfterm, body_rdfterm in a0:
-        logger.trace(
-            f"\n{method_rdfterm=}\n{uri_rdfterm=}"
-            f"\n{headers_rdfterm=}\n{body_rdfterm=}"
+        logger.opt(lazy=True).trace(
+            "{}",
+            lambda: (
+                f"\n{method_rdfterm=}\n{uri_rdfterm=}"
+                f"\n{headers_rdfterm=}\n{body_rdfterm=}"
+            ),
         )
 
         # Extract method and verify it's valid
@@ -120,73 +229,34 @@ def request_from_graph(graph, shapes_and_inputs):
         serialization_desired = None
         if headers_rdfterm is not None:
             headers = {}
-            a1 = graph.query(
-                (
-                    "SELECT ?fieldName ?fieldValue "
-                    "WHERE { "
-                    f"?r http:headers {headers_rdfterm.n3()} ."
-                    f"{headers_rdfterm.n3()} http:fieldName ?fieldName ."
-                    f"{headers_rdfterm.n3()} http:fieldValue ?fieldValue ."
-                    "}"
-                )
-            )  # TODO change query so headers for response get disregarded!
-            for k, v in a1:
-                key = k.n3().strip("\"'").lower()
-                value = v.n3().strip("\"'")
 
-                headers[key] = value
+            # Look up field names and values in the index of the graph; a blank node
+            # matches all header nodes (like it did as part of a SPARQL query)
+            if isinstance(headers_rdfterm, rdflib.BNode):
+                header_nodes = dict.fromkeys(graph.objects(None, HTTP.headers))
+            else:
+                header_nodes = [headers_rdfterm]
+
+            # TODO disregard headers of responses!
+            for node in header_nodes:
+                for k in graph.objects(node, HTTP.fieldName):
+                    for v in graph.objects(node, HTTP.fieldValue):
+                        key = k.n3().strip("\"'").lower()
+                        value = v.n3().strip("\"'")
+
+                        headers[key] = value
 
         # Prepare body to send
         body = None
         if body_rdfterm is not None:
-            non_parseable = False
             body_url = urlparse(body_rdfterm.n3().strip("<>"))
+            body, media_type = read_request_body(
+                body_rdfterm, shapes_and_inputs, serialization_desired
+            )
 
-            if body_url.scheme == "file":
-                raw = rdflib.Graph()
-                filtered = rdflib.Graph()
-
-                if (None, SHACL.targetNode, body_rdfterm) in shapes_and_inputs:
-                    demand_user_input_is_ready(shapes_and_inputs, body_rdfterm)
-
-                try:
-                    raw.parse(body_url.path)
-
-                    if body_url.fragment != "":
-                        filtered = raw  # XXX only send relevant subgraph
-                    else:
-                        filtered = raw
-                except Exception:
-                    non_parseable = True
-
-                if len(raw) == 0:
-                    non_parseable = True
-
-                if non_parseable == False:
-                    media_type = (
-                        serialization_desired
-                        if (
-                            serialization_desired != None
-                            and serialization_desired in RDFLIB_SERIALIZATIONS
-                        )
-                        else "text/turtle"
-                    )
-                    body = filtered.serialize(format=media_type)
-
-                    if headers == None:
-                        headers = {}
-                    headers["content-type"] = media_type
-
-                    # Work around https://github.com/RDFLib/rdflib/issues/677
-                    body = body.replace(f"file://{body_url.path}", "")
-                else:
-                    with open(body_url.path, "rb") as fp:
-                        body = fp.read()
-                    if headers == None:
-                        headers = {}
-                    headers["content-type"] = "application/octet-stream"
-            else:
-                raise NotImplementedError
+            if headers == None:
+                headers = {}
+            headers["content-type"] = media_type
 
         # TODO Prepare other request parts
         files = None
@@ -215,6 +285,7 @@ def request_from_graph(graph, shapes_and_inputs):
             auth=auth,
             cookies=cookies,
         )
+        request.body_source = body_rdfterm  # remembered for replaying plans
 
         log_message = (
             f"Found ground request:\n{request.method} {request.url}\n"
@@ -244,8 +315,25 @@ def concatenate_eye_input_files(H, g, R, B=None):
     return input_files
 
 
+def prepare_eye_input_files(directory, H, g, R, B=None, backend=None):
+    """Return the input files for EYE and, if enabled, a compiled image of R and B.
+
+    With ENVVAR `EYE_IMAGES` set, R and B are loaded from an image that is built once
+    per distinct rule set, such that only H needs to be parsed on every invocation.
+    """
+
+    if os.getenv("EYE_IMAGES", "0") in ["1", "true", "yes"]:
+        rules = list(R) + ([B] if B is not None else [])
+        image = compile_rule_set(directory, rules, backend)
+
+        if image is not None:
+            return concatenate_eye_input_files(H, g, []), image
+
+    return concatenate_eye_input_files(H, g, R, B), None
+
+
 # Core functionality
-def identify_shapes_for_user_input(R, B, directory):
+def identify_shapes_for_user_input(R, B, directory, catalog=None):
     """For each rule in R, identify required user input defined through shapes.
 
     Also add assumptions stating that there will be conformant data graphs so that the
@@ -257,49 +345,15 @@ def identify_shapes_for_user_input(R, B, directory):
     shapes_and_inputs = rdflib.Graph()
     shapes_and_inputs.namespace_manager = NAMESPACE_MANAGER
 
+    if catalog is None:
+        catalog = get_rule_catalog(directory)
+
     # For each rule, assume that its implication can be realized (be optimistic!)
     for rule in R:
         logger.log("DETAIL", f"Searching shapes for user input in rule '{rule}'...")
 
-        # Load the facts specified as postcondition; i.e. assume the request succeeds
-        graph = rdflib.Graph()
-        graph.namespace_manager = NAMESPACE_MANAGER
-
-        with open(os.path.join(directory, rule)) as fp:
-            rule_text = fp.read()
-
-        # -> Extract prefix declarations
-        prefixes_regex = re.compile(
-            r"^(?P<prefix>@prefix) (?P<abbrv>[\w-]*:) (?P<url><[\w\d:\/\.#-]+>) *\.$",
-            re.MULTILINE,
-        )
-
-        prefixes_all = ""
-        for p, c, l in prefixes_regex.findall(rule_text):
-            prefixes_all += f"{p} {c} {l} .\n"
-
-        # -> Extract http-request and postcondition as `implication`
-        rule_regex = re.compile(
-            r"(?P<precondition>{[.\n\s_:?\w\";\/\[\]]*})\n*=>\n*"
-            + r"{(?P<implication>[.\n\s_:?\w\";\/\[\]-]*\n*)}\s*\."
-        )
-
-        implication = rule_regex.search(rule_text).group("implication")
-
-        # -> Parse postcondition; prefixes added to make document valid
-        graph.parse(data=f"{prefixes_all}\n{implication}", format="n3")
-
-        # Identify shapes and their target nodes via SPARQL query
-        a0 = graph.query(
-            (
-                "SELECT ?s ?p ?o "
-                "WHERE { "
-                "?s ?p ?o ."
-                "?s rdf:type sh:NodeShape ."
-                "?s sh:targetNode ?o ."
-                "}"
-            )
-        )
+        # Identify shapes and their target nodes
+        a0 = catalog.add(rule).shapes
 
         # Add assumptions that valid input will be supplied by user eventually
         if len(a0) > 0:
@@ -352,8 +406,14 @@ def identify_shapes_for_user_input(R, B, directory):
     return shapes_and_inputs
 
 
-def update_shapes_and_input(shapes_and_inputs, knowledge_gained, rule_iri, file_iri):
-    """Replace variables in the shapes/inputs-graph with content provided by API."""
+def update_shapes_and_input(
+    shapes_and_inputs, knowledge_gained, rule_iri, file_iri, superseded=None
+):
+    """Replace variables in the shapes/inputs-graph with content provided by API.
+
+    The triples replaced in the knowledge are added to the set `superseded` (if
+    given), such that they can be removed from the knowledge gained earlier as well.
+    """
 
     logger.info("Updating graph that tracks shapes, assumptions and user input...")
 
@@ -384,28 +444,16 @@ def update_shapes_and_input(shapes_and_inputs, knowledge_gained, rule_iri, file_
     lookup_table = [
         {
             "graph": shapes_and_inputs,
-            "query": (
-                "SELECT ?shape ?p1 ?focusNode "
-                "WHERE { "
-                f"?x r:source {rule_iri.n3()} ."
-                "?x ?p0 ?shape ."
-                "?shape ?p1 ?focusNode ."
-                "}"
-            ),
+            "query": "shapes_of_rule",
+            "bindings": {"rule": rule_iri},
             "s": None,
             "p": None,
             "o": None,
         },
         {
             "graph": knowledge_gained,
-            "query": (
-                "SELECT ?shape ?p1 ?focusNode "
-                "WHERE { "
-                "?shape rdf:type sh:NodeShape ."
-                "?shape sh:targetNode ?focusNode ."
-                "?shape ?p1 ?focusNode ."
-                "}"
-            ),
+            "query": "node_shapes",
+            "bindings": {},
             "s": None,
             "p": None,
             "o": None,
@@ -414,7 +462,7 @@ def update_shapes_and_input(shapes_and_inputs, knowledge_gained, rule_iri, file_
 
     # Extract subject, predicate, object from both graphs
     for gq in lookup_table:
-        a0 = gq["graph"].query(gq["query"])
+        a0 = query(gq["graph"], gq["query"], **gq["bindings"])
 
         # XXX In case of several bindings, `s`, `p`, `o` get overwritten silently!
         for s, p, o in a0:
@@ -449,6 +497,15 @@ def update_shapes_and_input(shapes_and_inputs, knowledge_gained, rule_iri, file_
         knowledge_gained.remove((add[0], remove[1], add[2]))
         knowledge_gained.remove((add[0], add[1], remove[2]))
 
+        if superseded is not None:
+            superseded.update(
+                (s, p, o)
+                for s in dict.fromkeys([remove[0], add[0]])
+                for p in dict.fromkeys([remove[1], add[1]])
+                for o in dict.fromkeys([remove[2], add[2]])
+                if (s, p, o) != (add[0], add[1], add[2])
+            )
+
         shapes_and_inputs.add((add[0], add[1], add[2]))
         shapes_and_inputs.add((add[0], REASON.source, file_iri))
         knowledge_gained.add((add[0], add[1], add[2]))
@@ -525,185 +582,291 @@ def demand_user_input_is_ready(shapes_and_inputs, term):
     # logger.debug(f"{ready=}")
 
 
+def store_cached_proof(cache, key, path):
+    """Add the proof stored at `path` to `cache`."""
+
+    with open(path) as fp:
+        cache.put(key, fp.read())
+
+
 # http://docs.pyinvoke.org/en/stable/concepts/invoking-tasks.html#iterable-flag-values
 @task(
     iterable=["input_files"],
-    optional=["suffix", "workdir"],
+    optional=["prefix", "backend", "image"],
     help={
         "tmp_dir": "The working directory on the host",
         "input_files": "The filenames of all input files",
         "agent_goal": "The name of the .n3-file specifying the agent's goal",
-        "suffix": "A suffix for the file name in which the proof is stored",
-        "workdir": "The directory inside the container at which files are mounted",
+        "prefix": "A prefix for the file name in which the proof is stored",
+        "backend": "The reasoner backend to use: 'docker', 'local' or 'stub'",
+        "image": "A compiled image of further input files to load before reasoning",
     },
 )
 def eye_generate_proof(
-    ctx, tmp_dir, input_files, agent_goal, prefix=None, workdir="/mnt"
+    ctx, tmp_dir, input_files, agent_goal, prefix=None, backend=None, image=None
 ):
-    """Generate proof using containerized EYE reasoner."""
+    """Generate proof using the EYE reasoner.
 
-    logger.info("Generating proof using EYE...")
-
-    # Assemble command
-    image_name = os.getenv("EYE_IMAGE_NAME")
-    cmd_engine = (
-        "docker run "
-        "-i "
-        "--rm "
-        "--name eye "
-        f"-v {tmp_dir}:{workdir} "
-        f"-w {workdir} "
-        f"{image_name} "
-    )
+    Return the status and the proof as `ProofIndex`, which also knows the path of the
+    file the proof is being written to (`None` if ENVVAR `AGENT_WRITE_PROOFS` is `0`).
+    """
 
-    options = "--quiet --tactic limited-answer 1"
-    filenames = " ".join(input_files)
-    cmd_container = f"{options} {filenames} --query {agent_goal}"
+    logger.info("Generating proof using EYE...")
 
-    cmd = cmd_engine + cmd_container
-    logger.debug(cmd)
+    reasoner = get_backend(backend)
+    proof = "proof.n3" if prefix is None else f"{prefix}_proof.n3"
 
-    # Generate proof
-    timeout = int(os.getenv("EYE_TIMEOUT")) if os.getenv("EYE_TIMEOUT") else None
-    result = ctx.run(cmd, hide=True, timeout=timeout)
+    # Assemble arguments
+    options = ["--quiet", "--tactic", "limited-answer", "1"]
+    arguments = options + list(input_files) + ["--query", agent_goal]
+
+    with get_tracer().span("reasoning", backend=reasoner.name) as span:
+        # Reuse the proof if the very same inputs have been reasoned over before
+        cache = get_proof_cache()
+        if cache is not None:
+            key = cache.key(
+                tmp_dir,
+                input_files,
+                agent_goal,
+                options + [reasoner.name, reasoner.workdir(tmp_dir), image],
+            )
+            content = cache.get(key)
+        else:
+            content = None
 
-    # Modify proof to ensure all parts of the stack understand the syntax
-    content = correct_n3_syntax(result.stdout)
+        span["from_cache"] = content is not None
+        if content is not None:
+            result = ReasonerResult(content, "", 0)
+            lines = content.splitlines(keepends=True)
+        else:
+            # Generate proof, consuming the reasoner's output while it is being produced
+            timeout = (
+                int(os.getenv("EYE_TIMEOUT")) if os.getenv("EYE_TIMEOUT") else None
+            )
+            result = reasoner.stream(tmp_dir, arguments, proof, timeout, image)
+            lines = result
+
+        # Store the proof as a file on disk while parsing it, if desired
+        path = None
+        writer = None
+        if os.getenv("AGENT_WRITE_PROOFS", "1") not in ["0", "false", "no"]:
+            path = os.path.join(tmp_dir, proof)
+            writer = ProofWriter(path)
+
+        # Modify proof to ensure all parts of the stack understand the syntax
+        reader = ProofReader(
+            lines,
+            normalise=correct_n3_syntax,
+            writer=writer,
+            keep=(cache is not None and content is None and writer is None),
+        )
 
-    logger.trace(f"Reasoning logs:\n{result.stderr}")
-    logger.trace(f"Proof deduced by EYE:\n{content}")
+        # Was the reasoner able to generate a proof?
+        callback = None
+        try:
+            graph = rdflib.Graph()
+            graph.namespace_manager = NAMESPACE_MANAGER
+            reader.parse(graph)  # also makes sure the reasoner is done
 
-    # Was the reasoner able to generate a proof?
-    graph = rdflib.Graph()
-    graph.namespace_manager = NAMESPACE_MANAGER
-    graph.parse(data=content, format="n3")
+            logger.trace(f"Reasoning logs:\n{result.stderr}")
+            logger.trace(f"Proof deduced by EYE contains {len(graph)} triples")
+            span["proof_triples"] = len(graph)
 
-    if result.ok and (len(graph) > 0):
-        status = SUCCESS
-    else:
-        logger.error("EYE was unable to generate a proof, halting with FAILURE!")
-        status = FAILURE
+            if result.ok and (len(graph) > 0):
+                status = SUCCESS
 
-    # Store the proof as a file on disk
-    proof = "proof.n3" if prefix is None else f"{prefix}_proof.n3"
-    path = os.path.join(tmp_dir, proof)
-    with open(path, "w") as fp:
-        fp.write(content)
+                # Remember proofs that were not taken from the cache in the first place
+                if cache is not None and content is None:
+                    if writer is not None:
+                        callback = partial(store_cached_proof, cache, key)
+                    else:
+                        cache.put(key, "".join(reader.kept))
+            else:
+                logger.error(
+                    "EYE was unable to generate a proof, halting with FAILURE!"
+                )
+                status = FAILURE
+            span["status"] = status
+        finally:
+            if writer is not None:
+                writer.close(callback)
 
-    return status, path
+    return status, ProofIndex(graph, path)
 
 
 @task(
     iterable=["R"],
     help={
-        "proof": "The .n3-file containing the proof",
+        "proof": "The .n3-file containing the proof (or its `ProofIndex`)",
         "R": "The RESTdesc descriptions as .n3-files",
         "prefix": "The path of the directory in which the .n3-files are found within the container",
     },
 )
-def find_rule_applications(ctx, proof, R, prefix):
+def find_rule_applications(ctx, proof, R, prefix, catalog=None):
     """Count how many times rules of R are applied in the proof."""
 
     logger.info("Counting how many times rules of R are applied in the proof...")
 
-    # Parse graph from n3-file
-    graph = rdflib.Graph()
-    graph.namespace_manager = NAMESPACE_MANAGER
-    graph.parse(proof, format="n3")
-
-    # Identify applications of R in proof
-    n_pre = 0
-    for file in R:
-        # Identify triple resulting from loading the source file containing part of R
-        file_name = file.split("/")[-1]
-        file_uriref = rdflib.URIRef(f"file://{prefix}/{file_name}")
-        logger.debug(f"Finding applications of rules stated in '{file_name}'...")
-
-        # Count number of triples that match SPARQL query
-        a0 = graph.query(
-            (
-                "SELECT ?x ?y "
-                "WHERE { "
-                f"?x ?p0 {file_uriref.n3()}. "
-                "?y ?p1 ?x. "
-                "}"
-            )
-        )
+    with get_tracer().span("find_rule_applications") as span:
+        # Parse graph from n3-file unless that happened already
+        index = ProofIndex.load(proof)
 
-        for x, y in a0:
-            logger.trace(f"\n{x=}\n{y=}")
-            n_pre += 1
+        # Identify applications of R in proof via the files statements were loaded from
+        n_pre = 0
+        for file, file_uriref in rules_in_proof(index, R, prefix, catalog):
+            logger.debug(f"Finding applications of rules stated in '{file}'...")
+
+            # Count number of triples matching `?x ?p0 <file>. ?y ?p1 ?x.`
+            n_pre += index.count_applications(file_uriref)
+
+        span["applications"] = n_pre
 
     logger.trace(f"{n_pre=}")
     return n_pre
 
 
+def count_rule_applications(proof, R, prefix, catalog=None):
+    """Count how many times each rule of R that the proof refers to is applied."""
+
+    index = ProofIndex.load(proof)
+
+    return {
+        file: index.count_applications(file_uriref)
+        for file, file_uriref in rules_in_proof(index, R, prefix, catalog)
+    }
+
+
+def useless_requests(state, post_proof):
+    """Return the rules of the requests executed that didn't bring the goal closer.
+
+    A rule helped if it is applied fewer times in the post-proof than in the pre-proof.
+    If none of them is to blame by that measure, all of them are, as in the PPA.
+    """
+
+    pre_proof = state.proof
+    if pre_proof is None and state.pre_proof is not None:
+        pre_proof = os.path.join(state.directory, state.pre_proof)
+    if pre_proof is None or post_proof is None or len(state.executed) == 1:
+        return list(state.executed)
+
+    workdir = get_backend(state.backend).workdir(state.directory)
+    catalog = rule_catalog(state)
+    before = count_rule_applications(pre_proof, state.executed, workdir, catalog)
+    after = count_rule_applications(post_proof, state.executed, workdir, catalog)
+
+    useless = [r for r in state.executed if after.get(r, 0) >= before.get(r, 0)]
+    return useless or list(state.executed)
+
+
+def rules_in_proof(index, R, prefix, catalog=None):
+    """Yield `(file, source)` for each file of R that statements in a proof stem from.
+
+    The files are yielded in the order of R.
+    """
+
+    if catalog is not None:
+        by_source = catalog.by_source
+    else:
+        by_source = {f"file://{prefix}/{os.path.basename(file)}": file for file in R}
+
+    position = {file: i for i, file in enumerate(R)}
+    found = []
+    for source in index.sources:
+        file = by_source.get(str(source))
+        if file in position:
+            found.append((position[file], file, source))
+
+    for _, file, source in sorted(found):
+        yield file, source
+
+
 @task(
     iterable=["R"],
     help={
-        "proof": "The .n3-file containing the proof",
+        "proof": "The .n3-file containing the proof (or its `ProofIndex`)",
         "R": "The RESTdesc descriptions as .n3-files",
         "prefix": "The path of the directory in which the .n3-files are found within the container",
     },
 )
-def identify_http_requests(ctx, proof, R, prefix, shapes_and_inputs):
+def identify_http_requests(ctx, proof, R, prefix, shapes_and_inputs, catalog=None):
     """Extract HTTP requests in proof resulting from R."""
 
     logger.info("Extracting ground HTTP requests in proof resulting from R...")
 
     requests_ground = []
 
-    # Read and parse entire proof from n3-file
-    graph = rdflib.Graph()
-    graph.namespace_manager = NAMESPACE_MANAGER
-    graph.parse(proof, format="n3")
-
-    # Iterate over all files comprising R
-    for file in R:
-        # Construct identifier for which to search
-        file_name = file.split("/")[-1]  # XXX use os.path instead
-        file_uriref = rdflib.URIRef(f"file://{prefix}/{file_name}")
-        logger.debug(f"Finding applications of rules stated in '{file_name}'...")
-
-        # Find HTTP requests that are part of the application of a rule ∈ R
-        a0 = graph.query(
-            (
-                "SELECT ?a ?b ?c ?x "
-                "WHERE { "
-                f"?a r:source {file_uriref.n3()}. "
-                "?b ?p ?a. "
-                "?c r:rule ?b. "
-                "?c r:gives ?x. "
-                "}"
-            )
-        )
-
-        # Inspect { N3 expression } and extract HTTP request info
-        for a, b, c, x in a0:
-            logger.trace(
-                (
-                    "Grounded SPARQL query to find { N3 } expression:\n"
-                    f"{a.n3()} r:source {file_uriref.n3()}\n"
-                    f"{b.n3()} ?p       {a.n3()}\n"
-                    f"{c.n3()} r:rule   {b.n3()}\n"
-                    f"{c.n3()} r:gives  {x.n3()}"
+    with get_tracer().span("identify_http_requests") as span:
+        # Read and parse entire proof from n3-file unless that happened already
+        index = ProofIndex.load(proof)
+
+        # Iterate over the files comprising R that the proof refers to
+        for file, file_uriref in rules_in_proof(index, R, prefix, catalog):
+            logger.debug(f"Finding applications of rules stated in '{file}'...")
+
+            # Find HTTP requests that are part of the application of a rule ∈ R
+            a0 = index.rule_applications(file_uriref)
+
+            # Inspect { N3 expression } and extract HTTP request info
+            for a, b, c, x in a0:
+                logger.opt(lazy=True).trace(
+                    "Chain of statements leading to {{ N3 }} expression:\n{}",
+                    lambda: (
+                        f"{a.n3()} r:source {file_uriref.n3()}\n"
+                        f"{b.n3()} ?p       {a.n3()}\n"
+                        f"{c.n3()} r:rule   {b.n3()}\n"
+                        f"{c.n3()} r:gives  {x.n3()}"
+                    ),
                 )
-            )
 
-            x.namespace_manager = NAMESPACE_MANAGER
-            logger.debug(f"{x.serialize(format='n3')}")
+                x.namespace_manager = NAMESPACE_MANAGER
+                logger.opt(lazy=True).debug("{}", lambda: x.serialize(format="n3"))
 
-            # Extract method and request URI
-            req = request_from_graph(x, shapes_and_inputs)
+                # Extract method and request URI
+                req = request_from_graph(x, shapes_and_inputs)
 
-            if req != None:
-                requests_ground.append((file, req))
+                if req != None:
+                    requests_ground.append((file, req))
+
+        span["requests"] = len(requests_ground)
 
     return requests_ground
 
 
-def parse_http_body(node, r):
-    """Parse triples about a HTTP message body."""
+def store_http_body(node, r, content_type, directory, prefix=""):
+    """Stream a binary response body into a file in `directory`.
+
+    Return triples that reference the file and describe its media type and size.
+    """
+
+    name = r.url.split("/")[-1].split("?")[0] or "body"
+    if os.path.splitext(name)[1] == "":
+        name += mimetypes.guess_extension(content_type) or ""
+    path = os.path.abspath(
+        os.path.join(directory, f"{prefix}{r.request.method.lower()}_{name}")
+    )
+
+    size = 0
+    with open(path, "wb") as fp:
+        for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+            fp.write(chunk)
+            size += len(chunk)
+
+    logger.debug(f"Stored binary response body ({size} bytes) as '{path}'")
+
+    file_uriref = rdflib.URIRef(f"file://{path}")
+    return [
+        (node, HTTP.body, file_uriref),
+        (file_uriref, DCTERMS["format"], rdflib.Literal(content_type)),
+        (file_uriref, DCTERMS.extent, rdflib.Literal(size)),
+    ]
+
+
+def parse_http_body(node, r, directory=None, prefix=""):
+    """Parse triples about a HTTP message body.
+
+    Binary response bodies are stored in `directory` (if given), with the file name
+    starting with `prefix`; only a reference to the file is added to the triples.
+    """
 
     triples = []
 
@@ -772,23 +935,35 @@ def parse_http_body(node, r):
                     triples.append((s, p, o))
                     triples.append((node, HTTP.body, s))
 
-            r_body_serialized = r_body_ds.serialize(format="application/trig")
-            logger.trace(f"Triples parsed from message body:\n{r_body_serialized}")
+            # Only serialize the body if it is stored or actually logged
+            if isinstance(r, requests.Response) and directory is not None:
+                r_body_serialized = r_body_ds.serialize(format="application/trig")
+                logger.trace(f"Triples parsed from message body:\n{r_body_serialized}")
 
-            if isinstance(r, requests.Response):
                 with open(
                     os.path.join(
-                        "/home/moritz/tmp/agent",
-                        f"{r.request.method.lower()}_{r.url.split('/')[-1].split('?')[0]}.trig",
+                        directory,
+                        f"{prefix}{r.request.method.lower()}_{r.url.split('/')[-1].split('?')[0]}.trig",
                     ),
                     "w",
                 ) as fp:
                     fp.write(r_body_serialized)
+            else:
+                logger.opt(lazy=True).trace(
+                    "Triples parsed from message body:\n{}",
+                    lambda: r_body_ds.serialize(format="application/trig"),
+                )
         else:
             logger.warning(
                 f"Found unsupported non-binary content-type '{content_type}'; "
                 "won't attempt to parse that!"
             )
+    elif isinstance(r, requests.Response) and directory is not None:
+        triples += store_http_body(node, r, content_type, directory, prefix)
+    elif isinstance(getattr(r, "body", None), FileBody):
+        # Reference the file the request body was streamed from
+        path = os.path.abspath(r.body.name)
+        triples.append((node, HTTP.body, rdflib.URIRef(f"file://{path}")))
     else:
         # TODO Parse triples off of binary content?
         logger.warning("Parsing triples off of binary content not implemented yet!")
@@ -796,8 +971,11 @@ def parse_http_body(node, r):
     return triples
 
 
-def parse_http_response(response):
-    """Extract all triples from HTTP response object."""
+def parse_http_response(response, directory=None, prefix=""):
+    """Extract all triples from HTTP response object.
+
+    Binary response bodies are stored in `directory` (see `parse_http_body()`).
+    """
 
     logger.info("Extracting new information from HTTP request/response...")
 
@@ -843,7 +1021,10 @@ def parse_http_response(response):
         triples.append((response_node, HTTP.headers, header_bnode))
 
     # Parse response body according to its (hyper-)media type
-    triples += parse_http_body(response_node, response)
+    with get_tracer().span("parse_http_response", url=request.url) as span:
+        triples += parse_http_body(response_node, response, directory, prefix)
+        span["bytes_received"] = response_body_size(response)
+    response.close()  # release the connection even if the body was not read
 
     # Connect response to request
     triples.append((request_node, RDF.type, HTTP.Request))
@@ -853,174 +1034,578 @@ def parse_http_response(response):
     return triples
 
 
-@task(
-    iterable=["H", "R"],
-    optional=["B", "pre_proof", "n_pre", "iteration", "si"],
-    help={
-        "directory": "The directory in which to store all files created during execution",
-        "H": ".n3-files containing the initial state",
-        "g": ".n3-file specifying the agent's goal",
-        "R": ".n3-file containing a RESTdesc rule (can be given multiple times)",
-        "B": ".n3-file containing background knowledge  (can be given multiple times)",
-        "pre_proof": "The .n3-file containing the pre-proof",
-        "n_pre": "The number of API operations in `pre_proof`",
-        "iteration": "The current iteration depth",
-        "si": "rdflib.graph.Graph-instance containing shapes for inputs (don't use via CLI)",
-    },
-)
-def solve_api_composition_problem(
-    ctx, directory, H, g, R, B=None, pre_proof=None, n_pre=None, iteration=0, si=None
-):
-    """Recursively solve API composition problem."""
+def request_body_size(request_object):
+    """Return the size in bytes of the body of a request (prior to encoding)."""
+
+    data = request_object.data
+    if isinstance(data, FileBody):
+        return len(data)
+    if isinstance(data, str):
+        return len(data.encode())
+    if isinstance(data, bytes):
+        return len(data)
+
+    return 0
+
+
+def response_body_size(response):
+    """Return the number of bytes of the response body read so far."""
+
+    try:
+        return response.raw.tell()
+    except (AttributeError, OSError, ValueError):
+        return int(response.headers.get("content-length", "0"))
+
+
+def close_request_body(request_object):
+    """Close the file the body of a request is streamed from, if any."""
+
+    if hasattr(request_object.data, "close"):
+        request_object.data.close()
+
+
+def send_http_request(ground_request, cost_model=None, client=None):
+    """Send a ground request to the API instance and return the response."""
+
+    r, request_object = ground_request
+    logger.log("REQUEST", f"{request_object.method} {request_object.url}")
+
+    if client is None:
+        client = get_http_client()
+
+    start = time.monotonic()
+    with get_tracer().span(
+        "http_request",
+        method=request_object.method,
+        url=request_object.url,
+        bytes_sent=request_body_size(request_object),
+    ) as span:
+        try:
+            # Binary response bodies are only read when storing them on disk
+            response = client.send(request_object, stream=True)
+        finally:
+            close_request_body(request_object)
+
+        span["status_code"] = response.status_code
+        span["from_cache"] = getattr(response, "from_cache", False)
+
+    if cost_model is not None:
+        cost_model.observe(request_origin(request_object), r, time.monotonic() - start)
+
+    return response
+
+
+def select_independent_requests(ground_requests, n_max):
+    """Select up to `n_max` distinct requests, in the order they were identified.
+
+    All ground requests of a proof are fully specified already, so none of them
+    depends on the response to another; sending the same request twice is pointless.
+    """
+
+    selected = []
+    seen = set()
+    for r, request_object in ground_requests:
+        prepared = request_object.prepare()
+
+        # Bodies streamed from disk are identified by the file they are read from
+        body = getattr(request_object.data, "name", prepared.body)
+        key = (prepared.method, prepared.url, body)
+        if key in seen or len(selected) == n_max:
+            if key in seen:
+                logger.debug(
+                    f"Skipping duplicate request {prepared.method} {prepared.url}"
+                )
+            close_request_body(request_object)
+            continue
+
+        seen.add(key)
+        selected.append((r, request_object))
+
+    return selected
+
+
+def send_http_requests(selected_requests, client=None):
+    """Send the requests concurrently and return the responses in the same order."""
 
     logger.info(
-        f"Attempting to solve API composition problem, iteration {iteration}..."
+        f"Sending {len(selected_requests)} request(s) to API instance "
+        "and parsing responses..."
     )
 
-    workdir = "/mnt"
-    input_files = concatenate_eye_input_files(H, g, R, B)
-    shapes_and_inputs = si
+    cost_model = get_cost_model()
+    send = partial(send_http_request, cost_model=cost_model, client=client)
+    with get_tracer().span("http", requests=len(selected_requests)):
+        if len(selected_requests) == 1:
+            responses = [send(selected_requests[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=len(selected_requests)) as executor:
+                responses = list(executor.map(send, selected_requests))
+    cost_model.save()
 
-    if iteration == 0:
-        shapes_and_inputs = identify_shapes_for_user_input(R, B, directory)
+    return responses
 
-    if pre_proof == None:
-        # (1) Generate the (initial) pre-proof
-        status, pre_proof = eye_generate_proof(
-            ctx, directory, input_files, g, f"{iteration:0>2}_pre", workdir
-        )
-        if status == FAILURE:
-            return FAILURE
 
-        # (1b) How many times are rules of R applied (i.e. how many API operations)?
-        n_pre = find_rule_applications(ctx, pre_proof, R, workdir)
-        logger.log("DETAIL", f"{n_pre=}")
+def add_responses_to_knowledge(state, selected_requests, responses, shapes_and_inputs):
+    """Add all responses to the agent's knowledge on disk.
 
-    # (2) What does `n_pre` imply?
-    if n_pre == 0:
-        logger.success(
-            f"🎉 The pragmatic proof algorithm terminated successfully since {n_pre=}!"
+    Return the names of the files comprising the updated knowledge. The requests are
+    recorded as `state.pending` such that they can become part of a plan.
+    """
+
+    directory = state.directory
+    iteration = state.iteration
+
+    with get_tracer().span("knowledge_update") as span:
+        # (4) Parse responses, add to ground formulas (initial state)
+        response_graph = rdflib.Graph()
+        response_graph.namespace_manager = NAMESPACE_MANAGER
+
+        state.pending = []
+        for index, ((r, request_object), response_object) in enumerate(
+            zip(selected_requests, responses)
+        ):
+            response_triples = parse_http_response(
+                response_object, directory, f"{iteration:0>2}_sub_{index}_"
+            )
+            for s, p, o in response_triples:
+                response_graph.add((s, p, o))
+
+            state.pending.append(
+                plan_step(r, request_object, response_object, response_triples)
+            )
+            response_object.close()  # unless read completely, it holds a connection
+
+        # (5a) Update agent knowledge by appending the response graph G to H
+        agent_knowledge = f"{iteration:0>2}_sub_facts.n3"  # name of G on disk
+
+        # Update map between shapes and required user input
+        superseded = set()
+        for r in dict.fromkeys(r for r, _ in selected_requests):
+            shapes_and_inputs, response_graph = update_shapes_and_input(
+                shapes_and_inputs,
+                response_graph,
+                rdflib.URIRef(f"file://{os.path.join(directory, r)}"),
+                rdflib.URIRef(f"file://{os.path.join(directory, agent_knowledge)}"),
+                superseded,
+            )
+
+        knowledge = KnowledgeBase(directory, state.H).extend(
+            response_graph, agent_knowledge, superseded
         )
+        span["response_triples"] = len(response_graph)
+        span["knowledge_files"] = len(knowledge)
 
-        # Log result achieved
-        proof = rdflib.Graph()
-        proof.parse(pre_proof, format="n3")  # TODO filter out lemmata?
+    state.si = f"{iteration:0>2}_sub_shapes_inputs.n3"
+    shapes_and_inputs.serialize(os.path.join(directory, state.si), format="n3")
 
-        logger.info(f"Proof that the goal was met:\n{proof.serialize(format='n3')}")
+    return knowledge.files
 
-        return SUCCESS
 
-    # (3) Which HTTP requests are sufficiently specified? -> select one
-    ground_requests = identify_http_requests(
-        ctx, pre_proof, R, workdir, shapes_and_inputs
+def execute_http_requests(state, selected_requests, shapes_and_inputs):
+    """Send the requests concurrently, then add all responses to the knowledge on disk.
+
+    Return the names of the files comprising the updated knowledge.
+    """
+
+    # (4) Execute HTTP requests
+    responses = send_http_requests(selected_requests)
+
+    return add_responses_to_knowledge(
+        state, selected_requests, responses, shapes_and_inputs
     )
-    r, request_object = ground_requests[0]
 
-    # (4) Execute HTTP request
-    logger.info("Sending request to API instance and parsing response...")
-    logger.log("REQUEST", f"{request_object.method} {request_object.url}")
 
-    request_prepared = request_object.prepare()
-    session = requests.Session()
-    response_object = session.send(request_prepared)
+def initial_bindings(state):
+    """Return the IRIs in the initial state of the problem by their role."""
+
+    graph = rdflib.Graph()
+    graph.parse(os.path.join(state.directory, state.H[0]), format="n3")
+
+    return graph_bindings(graph)
 
-    # (4) Parse response, add to ground formulas (initial state)
-    response_triples = parse_http_response(response_object)
 
-    response_graph = rdflib.Graph()
-    response_graph.namespace_manager = NAMESPACE_MANAGER
+def replay_plan_step(ctx, state, shapes_and_inputs):
+    """Send the next request of a plan that solved a problem of the same shape.
 
-    for s, p, o in response_triples:
-        response_graph.add((s, p, o))
+    Continue with the PPA once the plan is complete, such that the reasoner verifies
+    that the goal is met, or as soon as a response deviates from the plan.
+    """
+
+    plan_store = get_plan_store()
+    template = plan_store.get(state.signature) if plan_store is not None else None
+    index = len(state.plan)
+
+    def stop_replaying():
+        state.phase = PRE_PROOF
 
-    # Write newly gained knowledge to disk
-    response_graph_serialized = response_graph.serialize(format="n3")
+    if template is None or index == len(template):
+        return stop_replaying()
 
-    # WORKAROUND for bug in N3 serializer (no prefix 'rdf' but `[ sh:path rdf:type ]`)
-    response_graph_serialized = f"@prefix rdf: <{RDF}> .\n" + response_graph_serialized
+    step = template[index]
+    sources = step_sources(initial_bindings(state), state.plan)
+    url = instantiate(step["url"], sources)
+    body_source = instantiate(step["body"], sources) if step["body"] else None
 
-    logger.trace(f"New information parsed from response:\n{response_graph_serialized}")
+    if url is None or (step["body"] is not None and body_source is None):
+        logger.warning(f"Cannot instantiate step {index} of the plan, reasoning...")
+        return stop_replaying()
+
+    # Never send values of the recorded run that aren't part of the rule itself
+    rule_path = os.path.join(state.directory, step["rule"])
+    rule_text = ""
+    if os.path.isfile(rule_path):
+        with open(rule_path) as fp:
+            rule_text = fp.read()
 
-    G = f"{iteration:0>2}_sub_api_response.n3"
+    for parameter in [step["url"], step["body"]]:
+        if parameter is None or "ref" in parameter:
+            continue
+        if not is_stated_in_rule(parameter, rule_text):
+            logger.warning(
+                f"Step {index} of the plan uses '{parameter['value']}' from the run "
+                "it was recorded in, reasoning..."
+            )
+            return stop_replaying()
 
-    with open(os.path.join(directory, G), "w") as fp:
-        fp.write(response_graph_serialized)
+    logger.info(f"Replaying step {index + 1}/{len(template)} of a memoized plan...")
 
-    # (5a) Update agent knowledge by creating union of sets H and G
-    # FIXME should this be a merge or the set operation G1 + G2??
-    H_union_G = rdflib.Graph()
-    H_union_G.namespace_manager = NAMESPACE_MANAGER
-    H_union_G.parse(os.path.join(directory, H[0]), format="n3")
-    H_union_G.parse(os.path.join(directory, G), format="n3")
+    headers = dict(step["headers"])
+    body = None
+    if body_source is not None:
+        body, headers["content-type"] = read_request_body(
+            rdflib.URIRef(body_source), shapes_and_inputs
+        )
 
-    # TODO Update map between shapes and required user input
-    agent_knowledge = f"{iteration:0>2}_sub_facts.n3"  # name for `H_union_G` on disk
+    request_object = requests.Request(
+        method=step["method"],
+        url=url,
+        headers=headers,
+        data=body,
+        params=step["params"],
+    )
+    request_object.body_source = body_source
 
-    shapes_and_inputs, H_union_G = update_shapes_and_input(
-        shapes_and_inputs,
-        H_union_G,
-        rdflib.URIRef(f"file://{os.path.join(directory, r)}"),
-        rdflib.URIRef(f"file://{os.path.join(directory, agent_knowledge)}"),
+    selected_requests = [(step["rule"], request_object)]
+    responses = send_http_requests(selected_requests)
+    state.H = add_responses_to_knowledge(
+        state, selected_requests, responses, shapes_and_inputs
     )
+    state.plan += state.pending
+    state.pending = []
+    state.iteration += 1
+
+    if responses[0].status_code // 100 != step["status"] // 100:
+        logger.warning(
+            f"Expected status {step['status']} but got {responses[0].status_code} "
+            f"in step {index} of the plan, reasoning..."
+        )
+        return stop_replaying()
+
+
+def memoize_plan(state):
+    """Store the requests that led to the goal as template for similar problems."""
+
+    plan_store = get_plan_store()
+    if plan_store is None or state.signature is None or len(state.plan) == 0:
+        return
 
-    # Write updated knowledge (API response + shapes/input-map) to disk
-    agent_knowledge_updated = H_union_G.serialize(format="n3")
+    plan_store.put(state.signature, make_template(state.plan, initial_bindings(state)))
 
-    # WORKAROUND for bug in N3 serializer (no prefix 'rdf' but `[ sh:path rdf:type ]`)
-    agent_knowledge_updated = f"@prefix rdf: <{RDF}> .\n" + agent_knowledge_updated
 
-    logger.trace(f"agent_knowledge_updated:\n{agent_knowledge_updated}")
+def rule_catalog(state):
+    """Return the catalog of the rules in R as referred to by the reasoner's proofs."""
 
-    with open(os.path.join(directory, agent_knowledge), "w") as fp:
-        fp.write(agent_knowledge_updated)
+    workdir = get_backend(state.backend).workdir(state.directory)
+    catalog = get_rule_catalog(state.directory, workdir)
+    catalog.extend(state.R)
 
-    shapes_and_inputs.serialize(
-        os.path.join(directory, f"{iteration:0>2}_sub_shapes_inputs.n3"), format="n3"
+    return catalog
+
+
+def remember_proof(state, proof):
+    """Keep the proof in memory; reference its file (if any) for resuming later."""
+
+    state.proof = proof
+    state.pre_proof = None
+
+    if proof.path is not None:
+        state.pre_proof = os.path.basename(proof.path)
+
+
+def generate_pre_proof(ctx, state, shapes_and_inputs):
+    """(1) Generate the pre-proof and count the API operations it contains."""
+
+    input_files, image = prepare_eye_input_files(
+        state.directory, state.H, state.g, state.R, state.B, state.backend
+    )
+    status, pre_proof = eye_generate_proof(
+        ctx,
+        state.directory,
+        input_files,
+        state.g,
+        f"{state.iteration:0>2}_pre",
+        state.backend,
+        image,
+    )
+    if status == FAILURE:
+        state.status = FAILURE
+        state.phase = DONE
+        return
+
+    # (1b) How many times are rules of R applied (i.e. how many API operations)?
+    workdir = get_backend(state.backend).workdir(state.directory)
+    state.n_pre = find_rule_applications(
+        ctx, pre_proof, state.R, workdir, rule_catalog(state)
     )
+    logger.log("DETAIL", f"n_pre={state.n_pre}")
+
+    remember_proof(state, pre_proof)
+    state.phase = SELECT
+
+
+def select_and_execute_request(ctx, state, shapes_and_inputs):
+    """(2-5a) Unless done, execute ground requests and update the agent's knowledge."""
+
+    # Proofs that were only kept in memory are lost when resuming; deduce them again
+    if state.proof is None:
+        if state.pre_proof is None:
+            state.phase = PRE_PROOF
+            return
+        state.proof = ProofIndex.load(os.path.join(state.directory, state.pre_proof))
+
+    workdir = get_backend(state.backend).workdir(state.directory)
+    catalog = rule_catalog(state)
+    if state.n_pre is None:
+        state.n_pre = find_rule_applications(
+            ctx, state.proof, state.R, workdir, catalog
+        )
+
+    # (2) What does `n_pre` imply?
+    if state.n_pre == 0:
+        logger.success(
+            "🎉 The pragmatic proof algorithm terminated successfully since "
+            f"n_pre={state.n_pre}!"
+        )
+
+        # Log result achieved
+        proof = state.proof.graph  # TODO filter out lemmata?
+
+        logger.opt(lazy=True).info(
+            "Proof that the goal was met:\n{}", lambda: proof.serialize(format="n3")
+        )
+
+        state.status = SUCCESS
+        state.phase = DONE
+        return
+
+    # (3) Which HTTP requests are sufficiently specified? -> select those to send
+    ground_requests = identify_http_requests(
+        ctx, state.proof, state.R, workdir, shapes_and_inputs, catalog
+    )
+    ground_requests = get_selection_strategy()(
+        ground_requests, get_cost_model(), state.directory
+    )
+    n_max = int(os.getenv("AGENT_MAX_PARALLEL_REQUESTS", "4"))
+    selected_requests = select_independent_requests(ground_requests, max(n_max, 1))
+
+    # (4-5a) Execute HTTP requests, update agent knowledge
+    state.agent_knowledge = execute_http_requests(
+        state, selected_requests, shapes_and_inputs
+    )
+    state.executed = list(dict.fromkeys(r for r, _ in selected_requests))
+    state.phase = POST_PROOF
+
+
+def generate_post_proof(ctx, state, shapes_and_inputs):
+    """(5b-7) Generate the post-proof and decide how to continue."""
 
     # (5b) Generate post-proof
-    input_files = concatenate_eye_input_files([agent_knowledge], g, R, B)
+    input_files, image = prepare_eye_input_files(
+        state.directory,
+        state.agent_knowledge,
+        state.g,
+        state.R,
+        state.B,
+        state.backend,
+    )
     status, post_proof = eye_generate_proof(
-        ctx, directory, input_files, g, f"{iteration:0>2}_sub", workdir
+        ctx,
+        state.directory,
+        input_files,
+        state.g,
+        f"{state.iteration:0>2}_sub",
+        state.backend,
+        image,
     )
 
     # (6) What is the value of `n_post`?
+    n_pre = state.n_pre
     if status == FAILURE:
         n_post = n_pre
+        post_proof = None
     else:
-        n_post = find_rule_applications(ctx, post_proof, R, workdir)
+        workdir = get_backend(state.backend).workdir(state.directory)
+        n_post = find_rule_applications(
+            ctx, post_proof, state.R, workdir, rule_catalog(state)
+        )
 
     logger.log("DETAIL", f"{n_pre=}; {n_post=}")
 
     # (7) What do the values of `n_pre` and `n_post` imply?
-    iteration += 1
+    state.iteration += 1
     if n_post >= n_pre:
-        R_difference_r = [x for x in R if not x == r]
-        status = solve_api_composition_problem(
-            ctx,
-            directory,
-            H,
-            g,
-            R_difference_r,
-            B,
-            None,
-            None,
-            iteration,
-            shapes_and_inputs,
-        )
-        return status
+        useless = useless_requests(state, post_proof)
+        state.R = [x for x in state.R if x not in useless]
+        state.proof = None
+        state.pre_proof = None
+        state.n_pre = None
+        state.phase = PRE_PROOF
     else:
-        n_pre = n_post
-        status = solve_api_composition_problem(
-            ctx,
-            directory,
-            [agent_knowledge],
-            g,
-            R,
-            B,
-            post_proof,
-            n_pre,
-            iteration,
-            shapes_and_inputs,
-        )
-        return status
+        state.H = state.agent_knowledge
+        state.plan += state.pending
+        state.n_pre = n_post
+        remember_proof(state, post_proof)
+        state.phase = SELECT
+
+    state.executed = []
+    state.pending = []
+    state.agent_knowledge = None
+
+
+# The step of the PPA to execute for each phase
+STEPS = {
+    REPLAY: replay_plan_step,
+    PRE_PROOF: generate_pre_proof,
+    SELECT: select_and_execute_request,
+    POST_PROOF: generate_post_proof,
+}
+
+
+def run_pragmatic_proof_algorithm(ctx, state, shapes_and_inputs, profile=None):
+    """Execute the steps of the PPA until done, saving a checkpoint after each.
+
+    If `profile` is `cpu`, `memory` or `all`, each iteration is profiled (see
+    `agent.profiling`); it defaults to ENVVAR `AGENT_PROFILE`.
+    """
+
+    tracer = get_tracer()
+    profiler = get_profiler(state.directory, profile)
+    try:
+        while state.phase != DONE:
+            if state.phase not in [POST_PROOF, REPLAY]:
+                logger.info(
+                    "Attempting to solve API composition problem, "
+                    f"iteration {state.iteration}..."
+                )
+
+            tracer.begin(state.directory, state.iteration)
+            if profiler is not None:
+                profiler.begin(state.iteration)
+
+            STEPS[state.phase](ctx, state, shapes_and_inputs)
+            state.save()
+    finally:
+        if profiler is not None:
+            profiler.close()
+
+    tracer.end_run("success" if state.status == SUCCESS else "failure")
+
+    if state.status == SUCCESS:
+        memoize_plan(state)
+
+    return state.status
+
+
+@task(
+    iterable=["H", "R"],
+    optional=["B", "pre_proof", "n_pre", "iteration", "si", "backend", "profile"],
+    help={
+        "directory": "The directory in which to store all files created during execution",
+        "H": ".n3-files containing the initial state",
+        "g": ".n3-file specifying the agent's goal",
+        "R": ".n3-file containing a RESTdesc rule (can be given multiple times)",
+        "B": ".n3-file containing background knowledge  (can be given multiple times)",
+        "pre_proof": "The .n3-file containing the pre-proof",
+        "n_pre": "The number of API operations in `pre_proof`",
+        "iteration": "The current iteration depth",
+        "si": "rdflib.graph.Graph-instance containing shapes for inputs (don't use via CLI)",
+        "backend": "The reasoner backend to use: 'docker', 'local' or 'stub'",
+        "profile": "Profile each iteration: 'cpu', 'memory' or 'all'",
+    },
+)
+def solve_api_composition_problem(
+    ctx,
+    directory,
+    H,
+    g,
+    R,
+    B=None,
+    pre_proof=None,
+    n_pre=None,
+    iteration=0,
+    si=None,
+    backend=None,
+    profile=None,
+):
+    """Solve API composition problem; checkpoint the state after each step."""
+
+    shapes_and_inputs = si
+
+    # Don't bother the reasoner with rules that can't contribute to reaching the goal
+    catalog = get_rule_catalog(directory, get_backend(backend).workdir(directory))
+    prune = os.getenv("AGENT_PRUNE_RULES", "1") not in ["0", "false", "no"]
+    if int(iteration) == 0 and prune:
+        R = prune_rules(directory, g, R, B, catalog)
+
+    state = PPAState(directory, list(H), g, list(R), B, backend, int(iteration))
+
+    if state.iteration == 0:
+        shapes_and_inputs = identify_shapes_for_user_input(R, B, directory, catalog)
+
+    if shapes_and_inputs is not None:
+        state.si = f"{state.iteration:0>2}_init_shapes_inputs.n3"
+        shapes_and_inputs.serialize(os.path.join(directory, state.si), format="n3")
+
+    if pre_proof is not None:
+        if isinstance(pre_proof, ProofIndex):
+            remember_proof(state, pre_proof)
+        else:
+            state.pre_proof = os.path.relpath(pre_proof, directory)
+        state.n_pre = None if n_pre is None else int(n_pre)
+        state.phase = SELECT
+
+    # Reuse the plan of an earlier problem of the same shape, if there is one
+    plan_store = get_plan_store()
+    if state.iteration == 0 and plan_store is not None:
+        state.signature = plan_signature(directory, g, R)
+        if state.phase == PRE_PROOF and plan_store.get(state.signature) is not None:
+            logger.info("Found a memoized plan for this goal and R, replaying it...")
+            state.phase = REPLAY
+
+    state.save()
+
+    return run_pragmatic_proof_algorithm(ctx, state, shapes_and_inputs, profile)
+
+
+@task(
+    optional=["backend", "profile"],
+    help={
+        "directory": "The directory containing the checkpoint of an interrupted run",
+        "backend": "The reasoner backend to use instead of the one used before",
+        "profile": "Profile each iteration: 'cpu', 'memory' or 'all'",
+    },
+)
+def resume_api_composition_problem(ctx, directory, backend=None, profile=None):
+    """Continue solving an API composition problem from its last checkpoint."""
+
+    state = PPAState.load(directory)
+    if backend is not None:
+        state.backend = backend
+
+    logger.info(
+        f"Resuming from checkpoint: iteration {state.iteration}, '{state.phase}'"
+    )
+
+    shapes_and_inputs = state.load_shapes_and_inputs()
+
+    return run_pragmatic_proof_algorithm(ctx, state, shapes_and_inputs, profile)
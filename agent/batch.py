@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Solve many API composition problems that share R and B in parallel."""
+
+
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import yaml
+from invoke import Context
+from loguru import logger
+
+from .agent import FAILURE, SUCCESS, solve_api_composition_problem
+from .cache import set_proof_cache_dir
+from .catalog import RuleCatalog, share_rules
+from .reasoner import close_pool
+
+# File names of the inputs in each job's working directory
+H_FILENAME = "00_init_facts.n3"
+G_FILENAME = "00_init_goal.n3"
+B_FILENAME = "00_init_knowledge.n3"
+
+
+def read_manifest(path):
+    """Read the jobs listed in a YAML/JSON manifest; resolve their paths.
+
+    The manifest looks like
+
+        background: background_knowledge.n3  # optional; B shared by all jobs
+        jobs:
+          - name: image-0001  # optional; defaults to the index of the job
+            initial_state: image-0001/initial_state.n3
+            goal: agent_goal.n3
+
+    with relative paths being relative to the manifest itself.
+    """
+
+    with open(path) as fp:
+        manifest = yaml.safe_load(fp)
+
+    base = os.path.dirname(os.path.abspath(path))
+
+    def resolve(filepath):
+        return None if filepath is None else os.path.join(base, filepath)
+
+    background = resolve(manifest.get("background"))
+
+    jobs = []
+    for index, job in enumerate(manifest["jobs"]):
+        jobs.append(
+            {
+                "name": str(job.get("name", f"{index:0>4}")),
+                "H": resolve(job["initial_state"]),
+                "g": resolve(job["goal"]),
+                "B": resolve(job.get("background")) or background,
+            }
+        )
+
+    return jobs
+
+
+def share_file(source, destination):
+    """Make `source` available as `destination` without copying, if possible."""
+
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+def init_worker(cache_dir, rules):
+    """Set up a worker process with the proof cache and rules shared by all jobs."""
+
+    set_proof_cache_dir(cache_dir)
+    share_rules(rules)
+
+
+def solve_job(job, shared_dir, R, backend=None):
+    """Solve a single problem of a batch in its own working directory."""
+
+    directory = job["directory"]
+    os.makedirs(directory, exist_ok=True)
+
+    # The rules are read-only and thus shared; H, g and B are modified by the PPA
+    for rule in R:
+        destination = os.path.join(directory, rule)
+        if not os.path.exists(destination):
+            share_file(os.path.join(shared_dir, rule), destination)
+
+    shutil.copyfile(job["H"], os.path.join(directory, H_FILENAME))
+    shutil.copyfile(job["g"], os.path.join(directory, G_FILENAME))
+    B = None
+    if job["B"] is not None:
+        shutil.copyfile(job["B"], os.path.join(directory, B_FILENAME))
+        B = B_FILENAME
+
+    # Worker processes exit without running `atexit`-handlers, so the job's EYE
+    # workers have to be stopped here; otherwise their containers outlive the job
+    try:
+        with logger.contextualize(job=job["name"]):
+            return solve_api_composition_problem(
+                Context(), directory, [H_FILENAME], G_FILENAME, R, B, backend=backend
+            )
+    finally:
+        close_pool(directory)
+
+
+def solve_batch(jobs, shared_dir, R, tmp_dir, processes=None, backend=None):
+    """Solve all `jobs` using a pool of `processes` worker processes.
+
+    Each job is solved in `<tmp_dir>/<name>/`; the RESTdesc descriptions R stored in
+    `shared_dir` are linked into it and parsed only once, here. Proofs are cached on
+    disk in `EYE_CACHE_DIR` or else `<tmp_dir>/proof_cache`, such that solving the
+    batch again reuses them; jobs don't share proofs since these depend on H and the
+    directory of the job. A summary of all jobs is written to
+    `<tmp_dir>/batch_results.json`.
+
+    Return the number of jobs that did not succeed.
+    """
+
+    cache_dir = os.getenv("EYE_CACHE_DIR") or os.path.join(tmp_dir, "proof_cache")
+    rules = RuleCatalog(shared_dir).extend(R)
+
+    results = {}
+    start = time.monotonic()
+    with ProcessPoolExecutor(
+        max_workers=processes, initializer=init_worker, initargs=(cache_dir, rules)
+    ) as executor:
+        futures = {}
+        for job in jobs:
+            job = dict(job, directory=os.path.join(tmp_dir, job["name"]))
+            future = executor.submit(solve_job, job, shared_dir, R, backend)
+            futures[future] = job["name"]
+
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                status = future.result()
+            except Exception as e:
+                logger.error(f"Job '{name}' raised {e!r}")
+                status = FAILURE
+
+            results[name] = status
+            logger.info(
+                f"Job '{name}' {'succeeded' if status == SUCCESS else 'failed'} "
+                f"({len(results)}/{len(jobs)} done)"
+            )
+
+    n_failed = sum(1 for status in results.values() if status != SUCCESS)
+    logger.info(
+        f"Solved {len(jobs) - n_failed} of {len(jobs)} problems "
+        f"in {time.monotonic() - start:.1f}s"
+    )
+
+    with open(os.path.join(tmp_dir, "batch_results.json"), "w") as fp:
+        json.dump({name: results[name] for name in sorted(results)}, fp, indent=2)
+
+    return n_failed
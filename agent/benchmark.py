@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Benchmark the PPA end-to-end on synthetic API composition problems.
+
+A problem consists of a chain of `chain_length` requests, each of which can be
+taken via `branching` alternative rules, plus unrelated rules up to a catalog of
+`n_rules` rules. The chain is served by the local stand-in server. The time spent in
+each iteration is split into reasoning, proof processing, HTTP and knowledge update
+as recorded in the trace of each run; the results are written as JSON that can be
+compared between commits. With the `stub` backend, the proofs EYE would deduce are
+generated up front, such that the agent's own overhead is measured without EYE.
+
+Micro-benchmarks compare the fixed SPARQL queries of the agent parsed on every call
+to their prepared counterparts and to walking the indices of a graph directly.
+"""
+
+
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+
+import rdflib
+from invoke import Context
+from loguru import logger
+
+from . import agent as ppa
+from .namespaces import HTTP, NAMESPACE_MANAGER, REASON, SHACL
+from .queries import QUERIES, query
+from .reasoner import get_backend
+from .standin import start_standin_server
+from .tracing import TRACE
+
+# Version of the format of the results
+RESULTS_VERSION = 1
+
+# The spans of the trace whose time is attributed to each phase
+PHASES = {
+    "reasoning": ["reasoning"],
+    "proof_processing": ["find_rule_applications", "identify_http_requests"],
+    "http": ["http"],
+    "knowledge_update": ["knowledge_update"],
+}
+
+PREFIXES = """\
+@prefix bench: <http://example.org/benchmark#>.
+@prefix http: <http://www.w3.org/2011/http#>.
+"""
+
+STAGE_RULE = """
+{{
+  ?resource a bench:{premise};
+            bench:{link}{branch} ?next.
+}}
+=>
+{{
+  _:request http:methodName "GET";
+            http:requestURI ?next;
+            http:headers [ http:fieldName "Accept"; http:fieldValue "text/n3" ];
+            http:resp [ http:body ?next ].
+  ?next a bench:{conclusion}{links}.
+}}.
+"""
+
+
+# Synthetic problems ###################################################################
+def stage_rule(premise, conclusion, branch, branching, link="link"):
+    links = "".join(
+        f";\n        bench:{link}{number} _:{link}{number}"
+        for number in range(branching)
+    )
+    return PREFIXES + STAGE_RULE.format(
+        premise=premise, conclusion=conclusion, branch=branch, link=link, links=links
+    )
+
+
+def generate_problem(directory, origin, chain_length, branching=1, n_rules=0):
+    """Write a synthetic API composition problem to `directory`.
+
+    Reaching the goal takes `chain_length` GET-requests; each stage can be reached
+    via `branching` rules. Unrelated rules are added until there are `n_rules`
+    rules in total. Return the file names of `H`, `g`, `R` and `B`.
+    """
+
+    os.makedirs(directory, exist_ok=True)
+
+    files = {}
+    links = "".join(
+        f";\n  bench:link{branch} <{origin}/chain/1/{branch}>"
+        for branch in range(branching)
+    )
+    files[
+        "00_init_facts.n3"
+    ] = f"{PREFIXES}\n<{origin}/chain/0/0> a bench:Stage0{links}.\n"
+    files["00_init_goal.n3"] = (
+        f"{PREFIXES}\n{{ ?resource a bench:Stage{chain_length}. }}\n=>\n"
+        f"{{ ?resource a bench:Stage{chain_length}. }}.\n"
+    )
+    files["00_init_knowledge.n3"] = PREFIXES
+
+    R = []
+    for stage in range(1, chain_length + 1):
+        for branch in range(branching):
+            filename = f"stage_{stage:0>2}_{branch:0>2}.n3"
+            files[filename] = stage_rule(
+                f"Stage{stage - 1}", f"Stage{stage}", branch, branching
+            )
+            R.append(filename)
+
+    for number in range(max(n_rules - len(R), 0)):
+        filename = f"unrelated_{number:0>3}.n3"
+        files[filename] = stage_rule(
+            f"Unrelated{number}", f"Unrelated{number + 1}", 0, branching, "other"
+        )
+        R.append(filename)
+
+    for filename, content in files.items():
+        with open(os.path.join(directory, filename), "w") as fp:
+            fp.write(content)
+
+    return "00_init_facts.n3", "00_init_goal.n3", R, "00_init_knowledge.n3"
+
+
+# The proof of applying the rule of a stage, in the format EYE writes proofs in
+STAGE_PROOF = """
+<#extraction{stage}> a r:Extraction;
+  r:gives {{
+    {{?x_0 a bench:Stage{premise}}} => {{?x_0 a bench:Stage{stage}}}.
+  }};
+  r:because [ a r:Parsing; r:source <file://{workdir}/stage_{stage:0>2}_00.n3>].
+
+<#inference{stage}> a r:Inference;
+  r:gives {{
+    _:request{stage} http:methodName "GET".
+    _:request{stage} http:requestURI {uri}.
+    _:request{stage} http:headers _:header{stage}.
+    _:header{stage} http:fieldName "Accept".
+    _:header{stage} http:fieldValue "text/n3".
+    {uri} a bench:Stage{stage}.
+  }};
+  r:rule <#extraction{stage}>.
+"""
+
+
+def stage_proof(origin, first, chain_length, workdir):
+    """Return a proof of reaching the goal via the stages `first` to `chain_length`.
+
+    Only the request of stage `first` is ground; the resources of later stages are
+    not known until it was sent.
+    """
+
+    proof = (
+        PREFIXES
+        + "@prefix r: <http://www.w3.org/2000/10/swap/reason#>.\n\n"
+        + "[] a r:Proof, r:Conjunction;\n"
+        + f"  r:gives {{ _:resource a bench:Stage{chain_length}. }}.\n"
+    )
+    for stage in range(first, chain_length + 1):
+        uri = f"<{origin}/chain/{stage}/0>" if stage == first else f"_:resource{stage}"
+        proof += STAGE_PROOF.format(
+            stage=stage, premise=stage - 1, uri=uri, workdir=workdir
+        )
+
+    return proof
+
+
+def record_proofs(directory, origin, chain_length, workdir="/mnt"):
+    """Write the proofs EYE deduces for the synthetic problem to `directory`.
+
+    The problem is solved along the first branch of each stage; with ENVVAR
+    `EYE_STUB_DIR` set to `directory`, the `stub` backend replays these proofs.
+    """
+
+    os.makedirs(directory, exist_ok=True)
+
+    files = {"00_pre_proof.n3": stage_proof(origin, 1, chain_length, workdir)}
+    for iteration in range(chain_length):
+        files[f"{iteration:0>2}_sub_proof.n3"] = stage_proof(
+            origin, iteration + 2, chain_length, workdir
+        )
+
+    for filename, content in files.items():
+        with open(os.path.join(directory, filename), "w") as fp:
+            fp.write(content)
+
+
+# Measuring ############################################################################
+def phases_from_trace(path):
+    """Return the time spent in each phase per iteration as recorded in a trace."""
+
+    iterations = {}
+    with open(path) as fp:
+        for line in fp:
+            record = json.loads(line)
+            if record["event"] != "iteration":
+                continue
+
+            times = iterations.setdefault(
+                record["iteration"], {phase: 0.0 for phase in PHASES}
+            )
+            for phase, spans in PHASES.items():
+                for span in spans:
+                    times[phase] += record["spans"].get(span, {}).get("duration", 0.0)
+
+    return [
+        dict({"iteration": iteration}, **times)
+        for iteration, times in sorted(iterations.items())
+    ]
+
+
+@contextmanager
+def environment(**variables):
+    """Set the ENVVARs given within this context."""
+
+    previous = {name: os.environ.get(name) for name in variables}
+    os.environ.update(variables)
+
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.realpath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(values):
+    return {
+        "median": statistics.median(values),
+        "min": min(values),
+        "max": max(values),
+    }
+
+
+def run_benchmark(
+    chain_length=3,
+    branching=1,
+    n_rules=0,
+    repetitions=3,
+    backend=None,
+    tmp_dir=None,
+    latency=0.0,
+    failure_rate=0.0,
+    seed=None,
+):
+    """Solve the synthetic problem `repetitions` times; return the results.
+
+    The proof cache, plan store and HTTP cache are disabled such that every
+    repetition does the full amount of work. The time per phase is read from the
+    trace each run writes to its directory.
+    """
+
+    parameters = {
+        "chain_length": chain_length,
+        "branching": branching,
+        "n_rules": n_rules,
+        "repetitions": repetitions,
+        "backend": backend or os.getenv("EYE_BACKEND", "docker"),
+        "latency": latency,
+        "failure_rate": failure_rate,
+    }
+    logger.info(f"Benchmarking the PPA with {parameters}...")
+
+    base_dir = tmp_dir or tempfile.mkdtemp(prefix="ppa_benchmark_")
+    server = start_standin_server(
+        latency=latency, failure_rate=failure_rate, branching=branching, seed=seed
+    )
+
+    variables = {
+        "EYE_CACHE": "0",
+        "AGENT_PLANS": "0",
+        "AGENT_HTTP_CACHE": "0",
+        "AGENT_TRACE": "1",
+    }
+    if parameters["backend"] == "stub":
+        recordings = os.path.join(base_dir, "proofs")
+        record_proofs(
+            recordings,
+            server.origin,
+            chain_length,
+            get_backend("stub").workdir(base_dir),
+        )
+        variables["EYE_STUB_DIR"] = recordings
+
+    runs = []
+    try:
+        with environment(**variables):
+            for repetition in range(repetitions):
+                directory = os.path.join(base_dir, f"run_{repetition:0>2}")
+                shutil.rmtree(directory, ignore_errors=True)
+                H, g, R, B = generate_problem(
+                    directory, server.origin, chain_length, branching, n_rules
+                )
+
+                n_requests = server.n_requests
+                start = time.perf_counter()
+                status = ppa.solve_api_composition_problem(
+                    Context(), directory, [H], g, R, B, backend=backend
+                )
+                wall = time.perf_counter() - start
+
+                runs.append(
+                    {
+                        "status": "success" if status == ppa.SUCCESS else "failure",
+                        "wall": wall,
+                        "n_requests": server.n_requests - n_requests,
+                        "iterations": phases_from_trace(os.path.join(directory, TRACE)),
+                    }
+                )
+                logger.info(f"Repetition {repetition} took {wall:.3f}s")
+    finally:
+        server.shutdown()
+        if tmp_dir is None:
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+    summary = {"wall": summarize([run["wall"] for run in runs])}
+    for phase in PHASES:
+        summary[phase] = summarize(
+            [sum(i[phase] for i in run["iterations"]) for run in runs]
+        )
+    summary["iterations"] = summarize([len(run["iterations"]) for run in runs])
+
+    return {
+        "version": RESULTS_VERSION,
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.time(),
+        "parameters": parameters,
+        "runs": runs,
+        "summary": summary,
+    }
+
+
+# Comparing ############################################################################
+def write_results(path, results):
+    with open(path, "w") as fp:
+        json.dump(results, fp, indent=2)
+
+
+def read_results(path):
+    with open(path) as fp:
+        return json.load(fp)
+
+
+def compare_results(baseline, current, tolerance=0.1, min_seconds=0.005):
+    """Return the metrics whose median got worse by more than `tolerance`.
+
+    Differences below `min_seconds` are considered noise. Each regression is a
+    dictionary of metric, baseline, current and their ratio.
+    """
+
+    if baseline["parameters"] != current["parameters"]:
+        raise ValueError(
+            "Benchmark results were obtained with different parameters: "
+            f"{baseline['parameters']} != {current['parameters']}"
+        )
+
+    regressions = []
+    for metric in ["wall"] + list(PHASES):
+        before = baseline["summary"][metric]["median"]
+        after = current["summary"][metric]["median"]
+
+        if after - before > max(tolerance * before, min_seconds):
+            regressions.append(
+                {
+                    "metric": metric,
+                    "baseline": before,
+                    "current": after,
+                    "ratio": after / before if before > 0 else float("inf"),
+                }
+            )
+
+    return regressions
+
+
+# Micro-benchmarks ####################################################################
+def query_graphs(n_headers=3):
+    """Return a graph describing a HTTP request and one stating a shape, as in R."""
+
+    request = rdflib.Graph()
+    request.namespace_manager = NAMESPACE_MANAGER
+    node = rdflib.BNode()
+    request.add((node, HTTP.methodName, rdflib.Literal("GET")))
+    request.add((node, HTTP.requestURI, rdflib.URIRef("http://example.org/images/1")))
+    for number in range(n_headers):
+        header = rdflib.BNode()
+        request.add((node, HTTP.headers, header))
+        request.add((header, HTTP.fieldName, rdflib.Literal(f"x-field-{number}")))
+        request.add((header, HTTP.fieldValue, rdflib.Literal(f"value {number}")))
+
+    shapes = rdflib.Graph()
+    shapes.namespace_manager = NAMESPACE_MANAGER
+    rule = rdflib.URIRef("file:///tmp/images.n3")
+    shape = rdflib.URIRef("http://example.org/shapes#input")
+    focus_node = rdflib.URIRef("file:///tmp/input.n3")
+    shapes.add((rdflib.URIRef("#images"), REASON.source, rule))
+    shapes.add((rdflib.URIRef("#images"), rdflib.RDF.predicate, shape))
+    shapes.add((shape, rdflib.RDF.type, SHACL.NodeShape))
+    shapes.add((shape, SHACL.targetNode, focus_node))
+
+    return request, shapes, rule
+
+
+def time_per_call(function, repetitions):
+    """Return the fastest of three averages over `repetitions` calls of `function`."""
+
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repetitions):
+            function()
+        timings.append((time.perf_counter() - start) / repetitions)
+
+    return min(timings)
+
+
+def benchmark_queries(repetitions=100):
+    """Time each fixed query parsed per call against its faster replacement.
+
+    Return a dictionary mapping each case to the seconds per call of the `adhoc`
+    variant and of its `prepared` (or index-walking) replacement.
+    """
+
+    request, shapes, rule = query_graphs()
+    namespaces = dict(NAMESPACE_MANAGER.namespaces())
+
+    def adhoc(graph, text):
+        return lambda: list(graph.query(text, initNs=namespaces))
+
+    def prepared(graph, name, **bindings):
+        return lambda: list(query(graph, name, **bindings))
+
+    header_query = (
+        "SELECT ?fieldName ?fieldValue "
+        "WHERE { "
+        "?r http:headers ?h ."
+        "?h http:fieldName ?fieldName ."
+        "?h http:fieldValue ?fieldValue ."
+        "}"
+    )
+
+    def walk_headers():
+        return [
+            (k, v)
+            for h in request.objects(None, HTTP.headers)
+            for k in request.objects(h, HTTP.fieldName)
+            for v in request.objects(h, HTTP.fieldValue)
+        ]
+
+    shapes_query = (
+        "SELECT ?s ?p ?o "
+        "WHERE { ?s ?p ?o . ?s rdf:type sh:NodeShape . ?s sh:targetNode ?o . }"
+    )
+
+    def walk_shapes():
+        return [
+            (s, p, o)
+            for s in shapes.subjects(rdflib.RDF.type, SHACL.NodeShape)
+            for o in shapes.objects(s, SHACL.targetNode)
+            for p in shapes.predicates(s, o)
+        ]
+
+    cases = {
+        "request": (
+            adhoc(request, QUERIES["request"]),
+            prepared(request, "request"),
+        ),
+        "shapes_of_rule": (
+            adhoc(shapes, QUERIES["shapes_of_rule"].replace("?rule", rule.n3())),
+            prepared(shapes, "shapes_of_rule", rule=rule),
+        ),
+        "node_shapes": (
+            adhoc(shapes, QUERIES["node_shapes"]),
+            prepared(shapes, "node_shapes"),
+        ),
+        "headers": (adhoc(request, header_query), walk_headers),
+        "shapes_in_rule": (adhoc(shapes, shapes_query), walk_shapes),
+    }
+
+    results = {}
+    for case, (before, after) in cases.items():
+        after()  # prepare the query outside of the measurement
+        results[case] = {
+            "adhoc": time_per_call(before, repetitions),
+            "prepared": time_per_call(after, repetitions),
+        }
+        logger.info(
+            f"{case}: {results[case]['adhoc'] * 1e6:.0f}µs -> "
+            f"{results[case]['prepared'] * 1e6:.0f}µs per call"
+        )
+
+    return results
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Cache proofs under a hash of everything the reasoner was given."""
+
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from loguru import logger
+
+
+def hash_files(directory, filenames):
+    """Hash the names and contents of `filenames` in `directory`."""
+
+    digest = hashlib.sha256()
+    for filename in filenames:
+        digest.update(filename.encode())
+        with open(os.path.join(directory, filename), "rb") as fp:
+            digest.update(hashlib.sha256(fp.read()).digest())
+
+    return digest.hexdigest()
+
+
+class ProofCache(object):
+    """Content-addressed proofs, held in an in-memory LRU and optionally on disk.
+
+    The disk cache stores one file per proof and evicts the least recently used
+    files once their total size exceeds `max_bytes`.
+    """
+
+    def __init__(self, directory=None, max_bytes=256 * 2**20, max_entries=64):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self.size = 0
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            self.size = sum(os.path.getsize(path) for path, _ in self._entries())
+
+    @staticmethod
+    def key(tmp_dir, input_files, agent_goal, options):
+        """Hash names and contents of all input files, the goal and the options."""
+
+        digest = hashlib.sha256()
+        digest.update(hash_files(tmp_dir, list(input_files) + [agent_goal]).encode())
+        for option in options:
+            digest.update(str(option).encode())
+
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.n3")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for file in files:
+                path = os.path.join(root, file)
+                yield path, os.path.getmtime(path)
+
+    def get(self, key):
+        """Return the cached proof for `key` or `None`."""
+
+        with self.lock:
+            content = self.memory.get(key)
+            if content is not None:
+                self.memory.move_to_end(key)
+            elif self.directory is not None and os.path.isfile(self._path(key)):
+                with open(self._path(key)) as fp:
+                    content = fp.read()
+                os.utime(self._path(key))  # mark as recently used
+                self._remember(key, content)
+
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        logger.log(
+            "DETAIL",
+            f"Proof cache {'hit' if content is not None else 'miss'} "
+            f"({self.hits} hits, {self.misses} misses)",
+        )
+        return content
+
+    def put(self, key, content):
+        """Store `content` as proof for `key`."""
+
+        with self.lock:
+            self._remember(key, content)
+
+            if self.directory is not None:
+                path = self._path(key)
+                if os.path.isfile(path):
+                    self.size -= os.path.getsize(path)
+
+                # Write atomically, since the directory may be shared by processes
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(f"{path}.{os.getpid()}.tmp", "w") as fp:
+                    fp.write(content)
+                os.replace(f"{path}.{os.getpid()}.tmp", path)
+                self.size += os.path.getsize(path)
+
+                if self.size > self.max_bytes:
+                    self._evict()
+
+    def _remember(self, key, content):
+        self.memory[key] = content
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def _evict(self):
+        for path, _ in sorted(self._entries(), key=lambda entry: entry[1]):
+            if self.size <= self.max_bytes:
+                break
+
+            logger.debug(f"Evicting '{path}' from the proof cache...")
+            self.size -= os.path.getsize(path)
+            os.remove(path)
+
+
+# The cache is shared by all proofs generated within one process
+PROOF_CACHE = None
+PROOF_CACHE_LOCK = threading.Lock()
+
+
+def get_proof_cache():
+    """Return the proof cache configured through ENVVARs; `None` if disabled."""
+
+    if os.getenv("EYE_CACHE", "1") in ["0", "false", "no"]:
+        return None
+
+    with PROOF_CACHE_LOCK:
+        if PROOF_CACHE is None:
+            set_proof_cache_dir(os.getenv("EYE_CACHE_DIR"))
+
+    return PROOF_CACHE
+
+
+def set_proof_cache_dir(directory):
+    """Store the proofs of this process in `directory` rather than `EYE_CACHE_DIR`."""
+
+    global PROOF_CACHE
+
+    PROOF_CACHE = ProofCache(
+        directory=directory,
+        max_bytes=int(os.getenv("EYE_CACHE_SIZE", str(256 * 2**20))),
+        max_entries=int(os.getenv("EYE_CACHE_ENTRIES", "64")),
+    )
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Parse each RESTdesc rule once and index it for lookups in constant time.
+
+The PPA repeatedly asks which rule a statement in a proof stems from, which rules
+need user input and which rules may produce a statement. Answering these questions
+by iterating over (and parsing) every file in R does not scale to API ecosystems with
+thousands of rules; the `RuleCatalog` answers them with dictionary lookups.
+"""
+
+
+import os
+import re
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+import rdflib
+from loguru import logger
+from rdflib.graph import QuotedGraph
+from rdflib.namespace import RDF
+
+from .namespaces import LOG, NAMESPACE_MANAGER, SHACL
+
+# Matches any predicate; used for triple patterns with a variable as predicate
+ANY = "*"
+
+
+def pattern_keys(formula):
+    """Return the predicates used in the triple patterns of `formula`.
+
+    Statements about the type of something are distinguished by the class, if known.
+    """
+
+    keys = set()
+    for s, p, o in formula:
+        if isinstance(p, (rdflib.Variable, rdflib.BNode)):
+            keys.add(ANY)
+        elif p == RDF.type and isinstance(o, rdflib.URIRef):
+            keys.add((p, o))
+        else:
+            keys.add(p)
+
+    return frozenset(keys)
+
+
+def keys_match(a, b):
+    """Whether a statement matching key `a` may also match key `b`."""
+
+    if a == ANY or b == ANY or a == b:
+        return True
+
+    # `rdf:type` of an unknown class may match `rdf:type` of any class
+    if isinstance(a, tuple) != isinstance(b, tuple):
+        predicate_a = a[0] if isinstance(a, tuple) else a
+        predicate_b = b[0] if isinstance(b, tuple) else b
+        return predicate_a == predicate_b
+
+    return False
+
+
+@lru_cache(maxsize=1024)
+def parse_rule_dependencies(text):
+    """Return `(premises, conclusions)` as sets of keys for each rule in `text`."""
+
+    graph = rdflib.Graph()
+    graph.parse(data=text, format="n3")
+
+    rules = []
+    for premise, _, conclusion in graph.triples((None, LOG.implies, None)):
+        if isinstance(premise, QuotedGraph) and isinstance(conclusion, QuotedGraph):
+            rules.append((pattern_keys(premise), pattern_keys(conclusion)))
+
+    return tuple(rules)
+
+
+@lru_cache(maxsize=1024)
+def find_shapes_in_rule(rule_text):
+    """Return the shapes and their target nodes stated in the postcondition of a rule.
+
+    The result only depends on the text of the rule, so it is computed once per
+    process for all problems that share the same RESTdesc descriptions.
+    """
+
+    # Load the facts specified as postcondition; i.e. assume the request succeeds
+    graph = rdflib.Graph()
+    graph.namespace_manager = NAMESPACE_MANAGER
+
+    # -> Extract prefix declarations
+    prefixes_regex = re.compile(
+        r"^(?P<prefix>@prefix) (?P<abbrv>[\w-]*:) (?P<url><[\w\d:\/\.#-]+>) *\.$",
+        re.MULTILINE,
+    )
+
+    prefixes_all = ""
+    for p, c, l in prefixes_regex.findall(rule_text):
+        prefixes_all += f"{p} {c} {l} .\n"
+
+    # -> Extract http-request and postcondition as `implication`
+    rule_regex = re.compile(
+        r"(?P<precondition>{[.\n\s_:?\w\";\/\[\]]*})\n*=>\n*"
+        + r"{(?P<implication>[.\n\s_:?\w\";\/\[\]-]*\n*)}\s*\."
+    )
+
+    match = rule_regex.search(rule_text)
+    if match is None:
+        return ()  # e.g. background knowledge without any rules
+    implication = match.group("implication")
+
+    # -> Parse postcondition; prefixes added to make document valid
+    graph.parse(data=f"{prefixes_all}\n{implication}", format="n3")
+
+    # Identify shapes and their target nodes by walking the indices of the graph;
+    # equivalent to `?s ?p ?o. ?s rdf:type sh:NodeShape. ?s sh:targetNode ?o.`
+    return tuple(
+        (s, p, o)
+        for s in graph.subjects(RDF.type, SHACL.NodeShape)
+        for o in graph.objects(s, SHACL.targetNode)
+        for p in graph.predicates(s, o)
+    )
+
+
+class Rule(object):
+    """The rules stated in one file of R, parsed once."""
+
+    def __init__(self, filename, text):
+        self.filename = filename
+        self.text = text
+
+        try:
+            self.dependencies = parse_rule_dependencies(text)
+        except Exception as e:
+            logger.warning(
+                f"Cannot parse '{filename}' into premises/conclusions: {e!r}"
+            )
+            self.dependencies = None
+
+        try:
+            self.shapes = find_shapes_in_rule(text)
+        except Exception as e:
+            logger.warning(f"Cannot search '{filename}' for shapes: {e!r}")
+            self.shapes = ()
+
+    @property
+    def premises(self):
+        return frozenset().union(*(p for p, _ in self.dependencies or []))
+
+    @property
+    def conclusions(self):
+        return frozenset().union(*(c for _, c in self.dependencies or []))
+
+
+# Rules parsed by another process, by their text (see `share_rules()`)
+SHARED_RULES = {}
+
+
+def share_rules(rules):
+    """Let the catalogs of this process reuse `rules` parsed by another process."""
+
+    SHARED_RULES.update((rule.text, rule) for rule in rules)
+
+
+class RuleCatalog(object):
+    """The rules in a directory, indexed by source IRI, predicates and target nodes.
+
+    Rules are identified by their file name. A proof refers to a rule by the IRI of
+    the file it was loaded from, which is `file://<prefix>/<file name>` with `prefix`
+    being the directory as seen by the reasoner. Files are parsed again only if they
+    were modified since being added.
+    """
+
+    def __init__(self, directory, prefix=None):
+        self.directory = directory
+        self.prefix = prefix
+
+        self.rules = {}  # file name -> `Rule`
+        self.signatures = {}  # file name -> (modification time, size)
+        self.by_source = {}  # source IRI -> file name
+        self.by_premise = defaultdict(set)  # key -> file names
+        self.by_premise_type = defaultdict(set)  # rdf:type -> file names
+        self.by_conclusion = defaultdict(set)  # key -> file names
+        self.by_conclusion_type = defaultdict(set)  # rdf:type -> file names
+        self.by_target_node = {}  # IRI of user input -> file name
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __contains__(self, filename):
+        return filename in self.rules
+
+    def __getitem__(self, filename):
+        return self.rules[filename]
+
+    def source_iris(self, filename):
+        """Return the IRIs by which a proof may refer to a file."""
+
+        iris = [f"file://{os.path.join(self.directory, filename)}"]
+        if self.prefix is not None:
+            iris.append(f"file://{self.prefix}/{os.path.basename(filename)}")
+
+        return iris
+
+    def add(self, filename):
+        """Parse and index a file unless it is indexed already; return its `Rule`."""
+
+        path = os.path.join(self.directory, filename)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if self.signatures.get(filename) == signature:
+            return self.rules[filename]
+
+        if filename in self.rules:
+            self._unindex(self.rules[filename])
+
+        with open(path) as fp:
+            text = fp.read()
+
+        rule = SHARED_RULES.get(text)
+        if rule is None or rule.filename != filename:
+            rule = Rule(filename, text)
+
+        self.rules[filename] = rule
+        self.signatures[filename] = signature
+        self._index(rule)
+
+        return rule
+
+    def extend(self, filenames):
+        """Add all `filenames`; return their rules."""
+
+        return [self.add(filename) for filename in filenames]
+
+    def discard(self, filename):
+        """Forget a file, e.g. after it was removed; return its `Rule`, if any."""
+
+        rule = self.rules.pop(filename, None)
+        self.signatures.pop(filename, None)
+        if rule is not None:
+            self._unindex(rule)
+
+        return rule
+
+    def _keys(self, rule):
+        for key in rule.premises:
+            yield self.by_premise, key
+            if isinstance(key, tuple):
+                yield self.by_premise_type, key[0]
+        for key in rule.conclusions:
+            yield self.by_conclusion, key
+            if isinstance(key, tuple):
+                yield self.by_conclusion_type, key[0]
+
+    def _index(self, rule):
+        for iri in self.source_iris(rule.filename):
+            self.by_source[iri] = rule.filename
+
+        for index, key in self._keys(rule):
+            index[key].add(rule.filename)
+
+        for _, _, target in rule.shapes:
+            self.by_target_node[self.target_node(target)] = rule.filename
+
+    def _unindex(self, rule):
+        for iri in self.source_iris(rule.filename):
+            if self.by_source.get(iri) == rule.filename:
+                del self.by_source[iri]
+
+        for index, key in self._keys(rule):
+            index[key].discard(rule.filename)
+
+        for _, _, target in rule.shapes:
+            self.by_target_node.pop(self.target_node(target), None)
+
+    def target_node(self, target):
+        """Return the IRI of the file which will contain the user input `target`."""
+
+        return f"file://{os.path.join(self.directory, target.toPython())}.n3"
+
+    def lookup(self, source):
+        """Return the `Rule` loaded from the IRI `source`; `None` if unknown."""
+
+        filename = self.by_source.get(str(source))
+        return None if filename is None else self.rules[filename]
+
+    def requiring_input(self, target_node):
+        """Return the `Rule` stating a shape for user input `target_node`, if any."""
+
+        filename = self.by_target_node.get(str(target_node))
+        return None if filename is None else self.rules[filename]
+
+    def consumers(self, key):
+        """Return the file names of rules with a premise that may match `key`."""
+
+        return self._matching(self.by_premise, self.by_premise_type, key)
+
+    def producers(self, key):
+        """Return the file names of rules with a conclusion that may match `key`."""
+
+        return self._matching(self.by_conclusion, self.by_conclusion_type, key)
+
+    def _matching(self, index, by_type, key):
+        # See `keys_match()` for which keys match
+        if key == ANY:
+            return set(self.rules)
+
+        matching = set(index.get(ANY, ())) | index.get(key, set())
+        if isinstance(key, tuple):
+            matching |= index.get(key[0], set())
+        else:
+            matching |= by_type.get(key, set())
+
+        return matching
+
+
+# Catalogs are shared by all steps of the PPA working in the same directory
+RULE_CATALOGS = {}
+RULE_CATALOGS_LOCK = threading.Lock()
+
+
+def get_rule_catalog(directory, prefix=None):
+    """Return the catalog of the rules in `directory`, creating it if necessary."""
+
+    key = (os.path.abspath(directory), prefix)
+    with RULE_CATALOGS_LOCK:
+        if key not in RULE_CATALOGS:
+            RULE_CATALOGS[key] = RuleCatalog(directory, prefix)
+
+        return RULE_CATALOGS[key]
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Send all HTTP requests of the agent through one pooled, retrying session."""
+
+
+import os
+import threading
+from urllib.parse import urlparse
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .httpcache import get_http_cache
+
+# Methods that may be repeated safely if a request fails
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"])
+
+
+class HttpClient(object):
+    """A `requests.Session` with connection pooling, retries and per-origin limits.
+
+    Connections are kept alive and reused for all requests to the same origin. Failed
+    idempotent requests are retried with exponential backoff; at most
+    `max_per_origin` requests are in flight to any single origin. A request sent with
+    `stream=True` counts until its response body was read or the response closed.
+    Responses to GET and OPTIONS requests are served from/stored in `cache`, if given.
+    """
+
+    def __init__(
+        self,
+        pool_size=10,
+        retries=3,
+        backoff_factor=0.3,
+        max_per_origin=4,
+        timeout=None,
+        cache=None,
+    ):
+        self.max_per_origin = max_per_origin
+        self.timeout = timeout
+        self.cache = cache
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[429, 502, 503, 504],
+            allowed_methods=IDEMPOTENT_METHODS,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=max(pool_size, max_per_origin),
+            max_retries=retry,
+        )
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.lock = threading.Lock()
+        self.semaphores = {}
+
+    def _semaphore(self, url):
+        origin = urlparse(url).netloc
+        with self.lock:
+            if origin not in self.semaphores:
+                self.semaphores[origin] = threading.BoundedSemaphore(
+                    self.max_per_origin
+                )
+
+            return self.semaphores[origin]
+
+    def send(self, request_object, **kwargs):
+        """Send a `requests.Request` and return the response."""
+
+        prepared = request_object.prepare()
+        kwargs.setdefault("timeout", self.timeout)
+
+        semaphore = self._semaphore(prepared.url)
+        semaphore.acquire()
+        try:
+            if self.cache is not None:
+                response = self.cache.send(self.session, prepared, **kwargs)
+            else:
+                response = self.session.send(prepared, **kwargs)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        # The connection of a streamed response is only released with the response
+        connection = getattr(response.raw, "connection", None)
+        if not kwargs.get("stream") or connection is None:
+            semaphore.release()
+            return response
+
+        release_conn = response.raw.release_conn
+
+        released = []
+
+        def release():
+            release_conn()
+            with self.lock:
+                if released:
+                    return
+                released.append(True)
+            semaphore.release()
+
+        response.raw.release_conn = release
+        return response
+
+    def request(self, method, url, **kwargs):
+        """Send a request like `requests.request()` does."""
+
+        send_kwargs = {
+            key: kwargs.pop(key) for key in ["timeout", "stream"] if key in kwargs
+        }
+
+        return self.send(requests.Request(method, url, **kwargs), **send_kwargs)
+
+    def options(self, url, **kwargs):
+        return self.request("OPTIONS", url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+# The client is shared by discovery and execution within one process
+HTTP_CLIENT = None
+HTTP_CLIENT_LOCK = threading.Lock()
+
+
+def get_http_client():
+    """Return the HTTP client configured through ENVVARs."""
+
+    global HTTP_CLIENT
+
+    with HTTP_CLIENT_LOCK:
+        if HTTP_CLIENT is None:
+            timeout = os.getenv("AGENT_HTTP_TIMEOUT")
+            HTTP_CLIENT = HttpClient(
+                pool_size=int(os.getenv("AGENT_HTTP_POOL_SIZE", "10")),
+                retries=int(os.getenv("AGENT_HTTP_RETRIES", "3")),
+                backoff_factor=float(os.getenv("AGENT_HTTP_BACKOFF", "0.3")),
+                max_per_origin=int(os.getenv("AGENT_HTTP_MAX_PER_ORIGIN", "4")),
+                timeout=float(timeout) if timeout else None,
+                cache=get_http_cache(),
+            )
+            logger.debug("Created HTTP client shared by discovery and execution")
+
+    return HTTP_CLIENT
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Estimate the cost of ground requests to decide which ones to send first."""
+
+
+import json
+import os
+import re
+import threading
+from urllib.parse import urlparse
+
+from loguru import logger
+
+from .namespaces import PPA
+
+# Annotation in a RESTdesc description, e.g. `?request ppa:expectedDuration 30.`
+ANNOTATION_REGEX = re.compile(
+    r"(?:ppa:|<"
+    + re.escape(str(PPA))
+    + r")expectedDuration>?\s+\"?(?P<seconds>\d+(?:\.\d+)?)"
+)
+
+
+def request_origin(request_object):
+    """Return scheme and host of the request URL, e.g. `http://localhost:3000`."""
+
+    url = urlparse(request_object.url)
+
+    return f"{url.scheme}://{url.netloc}"
+
+
+class CostModel(object):
+    """Expected duration of requests per origin and rule, learned from past runs.
+
+    Observed durations are smoothed by an exponentially weighted moving average and
+    stored as JSON in `path`. For requests never observed before, a duration annotated
+    in the RESTdesc description is used; else the average duration of all requests to
+    the same origin; else `default`.
+    """
+
+    def __init__(self, path=None, alpha=0.3, default=1.0):
+        self.path = path
+        self.alpha = alpha
+        self.default = default
+
+        self.lock = threading.Lock()
+        self.stats = {}  # "<origin> <rule>" -> {"ewma": seconds, "n": observations}
+        self.annotations = {}  # (path, mtime) -> seconds or `None`
+
+        if self.path is not None and os.path.isfile(self.path):
+            with open(self.path) as fp:
+                self.stats = json.load(fp)
+
+    @staticmethod
+    def key(origin, rule):
+        return f"{origin} {os.path.basename(rule)}"
+
+    def observe(self, origin, rule, seconds):
+        """Account for a request that took `seconds` to complete."""
+
+        key = self.key(origin, rule)
+        with self.lock:
+            entry = self.stats.get(key)
+            if entry is None:
+                self.stats[key] = {"ewma": seconds, "n": 1}
+            else:
+                entry["ewma"] += self.alpha * (seconds - entry["ewma"])
+                entry["n"] += 1
+
+        logger.log("DETAIL", f"{key} took {seconds:.3f}s")
+
+    def annotated_duration(self, path):
+        """Return the duration annotated in the RESTdesc description at `path`."""
+
+        try:
+            version = (path, os.path.getmtime(path))
+        except OSError:
+            return None
+
+        if version not in self.annotations:
+            with open(path) as fp:
+                match = ANNOTATION_REGEX.search(fp.read())
+            self.annotations[version] = (
+                float(match.group("seconds")) if match is not None else None
+            )
+
+        return self.annotations[version]
+
+    def expected_duration(self, origin, rule, directory=""):
+        """Estimate how many seconds a request to `origin` derived from `rule` takes."""
+
+        with self.lock:
+            entry = self.stats.get(self.key(origin, rule))
+            if entry is not None:
+                return entry["ewma"]
+
+            annotated = self.annotated_duration(os.path.join(directory, rule))
+            if annotated is not None:
+                return annotated
+
+            same_origin = [
+                entry["ewma"]
+                for key, entry in self.stats.items()
+                if key.split(" ")[0] == origin
+            ]
+
+        if len(same_origin) > 0:
+            return sum(same_origin) / len(same_origin)
+
+        return self.default
+
+    def save(self):
+        """Write the statistics atomically to `path`."""
+
+        if self.path is None:
+            return
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self.lock:
+            with open(f"{self.path}.tmp", "w") as fp:
+                json.dump(self.stats, fp, indent=2, sort_keys=True)
+            os.replace(f"{self.path}.tmp", self.path)
+
+
+# The statistics are shared by all runs within one process
+COST_MODEL = None
+COST_MODEL_LOCK = threading.Lock()
+
+
+def get_cost_model():
+    """Return the cost model backed by the file configured through ENVVARs."""
+
+    global COST_MODEL
+
+    with COST_MODEL_LOCK:
+        if COST_MODEL is None:
+            path = os.getenv(
+                "AGENT_LATENCY_STATS",
+                os.path.join(
+                    os.getenv("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+                    "pragmatic-proof-agent",
+                    "latency.json",
+                ),
+            )
+            COST_MODEL = CostModel(path if path != "" else None)
+
+    return COST_MODEL
+
+
+# Strategies for selecting ground requests
+def select_first(ground_requests, cost_model, directory):
+    """Keep the order in which the requests were found in the proof."""
+
+    return list(ground_requests)
+
+
+def select_cheapest(ground_requests, cost_model, directory):
+    """Order requests by their expected duration, the fastest first.
+
+    All API operations in the proof have to be executed to reach the goal, unless a
+    later proof finds a way around some of them. Sending the fastest requests first
+    thus yields new knowledge soonest and postpones slow operations that might turn
+    out to be unnecessary; within one batch of concurrent requests, it avoids waiting
+    for a slow request while faster ones could have been sent in its place.
+    """
+
+    def expected_duration(ground_request):
+        r, request_object = ground_request
+        return cost_model.expected_duration(
+            request_origin(request_object), r, directory
+        )
+
+    return sorted(ground_requests, key=expected_duration)  # stable for equal cost
+
+
+STRATEGIES = {
+    "first": select_first,
+    "cost": select_cheapest,
+}
+
+
+def get_selection_strategy(name=None):
+    """Return the strategy named `name` or in ENVVAR `AGENT_SELECTION_STRATEGY`."""
+
+    if name is None:
+        name = os.getenv("AGENT_SELECTION_STRATEGY", "cost")
+
+    if name not in STRATEGIES:
+        raise ValueError(
+            f"Unknown selection strategy '{name}', choose one of {list(STRATEGIES)}"
+        )
+
+    return STRATEGIES[name]
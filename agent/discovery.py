@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Discover RESTdesc descriptions and keep them in an on-disk catalog of rules.
+
+The descriptions of all paths are requested concurrently. Each rule is stored in a
+separate file, such that omitting a rule from evaluation becomes trivial. The catalog
+(`catalog.json` next to the rules) records file, hash and source of each rule; rules
+that did not change since the previous discovery are not written again.
+"""
+
+
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from .client import get_http_client
+
+# The file in which the catalog is stored within the directory of the rules
+CATALOG = "catalog.json"
+
+# Tokens of the N3 syntax relevant for splitting a document into statements
+N3_TOKENS = re.compile(
+    r"""
+    (?P<space>\s+)
+    |(?P<comment>\#[^\n]*)
+    |(?P<string>\"\"\"(?:[^"\\]|\\.|"(?!""))*\"\"\"
+        |'''(?:[^'\\]|\\.|'(?!''))*'''
+        |"(?:[^"\\\n]|\\.)*"
+        |'(?:[^'\\\n]|\\.)*')
+    |(?P<iri><[^<>"{}|^`\\\s]*>)
+    |(?P<punctuation>=>|<=|[{}\[\]();,.])
+    |(?P<name>(?:[^\s{}\[\]();,.<>"'\#]|\.(?=[^\s{}\[\]();,.<>"'\#]))+)
+    """,
+    re.VERBOSE,
+)
+OPENING = "{[("
+CLOSING = "}])"
+DIRECTIVES = ("@prefix", "@base", "prefix", "base")
+
+
+def tokenize_n3(text):
+    """Yield `(kind, token, start)` for all tokens in `text` but whitespace/comments.
+
+    The tokenizer is a single left-to-right pass and thus scales linearly with the
+    size of the document.
+    """
+
+    position = 0
+    while position < len(text):
+        match = N3_TOKENS.match(text, position)
+        if match is None:
+            raise ValueError(
+                f"Unexpected character {text[position]!r} at position {position}"
+            )
+
+        if match.lastgroup not in ["space", "comment"]:
+            yield match.lastgroup, match.group(), position
+        position = match.end()
+
+
+def split_statements(text):
+    """Yield the text of each top-level statement and whether it is a rule.
+
+    Directives like `@prefix` are statements, too; SPARQL-style `PREFIX`-directives
+    do not end with a period but with the IRI of the namespace.
+    """
+
+    depth = 0
+    start = None
+    is_rule = False
+    sparql_directive = None  # tokens still expected of a `PREFIX`-directive
+
+    for kind, token, position in tokenize_n3(text):
+        if start is None:
+            start = position
+            is_rule = False
+            if kind == "name" and token.upper() in ["PREFIX", "BASE"]:
+                sparql_directive = 2 if token.upper() == "PREFIX" else 1
+                continue
+
+        if sparql_directive is not None:
+            sparql_directive -= 1
+            if sparql_directive == 0:
+                yield text[start : position + len(token)], False
+                start = None
+                sparql_directive = None
+            continue
+
+        if token in OPENING and kind == "punctuation":
+            depth += 1
+        elif token in CLOSING and kind == "punctuation":
+            depth -= 1
+        elif depth == 0 and token in ["=>", "<="]:
+            is_rule = True
+        elif depth == 0 and token == ".":
+            yield text[start : position + 1], is_rule
+            start = None
+
+    if start is not None:
+        logger.warning(f"Ignoring incomplete statement {text[start:][:80]!r}")
+
+
+def split_restdesc(text):
+    """Return the directives of a RESTdesc description and the text of each rule."""
+
+    directives = []
+    rules = []
+    for statement, is_rule in split_statements(text):
+        if is_rule:
+            rules.append(statement)
+        elif statement.lstrip().lower().startswith(DIRECTIVES):
+            statement = statement.strip()
+            if not statement.startswith("@"):
+                # Not all parsers support SPARQL-style directives; rewrite them
+                keyword, rest = statement.split(maxsplit=1)
+                statement = f"@{keyword.lower()} {rest}."
+            directives.append(statement)
+
+    return "\n".join(directives), rules
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def read_catalog(directory):
+    """Return the catalog stored in `directory`; empty if there is none."""
+
+    try:
+        with open(os.path.join(directory, CATALOG)) as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_catalog(directory, catalog):
+    path = os.path.join(directory, CATALOG)
+    with open(f"{path}.{os.getpid()}.tmp", "w") as fp:
+        json.dump(catalog, fp, indent=2, sort_keys=True)
+    os.replace(f"{path}.{os.getpid()}.tmp", path)
+
+
+def update_catalog(directory, rules):
+    """Store the rules in `directory` unless unchanged; update the catalog.
+
+    `rules` is a list of `(rule_id, text, source)`. Files of rules that vanished are
+    removed. Return the file names of all rules, in the order given.
+    """
+
+    previous = read_catalog(directory)
+
+    catalog = {}
+    n_changed = 0
+    for rule_id, text, source in rules:
+        filename = f"{rule_id}.n3"
+        path = os.path.join(directory, filename)
+        digest = content_hash(text)
+        entry = previous.get(rule_id)
+
+        if entry is None or entry["hash"] != digest or not os.path.isfile(path):
+            logger.debug(f"Saving RESTdesc rule as '{filename}'...")
+            with open(path, "w") as fp:
+                fp.write(text)
+            n_changed += 1
+
+        catalog[rule_id] = {"file": filename, "hash": digest, "source": source}
+
+    for rule_id, entry in previous.items():
+        if rule_id not in catalog:
+            logger.debug(f"Removing vanished RESTdesc rule '{entry['file']}'...")
+            path = os.path.join(directory, entry["file"])
+            if os.path.isfile(path):
+                os.remove(path)
+
+    write_catalog(directory, catalog)
+    logger.info(
+        f"Catalog contains {len(catalog)} rules; {n_changed} new or changed, "
+        f"{len(set(previous) - set(catalog))} removed"
+    )
+
+    return [entry["file"] for entry in catalog.values()]
+
+
+def fetch_restdesc(url, content_type="text/n3"):
+    """Request the RESTdesc description of `url`; `None` if there is none."""
+
+    logger.log("REQUEST", f"OPTIONS {url}")
+    r = get_http_client().options(url, headers={"accept": content_type})
+
+    if r.text == "" or r.status_code == 501:
+        return None
+
+    return r.text
+
+
+def discover_restdesc(origin, paths, directory, content_type="text/n3"):
+    """Download the RESTdesc descriptions of all `paths` concurrently.
+
+    The description of the root path `/` is split into one file per rule, named
+    `rule_<hash>.n3` after its content, such that a rule keeps its name when others
+    are added or removed; those of other paths are stored as a whole, named after the
+    path. Return the file names of all rules.
+    """
+
+    urls = [f"{origin}{path}" for path in paths]
+    with ThreadPoolExecutor(max_workers=max(len(urls), 1)) as executor:
+        descriptions = list(
+            executor.map(lambda url: fetch_restdesc(url, content_type), urls)
+        )
+
+    rules = []
+    for path, url, restdesc in zip(paths, urls, descriptions):
+        if restdesc is None:
+            logger.warning(f"RESTdesc for path '{path}' is empty/does not exist")
+        elif path == "/":
+            directives, texts = split_restdesc(restdesc)
+            for text in texts:
+                text = f"{directives}\n\n{text}\n"
+                rules.append((f"rule_{content_hash(text)[:12]}", text, url))
+        else:
+            rule_id = "_".join(path.replace("_", "x").split("/")[1:])
+            rules.append((rule_id, restdesc, url))
+
+    return update_catalog(directory, rules)
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Cache responses to GET and OPTIONS requests on disk, honouring HTTP caching rules.
+
+Responses are stored if they carry validators (`ETag`, `Last-Modified`) or explicit
+freshness information (`Cache-Control: max-age`, `Expires`). Fresh responses are
+served without contacting the server; stale ones are revalidated using conditional
+requests, such that an unchanged resource only costs a `304 Not Modified`. A
+successful request with an unsafe method (e.g. POST, PUT or DELETE) invalidates
+all responses stored for its URL and the URLs in `Location`/`Content-Location`.
+"""
+
+
+import datetime
+import email.utils
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urljoin, urlparse
+
+import requests
+from loguru import logger
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# The methods and status codes for which responses are stored
+CACHEABLE_METHODS = frozenset(["GET", "OPTIONS"])
+CACHEABLE_STATUS_CODES = frozenset([200, 203, 204, 300, 301, 404, 405, 410, 501])
+
+# The methods that don't modify resources (see RFC 9110, section 9.2.1)
+SAFE_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "TRACE"])
+
+# Headers not stored since bodies are stored decoded
+STORED_ENCODING_HEADERS = frozenset(
+    ["content-encoding", "content-length", "transfer-encoding"]
+)
+
+# Size of the chunks in which response bodies are written to disk
+CHUNK_SIZE = 64 * 1024
+
+
+def cache_control(headers):
+    """Parse the directives of a `Cache-Control`-header into a dictionary."""
+
+    directives = {}
+    for directive in headers.get("cache-control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name != "":
+            directives[name.lower()] = value.strip('"')
+
+    return directives
+
+
+def parse_http_date(value):
+    """Return an HTTP date as POSIX timestamp; `None` if it is invalid."""
+
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpCache(object):
+    """Responses stored on disk, keyed by method, URL and `Accept`-header.
+
+    Each entry consists of a JSON file holding status and headers and a file holding
+    the body; all entries for one URL share a directory. The least recently used entries are evicted once the total size of all
+    files exceeds `max_bytes`.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.size = sum(size for _, _, size in self._entries())
+
+    @staticmethod
+    def key(method, url, accept):
+        """Hash the URL and, below that, method and the media types accepted."""
+
+        return "/".join(
+            hashlib.sha256(text.encode()).hexdigest()
+            for text in [url, f"{method}\n{accept or ''}"]
+        )
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _entries(self, directory=None):
+        for root, _, files in os.walk(directory or self.directory):
+            for file in files:
+                if file.endswith(".json"):
+                    path = os.path.join(root, file[: -len(".json")])
+                    yield path, os.path.getmtime(f"{path}.json"), self._size(path)
+
+    @staticmethod
+    def _size(path):
+        return sum(
+            os.path.getsize(f"{path}{suffix}")
+            for suffix in [".json", ".body"]
+            if os.path.isfile(f"{path}{suffix}")
+        )
+
+    @staticmethod
+    def storable(response):
+        """Tell whether `response` may and is worth being stored."""
+
+        directives = cache_control(response.headers)
+        informative = "max-age" in directives or any(
+            name in response.headers for name in ["etag", "last-modified", "expires"]
+        )
+
+        return (
+            response.request.method in CACHEABLE_METHODS
+            and response.status_code in CACHEABLE_STATUS_CODES
+            and "no-store" not in directives
+            and "no-store" not in cache_control(response.request.headers)
+            and response.headers.get("vary", "").strip() != "*"
+            and informative
+        )
+
+    @staticmethod
+    def is_fresh(entry):
+        """Tell whether a stored response may be used without revalidating it."""
+
+        headers = CaseInsensitiveDict(entry["headers"])
+        directives = cache_control(headers)
+        if "no-cache" in directives:
+            return False
+
+        if "max-age" in directives:
+            try:
+                lifetime = int(directives["max-age"])
+            except ValueError:
+                return False
+        elif "expires" in headers:
+            expires = parse_http_date(headers["expires"])
+            date = parse_http_date(headers.get("date", "")) or entry["stored"]
+            if expires is None:
+                return False
+            lifetime = expires - date
+        else:
+            return False
+
+        try:
+            age = int(headers.get("age", "0"))
+        except ValueError:
+            age = 0
+
+        return age + (time.time() - entry["stored"]) < lifetime
+
+    @staticmethod
+    def validators(entry):
+        """Return the headers that make a request conditional on the stored entry."""
+
+        headers = CaseInsensitiveDict(entry["headers"])
+        conditions = {}
+        if "etag" in headers:
+            conditions["if-none-match"] = headers["etag"]
+        if "last-modified" in headers:
+            conditions["if-modified-since"] = headers["last-modified"]
+
+        return conditions
+
+    def get(self, prepared):
+        """Return the entry stored for the prepared request or `None`."""
+
+        key = self.key(prepared.method, prepared.url, prepared.headers.get("accept"))
+        path = self._path(key)
+
+        try:
+            with open(f"{path}.json") as fp:
+                entry = json.load(fp)
+            os.utime(f"{path}.json")  # mark as recently used
+        except (OSError, ValueError):
+            return None
+
+        entry["key"] = key
+        return entry
+
+    def put(self, response):
+        """Store `response`, reading its body; return the entry."""
+
+        request = response.request
+        key = self.key(request.method, request.url, request.headers.get("accept"))
+        path = self._path(key)
+        tmp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.body{tmp_suffix}", "wb") as fp:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                fp.write(chunk)
+
+        entry = {
+            "method": request.method,
+            "url": request.url,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() not in STORED_ENCODING_HEADERS
+            },
+            "stored": time.time(),
+        }
+
+        with self.lock:
+            self.size -= self._size(path)
+
+            # Write atomically, since the directory may be shared by processes
+            os.replace(f"{path}.body{tmp_suffix}", f"{path}.body")
+            with open(f"{path}.json{tmp_suffix}", "w") as fp:
+                json.dump(entry, fp)
+            os.replace(f"{path}.json{tmp_suffix}", f"{path}.json")
+
+            self.size += self._size(path)
+            if self.size > self.max_bytes:
+                self._evict(keep=path)
+
+        entry["key"] = key
+        return entry
+
+    def refresh(self, entry, response):
+        """Update a stored entry with the headers of a `304 Not Modified` response."""
+
+        headers = CaseInsensitiveDict(entry["headers"])
+        for name, value in response.headers.items():
+            if name.lower() not in STORED_ENCODING_HEADERS:
+                headers[name] = value
+
+        entry = dict(entry, headers=dict(headers), stored=time.time())
+        key = entry.pop("key")
+        path = self._path(key)
+
+        with self.lock:
+            tmp = f"{path}.json.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w") as fp:
+                json.dump(entry, fp)
+            os.replace(tmp, f"{path}.json")
+
+        entry["key"] = key
+        return entry
+
+    def response(self, entry, prepared):
+        """Build a response reading the body of a stored entry from disk."""
+
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry["reason"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = entry["url"]
+        response.request = prepared
+        response.elapsed = datetime.timedelta(0)
+        response.raw = open(f"{self._path(entry['key'])}.body", "rb")
+        response.from_cache = False
+
+        return response
+
+    def _evict(self, keep=None):
+        for path, _, size in sorted(self._entries(), key=lambda entry: entry[1]):
+            if self.size <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+
+            logger.debug(f"Evicting '{path}' from the HTTP cache...")
+            self.size -= size
+            for suffix in [".json", ".body"]:
+                if os.path.isfile(f"{path}{suffix}"):
+                    os.remove(f"{path}{suffix}")
+
+    def invalidate(self, url):
+        """Remove all entries stored for `url`, whatever the method or media type."""
+
+        url_key = hashlib.sha256(url.encode()).hexdigest()
+        directory = os.path.join(self.directory, url_key[:2], url_key)
+        with self.lock:
+            for path, _, size in self._entries(directory):
+                logger.debug(f"Invalidating '{path}' in the HTTP cache...")
+                self.size -= size
+                for suffix in [".json", ".body"]:
+                    if os.path.isfile(f"{path}{suffix}"):
+                        os.remove(f"{path}{suffix}")
+
+    def invalidate_after(self, response):
+        """Invalidate the entries a successful unsafe request may have made stale."""
+
+        request = response.request
+        if request.method in SAFE_METHODS or not 200 <= response.status_code < 400:
+            return
+
+        urls = [request.url]
+        for name in ["location", "content-location"]:
+            if name in response.headers:
+                url = urljoin(request.url, response.headers[name])
+                if urlparse(url).netloc == urlparse(request.url).netloc:
+                    urls.append(url)
+
+        for url in urls:
+            self.invalidate(url)
+
+    def send(self, session, prepared, **kwargs):
+        """Send `prepared` through `session` unless a fresh response is stored."""
+
+        if prepared.method not in CACHEABLE_METHODS:
+            response = session.send(prepared, **kwargs)
+            response.from_cache = False
+            self.invalidate_after(response)
+            return response
+
+        entry = self.get(prepared)
+        if entry is not None and self.is_fresh(entry):
+            try:
+                response = self.response(entry, prepared)
+            except OSError:
+                entry = None  # evicted by another process in the meantime
+            else:
+                self._count("hit", prepared)
+                response.from_cache = True
+                return response
+
+        # Revalidate using a copy, such that the conditions aren't part of the request
+        # the response is about
+        conditional = prepared.copy()
+        if entry is not None:
+            conditional.headers.update(self.validators(entry))
+
+        response = session.send(conditional, **kwargs)
+        response.request = prepared
+
+        if entry is not None and response.status_code == 304:
+            response.close()
+            try:
+                response = self.response(self.refresh(entry, response), prepared)
+            except OSError:
+                # Evicted in the meantime; ask for the representation itself
+                return self.send(session, prepared, **kwargs)
+
+            self._count("revalidation", prepared)
+            response.from_cache = True
+            return response
+
+        self._count("miss", prepared)
+        if self.storable(response):
+            return self.response(self.put(response), prepared)
+
+        response.from_cache = False
+        return response
+
+    def _count(self, outcome, prepared):
+        with self.lock:
+            if outcome == "hit":
+                self.hits += 1
+            elif outcome == "revalidation":
+                self.revalidations += 1
+            else:
+                self.misses += 1
+
+        logger.log(
+            "DETAIL",
+            f"HTTP cache {outcome} for {prepared.method} {prepared.url} "
+            f"({self.hits} hits, {self.revalidations} revalidations, "
+            f"{self.misses} misses)",
+        )
+
+
+def get_http_cache():
+    """Return the HTTP cache configured through ENVVARs; `None` if disabled."""
+
+    if os.getenv("AGENT_HTTP_CACHE", "1") in ["0", "false", "no"]:
+        return None
+
+    return HttpCache(
+        os.getenv(
+            "AGENT_HTTP_CACHE_DIR",
+            os.path.join(
+                os.getenv("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+                "pragmatic-proof-agent",
+                "http",
+            ),
+        ),
+        max_bytes=int(os.getenv("AGENT_HTTP_CACHE_SIZE", str(256 * 2**20))),
+    )
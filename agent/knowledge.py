@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Grow the agent's knowledge by appending what was learned in each iteration."""
+
+
+import os
+
+import rdflib
+from loguru import logger
+from rdflib.namespace import RDF
+
+from .namespaces import NAMESPACE_MANAGER
+
+
+class KnowledgeBase(object):
+    """The ground formulas known to the agent as an append-only list of files.
+
+    The initial state H is followed by one file per iteration that holds only the
+    facts learned in that iteration (the delta). EYE reads all of them as input, so
+    neither the accumulated history needs to be parsed again nor be written anew.
+
+    Facts that are superseded by a later response must not reach the reasoner any
+    more, though. Files that contain such facts are therefore folded into the delta
+    without them, which is the only case in which earlier files are parsed again.
+    """
+
+    def __init__(self, directory, files):
+        self.directory = directory
+        self.files = list(files)
+
+    def __len__(self):
+        return len(self.files)
+
+    def extend(self, delta, filename, superseded=()):
+        """Store the graph `delta` as `filename`; return the extended knowledge base.
+
+        Files containing any of the triples in `superseded` are replaced by `filename`,
+        which then holds their other triples in addition to `delta`. The knowledge
+        base itself and its files remain unchanged such that the knowledge gained can
+        be discarded by just continuing to use it.
+        """
+
+        files = list(self.files)
+        if len(superseded) > 0:
+            delta, files = self.fold_superseded(delta, superseded)
+
+        delta_serialized = delta.serialize(format="n3")
+
+        # WORKAROUND for bug in N3 serializer (no prefix 'rdf' but `[ sh:path rdf:type ]`)
+        delta_serialized = f"@prefix rdf: <{RDF}> .\n" + delta_serialized
+
+        logger.trace(f"Knowledge gained ({filename}):\n{delta_serialized}")
+
+        with open(os.path.join(self.directory, filename), "w") as fp:
+            fp.write(delta_serialized)
+
+        return KnowledgeBase(self.directory, files + [filename])
+
+    def fold_superseded(self, delta, superseded):
+        """Return `delta` plus the files containing superseded triples, without them.
+
+        Also return the remaining files.
+        """
+
+        folded = rdflib.Graph()
+        folded.namespace_manager = NAMESPACE_MANAGER
+        for triple in delta:
+            folded.add(triple)
+
+        files = []
+        for file in self.files:
+            graph = rdflib.Graph()
+            graph.parse(os.path.join(self.directory, file), format="n3")
+
+            if not any(triple in graph for triple in superseded):
+                files.append(file)
+                continue
+
+            logger.log("DETAIL", f"Removing superseded facts stated in '{file}'...")
+            for triple in graph:
+                if triple not in superseded:
+                    folded.add(triple)
+
+        return folded, files
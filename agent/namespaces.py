@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Namespaces and prefixes used throughout the agent."""
+
+
+import rdflib
+from rdflib.namespace import DCTERMS, OWL, RDF, NamespaceManager
+
+# Use namespace manager to enforce consistent prefixes
+# https://rdflib.readthedocs.io/en/latest/namespaces_and_bindings.html
+# --""--/apidocs/rdflib.html#rdflib.namespace.NamespaceManager
+HTTP = rdflib.Namespace("http://www.w3.org/2011/http#")
+LOG = rdflib.Namespace("http://www.w3.org/2000/10/swap/log#")
+REASON = rdflib.Namespace("http://www.w3.org/2000/10/swap/reason#")
+SHACL = rdflib.Namespace("http://www.w3.org/ns/shacl#")
+PPA = rdflib.Namespace("https://github.com/UdSAES/pragmatic-proof-agent#")
+
+NAMESPACE_MANAGER = NamespaceManager(rdflib.Graph())
+
+# FIXME read prefixes/namespaces from files instead of hardcoding?
+NAMESPACE_MANAGER.bind("rdf", RDF)
+NAMESPACE_MANAGER.bind("owl", OWL)
+NAMESPACE_MANAGER.bind("dcterms", DCTERMS)
+
+NAMESPACE_MANAGER.bind("http", HTTP)
+NAMESPACE_MANAGER.bind("log", LOG)
+NAMESPACE_MANAGER.bind("r", REASON)
+NAMESPACE_MANAGER.bind("sh", SHACL)
+NAMESPACE_MANAGER.bind("ppa", PPA)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Memoize successful plans as templates and instantiate them for similar problems.
+
+A plan is the sequence of requests that led to the goal. Values in a request that
+stem from the initial state or from an earlier response (e.g. the URL of a resource
+created before) are replaced by references to their role there, such as "the object
+of `ex:smallThumbnail` in the response to step 0". Replaying the template for a new
+initial state substitutes the values found in the same roles.
+"""
+
+
+import json
+import os
+import threading
+from urllib.parse import urljoin
+
+import rdflib
+from loguru import logger
+
+from .cache import hash_files
+
+# The key under which bindings from the initial state are referenced
+INITIAL_STATE = "H"
+
+
+def graph_bindings(triples):
+    """Map the role of each IRI in `triples` to the IRI; omit ambiguous roles.
+
+    The role of an IRI is its position (`s`/`o`) in a triple with a given predicate.
+    """
+
+    candidates = {}
+    for s, p, o in triples:
+        for position, term in [("s", s), ("o", o)]:
+            if isinstance(term, rdflib.URIRef):
+                candidates.setdefault(f"{position} {p}", set()).add(str(term))
+
+    return {
+        role: values.pop() for role, values in candidates.items() if len(values) == 1
+    }
+
+
+def response_bindings(response, triples):
+    """Map roles to IRIs found in a response, including its headers."""
+
+    bindings = graph_bindings(triples)
+    for name, value in response.headers.items():
+        bindings[f"header {name.lower()}"] = urljoin(response.request.url, value)
+
+    return bindings
+
+
+def plan_step(r, request_object, response, triples):
+    """Describe an executed request for recording it as part of a plan."""
+
+    body_source = getattr(request_object, "body_source", None)
+    headers = {
+        key: value
+        for key, value in (request_object.headers or {}).items()
+        if key.lower() != "content-type"  # derived from the body when replaying
+    }
+
+    return {
+        "rule": r,
+        "method": request_object.method,
+        "url": request_object.url,
+        "headers": headers,
+        "params": request_object.params or {},
+        "body": str(body_source) if body_source is not None else None,
+        "status": response.status_code,
+        "bindings": response_bindings(response, triples),
+    }
+
+
+def parameterise(value, sources):
+    """Express `value` through the longest binding it starts with, if any.
+
+    `sources` is a list of `(key, bindings)` ordered from the oldest to the newest;
+    newer bindings win ties.
+    """
+
+    best = None
+    for key, bindings in sources:
+        for role, bound in bindings.items():
+            if value.startswith(bound) and (best is None or len(bound) >= best[2]):
+                best = (key, role, len(bound))
+
+    if best is None:
+        return {"value": value}
+
+    key, role, length = best
+    return {"ref": [key, role], "suffix": value[length:]}
+
+
+def instantiate(parameter, sources):
+    """Return the value of a parameter for the bindings in `sources`, or `None`."""
+
+    if "value" in parameter:
+        return parameter["value"]
+
+    key, role = parameter["ref"]
+    bound = dict(sources).get(key, {}).get(role)
+    if bound is None:
+        return None
+
+    return bound + parameter["suffix"]
+
+
+def is_stated_in_rule(parameter, rule_text):
+    """Whether `parameter` is a value stated literally in the rule it is sent for.
+
+    Other literal values were taken from the initial state or an earlier response
+    of the problem the plan was recorded for, but could not be parameterised; they
+    must not be sent for another problem.
+    """
+
+    return "value" in parameter and parameter["value"] in rule_text
+
+
+def make_template(steps, initial_bindings):
+    """Turn the recorded steps of a successful run into a template."""
+
+    template = []
+    for index, step in enumerate(steps):
+        sources = step_sources(initial_bindings, steps[:index])
+        template.append(
+            {
+                "rule": step["rule"],
+                "method": step["method"],
+                "url": parameterise(step["url"], sources),
+                "headers": step["headers"],
+                "params": step["params"],
+                "body": (
+                    parameterise(step["body"], sources)
+                    if step["body"] is not None
+                    else None
+                ),
+                "status": step["status"],
+            }
+        )
+
+    return template
+
+
+def step_sources(initial_bindings, steps):
+    """Return the bindings available to the step following `steps`."""
+
+    sources = [(INITIAL_STATE, initial_bindings)]
+    for index, step in enumerate(steps):
+        sources.append((str(index), step["bindings"]))
+
+    return sources
+
+
+def plan_signature(directory, g, R):
+    """Identify problems of the same shape: the same goal and the same rules."""
+
+    return hash_files(directory, [g] + sorted(R))
+
+
+class PlanStore(object):
+    """Templates of successful plans, stored as JSON files named by signature."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+
+    def _path(self, signature):
+        return os.path.join(self.directory, f"{signature}.json")
+
+    def get(self, signature):
+        """Return the template stored for `signature` or `None`."""
+
+        path = self._path(signature)
+        if not os.path.isfile(path):
+            return None
+
+        with open(path) as fp:
+            return json.load(fp)
+
+    def put(self, signature, template):
+        """Store `template` for `signature`, replacing an existing one."""
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(signature)
+        with self.lock:
+            with open(f"{path}.{os.getpid()}.tmp", "w") as fp:
+                json.dump(template, fp, indent=2)
+            os.replace(f"{path}.{os.getpid()}.tmp", path)
+
+        logger.debug(f"Stored plan with {len(template)} step(s) as '{path}'")
+
+
+def get_plan_store():
+    """Return the plan store configured through ENVVARs; `None` unless enabled."""
+
+    if os.getenv("AGENT_PLANS", "0") not in ["1", "true", "yes"]:
+        return None
+
+    return PlanStore(
+        os.getenv(
+            "AGENT_PLANS_DIR",
+            os.path.join(
+                os.getenv("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+                "pragmatic-proof-agent",
+                "plans",
+            ),
+        )
+    )
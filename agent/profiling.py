@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Profile CPU time and memory allocations per iteration of the PPA, if desired.
+
+For each iteration, the CPU profile is written to `<iteration>_profile.pstats` and
+the allocations that grew the most during the iteration are listed in
+`<iteration>_allocations.txt`, next to the proofs of that iteration. Note that
+`cProfile` only sees the thread that runs the PPA, not those sending requests.
+"""
+
+
+import cProfile
+import os
+import tracemalloc
+
+from loguru import logger
+
+# The kinds of profiling to enable for each value of `AGENT_PROFILE`/`--profile`
+MODES = {
+    "cpu": (True, False),
+    "memory": (False, True),
+    "all": (True, True),
+}
+
+
+class IterationProfiler(object):
+    """Profile each iteration separately; write the results to `directory`."""
+
+    def __init__(self, directory, cpu=True, memory=False, top=25):
+        self.directory = directory
+        self.cpu = cpu
+        self.memory = memory
+        self.top = top
+
+        self.iteration = None
+        self.profile = None
+        self.snapshot = None
+        self.started_tracemalloc = False
+
+    def begin(self, iteration):
+        """Profile `iteration` from now on, finishing the previous one if different."""
+
+        if iteration == self.iteration:
+            return
+
+        self.end()
+        self.iteration = iteration
+
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracemalloc = True
+            tracemalloc.reset_peak()
+            self.snapshot = tracemalloc.take_snapshot()
+
+        if self.cpu:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def end(self):
+        """Write the results for the iteration profiled so far, if any."""
+
+        if self.iteration is None:
+            return
+
+        prefix = os.path.join(self.directory, f"{self.iteration:0>2}")
+
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.dump_stats(f"{prefix}_profile.pstats")
+            logger.log("DETAIL", f"Wrote CPU profile to '{prefix}_profile.pstats'")
+            self.profile = None
+
+        if self.snapshot is not None:
+            self.write_allocations(f"{prefix}_allocations.txt")
+            logger.log("DETAIL", f"Wrote allocations to '{prefix}_allocations.txt'")
+            self.snapshot = None
+
+        self.iteration = None
+
+    def write_allocations(self, path):
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        )
+        statistics = snapshot.compare_to(self.snapshot, "lineno")
+
+        with open(path, "w") as fp:
+            fp.write(
+                f"Top {self.top} allocations during iteration {self.iteration} "
+                "compared to its start\n"
+                f"Peak memory traced: {peak / 2**20:.1f} MiB\n\n"
+            )
+            for index, statistic in enumerate(statistics[: self.top], start=1):
+                fp.write(f"#{index}: {statistic}\n")
+
+    def close(self):
+        """Finish the last iteration and stop tracing allocations if started here."""
+
+        self.end()
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+
+
+def get_profiler(directory, mode=None):
+    """Return a profiler for the run in `directory`; `None` unless enabled.
+
+    `mode` defaults to ENVVAR `AGENT_PROFILE` and is one of `cpu`, `memory` or
+    `all`; anything else disables profiling.
+    """
+
+    if mode is None:
+        mode = os.getenv("AGENT_PROFILE", "")
+
+    if mode not in MODES:
+        if mode not in ["", "0", "false", "no"]:
+            logger.warning(
+                f"Unknown profiling mode '{mode}', choose one of {list(MODES)}"
+            )
+        return None
+
+    cpu, memory = MODES[mode]
+    top = int(os.getenv("AGENT_PROFILE_TOP", "25"))
+
+    return IterationProfiler(directory, cpu, memory, top)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Index a proof once so that the PPA can inspect it without repeated queries."""
+
+
+from collections import defaultdict
+
+import rdflib
+
+from .discovery import CLOSING, N3_TOKENS, OPENING
+from .namespaces import NAMESPACE_MANAGER, REASON
+
+
+class ProofIndex(object):
+    """Dictionaries over the triples of a proof deduced by EYE.
+
+    A single pass over the proof indexes all triples by their object as well as the
+    formulas given by each inference. This suffices to follow the chain
+
+        ?a r:source <file>. ?b ?p ?a. ?c r:rule ?b. ?c r:gives ?x.
+
+    from a source file to the instantiated rules in time independent of the size of R.
+    """
+
+    def __init__(self, graph, path=None):
+        self.graph = graph
+        self.path = path
+
+        self.subjects = defaultdict(list)  # object -> [(subject, predicate), ...]
+        self.gives = defaultdict(list)  # inference -> [formula, ...]
+        self.sources = {}  # files statements were loaded from, in order of appearance
+
+        for s, p, o in graph:
+            self.subjects[o].append((s, p))
+            if p == REASON.gives:
+                self.gives[s].append(o)
+            elif p == REASON.source:
+                self.sources[o] = None
+
+    @classmethod
+    def load(cls, proof):
+        """Return `proof` if it is indexed already; else parse and index the file."""
+
+        if isinstance(proof, cls):
+            return proof
+
+        graph = rdflib.Graph()
+        graph.namespace_manager = NAMESPACE_MANAGER
+        graph.parse(proof, format="n3")
+
+        return cls(graph, proof)
+
+    def __len__(self):
+        return len(self.graph)
+
+    def count_applications(self, source):
+        """Count how many times statements loaded from `source` are used."""
+
+        n = 0
+        for x, _ in self.subjects.get(source, []):
+            n += len(self.subjects.get(x, []))
+
+        return n
+
+    def rule_applications(self, source):
+        """Yield `(a, b, c, x)` for each formula `x` given by a rule from `source`."""
+
+        for a, p0 in self.subjects.get(source, []):
+            if p0 != REASON.source:
+                continue
+
+            for b, _ in self.subjects.get(a, []):
+                for c, p1 in self.subjects.get(b, []):
+                    if p1 != REASON.rule:
+                        continue
+
+                    for x in self.gives.get(c, []):
+                        yield a, b, c, x
+
+
+class ProofReader(object):
+    """Split the lines of a proof into statements while they are being produced.
+
+    Each line is passed through `normalise` on the fly and handed to `writer`, such
+    that the proof can be parsed and stored without holding on to the reasoner output.
+    Every statement is parsed as soon as its last line was read, rather than once the
+    reasoner is done.
+    """
+
+    def __init__(self, lines, normalise=None, writer=None, keep=False):
+        self.lines = iter(lines)
+        self.normalise = normalise
+        self.writer = writer
+        self.kept = [] if keep else None
+
+    def __iter__(self):
+        for line in self.lines:
+            if self.normalise is not None and line.startswith("PREFIX"):
+                line = self.normalise(line)
+            if self.writer is not None:
+                self.writer.write(line)
+            if self.kept is not None:
+                self.kept.append(line)
+
+            yield line
+
+    def statements(self):
+        """Yield the text of each top-level statement once it is complete.
+
+        Lines are tokenized once; a token ending at the end of the text read so far
+        (or an unterminated long string) may continue on the next line.
+        """
+
+        text = ""
+        position = 0  # the text before is tokenized already
+        depth = 0
+
+        for line in self:
+            text += line
+
+            while position < len(text):
+                match = N3_TOKENS.match(text, position)
+                if match is None or match.end() == len(text):
+                    break
+
+                token = match.group()
+                if token in ['""', "''"] and text.startswith(token[0] * 3, position):
+                    break  # the start of a long string
+
+                position = match.end()
+                if match.lastgroup == "punctuation":
+                    if token in OPENING:
+                        depth += 1
+                    elif token in CLOSING:
+                        depth -= 1
+                    elif depth == 0 and token == ".":
+                        yield text[:position]
+                        text = text[position:]
+                        position = 0
+
+        if text.strip() != "":
+            yield text  # let the parser complain about incomplete statements
+
+    def parse(self, graph):
+        """Parse the proof into `graph`, statement by statement."""
+
+        from rdflib.plugins.parsers.notation3 import RDFSink, SinkParser
+
+        # Set up the parser like `graph.parse(format="n3")` does
+        dataset = rdflib.Dataset(store=graph.store)
+        dataset.default_context = graph
+        dataset.namespace_manager = graph.namespace_manager
+
+        parser = SinkParser(RDFSink(dataset), baseURI=graph.absolutize(""))
+        parser.startDoc()
+        for statement in self.statements():
+            parser.feed(statement)
+        parser.endDoc()
+
+        for prefix, namespace in parser._bindings.items():
+            graph.bind(prefix, namespace)
+
+        return graph
+
+
+class ProofWriter(object):
+    """Write the lines of a proof to `path` as they are read by the parser.
+
+    Writing is buffered and interleaved with parsing, such that the file is complete
+    as soon as the proof is parsed, without a second pass over the proof. A function
+    passed to `close()` is called with `path` once the file is complete.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fp = open(path, "w")
+
+    def write(self, line):
+        self.fp.write(line)
+
+    def close(self, callback=None):
+        self.fp.close()
+        if callback is not None:
+            callback(self.path)
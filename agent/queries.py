@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Keep all fixed SPARQL queries of the agent in one place, parsed only once.
+
+Parameters are passed as initial bindings (e.g. `initBindings={"rule": iri}`) rather
+than formatted into the query. Queries are compiled on first use, such that the
+SPARQL parser isn't loaded by processes which never query a graph.
+"""
+
+
+from functools import lru_cache
+
+from .namespaces import NAMESPACE_MANAGER
+
+# The text of each query; variables to be bound by the caller are listed in comments
+QUERIES = {
+    # The parts of a HTTP request described in a graph
+    "request": (
+        "SELECT ?method ?uri ?headers ?body "
+        "WHERE { "
+        "?s http:methodName ?method. "
+        "?s http:requestURI ?uri. "
+        "OPTIONAL { ?s http:headers ?headers. }"
+        "OPTIONAL { ?s http:body ?body. }"
+        "}"
+    ),
+    # The shapes required by the rule from which `?rule` stems (binds `?rule`)
+    "shapes_of_rule": (
+        "SELECT ?shape ?p1 ?focusNode "
+        "WHERE { "
+        "?x r:source ?rule ."
+        "?x ?p0 ?shape ."
+        "?shape ?p1 ?focusNode ."
+        "}"
+    ),
+    # The shapes and their focus nodes stated in a graph
+    "node_shapes": (
+        "SELECT ?shape ?p1 ?focusNode "
+        "WHERE { "
+        "?shape rdf:type sh:NodeShape ."
+        "?shape sh:targetNode ?focusNode ."
+        "?shape ?p1 ?focusNode ."
+        "}"
+    ),
+}
+
+
+@lru_cache(maxsize=None)
+def prepared_query(name):
+    """Return the query `name` of `QUERIES`, parsed and optimised once per process."""
+
+    from rdflib.plugins.sparql import prepareQuery
+
+    return prepareQuery(QUERIES[name], initNs=dict(NAMESPACE_MANAGER.namespaces()))
+
+
+def query(graph, name, **bindings):
+    """Evaluate the prepared query `name` on `graph` with variables bound as given."""
+
+    return graph.query(prepared_query(name), initBindings=bindings)
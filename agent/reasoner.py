@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Run the EYE reasoner through interchangeable backends.
+
+Available backends are `docker` (EYE in a container, optionally kept warm in a pool),
+`local` (an `eye` binary on the PATH) and `stub` (replays recorded proofs from disk).
+
+The `docker` and `local` backends can also load a compiled image of the rule set, such
+that rules which don't change between iterations are parsed only once.
+"""
+
+
+import atexit
+import os
+import queue
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+
+from loguru import logger
+
+from .cache import hash_files
+
+# Marks the end of a job's output on stdout/stderr of a worker
+END_OF_JOB = "__EYE_END_OF_JOB__"
+
+
+class ReasonerResult(object):
+    """Outcome of a reasoning job, mirroring the relevant parts of `invoke.Result`."""
+
+    def __init__(self, stdout, stderr, exited):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.exited = exited
+
+    @property
+    def ok(self):
+        return self.exited == 0
+
+
+class ReasonerStream(ReasonerResult):
+    """Lines written to stdout by a running reasoning job, available as they arrive.
+
+    `lines` is a generator that returns `(stderr, exited)` once it is exhausted; until
+    then, `stderr` is empty and `exited` is `None`.
+    """
+
+    def __init__(self, lines):
+        super().__init__(None, "", None)
+        self.lines = lines
+
+    def __iter__(self):
+        self.stderr, self.exited = yield from self.lines
+
+
+def stream_command(cmd, cwd=None, timeout=None):
+    """Run `cmd`, yield the lines it writes to stdout; return `(stderr, exited)`."""
+
+    logger.debug(shlex.join(cmd))
+
+    process = subprocess.Popen(
+        cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+
+    # Read stderr in the background so the pipe doesn't fill up and block
+    stderr = []
+    reader = threading.Thread(target=stderr.extend, args=(process.stderr,))
+    reader.start()
+
+    timer = None
+    if timeout is not None:
+        timer = threading.Timer(timeout, process.kill)
+        timer.start()
+
+    try:
+        yield from process.stdout
+        exited = process.wait()
+    finally:
+        if timer is not None:
+            timer.cancel()
+        if process.poll() is None:
+            process.kill()
+        reader.join()
+
+    if timer is not None and exited < 0:
+        logger.error(f"EYE did not answer within {timeout}s")
+        exited = None
+
+    return "".join(stderr), exited
+
+
+def container_name():
+    """Return a name for an EYE container that is unique across processes."""
+
+    return f"eye-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class EyeWorker(object):
+    """A long-lived shell inside an EYE container that executes reasoning jobs.
+
+    Jobs are written to the shell's stdin as command lines; their output is read from
+    stdout/stderr up to a marker line, such that the container is started only once.
+    """
+
+    def __init__(self, tmp_dir, workdir, image_name):
+        self.name = container_name()
+        self.jobs = 0
+
+        # Exit code of the last job; `None` unless all of its output was read
+        self.exited = None
+        self.status = None
+
+        cmd = [
+            "docker",
+            "run",
+            "-i",
+            "--rm",
+            "--name",
+            self.name,
+            "-v",
+            f"{tmp_dir}:{workdir}",
+            "-w",
+            workdir,
+            "--entrypoint",
+            "sh",
+            image_name,
+        ]
+        logger.debug(f"Starting EYE worker '{self.name}': {shlex.join(cmd)}")
+
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+
+        # Read both streams in the background so neither pipe fills up and blocks
+        self.stdout = queue.Queue()
+        self.stderr = queue.Queue()
+        for stream, lines in [
+            (self.process.stdout, self.stdout),
+            (self.process.stderr, self.stderr),
+        ]:
+            threading.Thread(
+                target=self._pump, args=(stream, lines), daemon=True
+            ).start()
+
+    @staticmethod
+    def _pump(stream, lines):
+        for line in stream:
+            lines.put(line)
+        lines.put(None)  # signals that the worker is gone
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def stream(self, arguments, timeout=None, image=None):
+        """Run EYE with `arguments` inside the worker and yield its output lines.
+
+        Return `(stderr, exited)` once the job is done. `exited` is only set once
+        both markers were read, i.e. if no output of this job is left in the queues.
+        """
+
+        token = uuid.uuid4().hex
+        marker = f"{END_OF_JOB}{token}"
+        script = (
+            f"{shlex.join(eye_command(image) + list(arguments))} 2>/tmp/{token}.err; "
+            f"printf '\\n%s %s\\n' {marker} $?; "
+            f"cat /tmp/{token}.err >&2; rm -f /tmp/{token}.err; "
+            f"echo {marker} >&2\n"
+        )
+
+        self.jobs += 1
+        self.exited = None
+        self.process.stdin.write(script)
+        self.process.stdin.flush()
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        # Hold back one line to be able to drop the newline printed before the marker
+        previous = None
+        for line in self._lines(self.stdout, marker, deadline):
+            if previous is not None:
+                yield previous
+            previous = line
+
+        if self.status is None:
+            logger.error(f"EYE worker '{self.name}' did not answer within {timeout}s")
+            self.kill()
+            return "", None
+
+        if previous is not None and previous != "\n":
+            yield previous
+
+        exited = self.status
+        stderr = "".join(self._lines(self.stderr, marker, deadline))
+
+        if self.status is None:
+            logger.error(f"EYE worker '{self.name}' did not answer within {timeout}s")
+            self.kill()
+            return stderr, None
+
+        self.exited = exited
+        return stderr, exited
+
+    def _lines(self, lines, marker, deadline):
+        """Yield lines up to `marker`; set `status` if the marker was found."""
+
+        self.status = None
+        while True:
+            try:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                line = lines.get(timeout=remaining)
+            except queue.Empty:
+                return
+
+            if line is None:
+                return
+            if line.startswith(marker):
+                exited = line[len(marker) :].strip()
+                self.status = int(exited) if exited != "" else 0
+                return
+
+            yield line
+
+    def close(self):
+        """Let the shell exit, which removes the container."""
+
+        logger.debug(f"Stopping EYE worker '{self.name}' after {self.jobs} jobs...")
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+    def kill(self):
+        subprocess.run(["docker", "kill", self.name], capture_output=True)
+        self.process.kill()
+        self.process.wait()
+
+
+class EyeWorkerPool(object):
+    """A fixed number of warm EYE workers that are recycled after `max_jobs` jobs."""
+
+    def __init__(self, tmp_dir, workdir, image_name, size=1, max_jobs=50):
+        self.tmp_dir = tmp_dir
+        self.workdir = workdir
+        self.image_name = image_name
+        self.max_jobs = max_jobs
+
+        self.idle = queue.Queue()
+        for _ in range(size):
+            self.idle.put(self._spawn())
+
+    def _spawn(self):
+        return EyeWorker(self.tmp_dir, self.workdir, self.image_name)
+
+    def stream(self, arguments, timeout=None, image=None):
+        """Execute a reasoning job on the next idle worker, yielding its output."""
+
+        worker = self.idle.get()
+        try:
+            if not worker.alive:
+                worker = self._spawn()
+            return (yield from worker.stream(arguments, timeout, image))
+        finally:
+            if worker.exited is None:
+                # The job was abandoned or timed out; its output that wasn't read yet
+                # would be mistaken for the output of the next job
+                worker.kill()
+                worker = self._spawn()
+            elif (not worker.alive) or (worker.jobs >= self.max_jobs):
+                worker.close()
+                worker = self._spawn()
+            self.idle.put(worker)
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get().close()
+
+
+# Pools are shared by all reasoning jobs for the same working directory
+POOLS = {}
+POOLS_LOCK = threading.Lock()
+
+
+def get_pool(tmp_dir, workdir, image_name):
+    """Return the pool of EYE workers for `tmp_dir`; `None` if pooling is disabled."""
+
+    size = int(os.getenv("EYE_POOL_SIZE", "1"))
+    if size < 1:
+        return None
+
+    key = (os.path.abspath(tmp_dir), workdir, image_name)
+    with POOLS_LOCK:
+        if key not in POOLS:
+            max_jobs = int(os.getenv("EYE_POOL_MAX_JOBS", "50"))
+            logger.info(f"Starting pool of {size} EYE worker(s)...")
+            POOLS[key] = EyeWorkerPool(key[0], workdir, image_name, size, max_jobs)
+
+    return POOLS[key]
+
+
+def close_pool(tmp_dir):
+    """Stop the workers of the pools for `tmp_dir`, e.g. once its problem is solved."""
+
+    tmp_dir = os.path.abspath(tmp_dir)
+    with POOLS_LOCK:
+        keys = [key for key in POOLS if key[0] == tmp_dir]
+        pools = [POOLS.pop(key) for key in keys]
+
+    for pool in pools:
+        pool.close()
+
+
+@atexit.register
+def close_pools():
+    """Stop all workers, e.g. when the interpreter exits."""
+
+    with POOLS_LOCK:
+        for pool in POOLS.values():
+            pool.close()
+        POOLS.clear()
+
+
+def eye_command(image=None, executable="eye"):
+    """Return the command that starts EYE, optionally from a compiled image."""
+
+    if image is None:
+        return [executable]
+
+    return ["swipl", "-x", image, "--"]
+
+
+# Backends
+class ReasonerBackend(object):
+    """Interface shared by all ways of running the EYE reasoner."""
+
+    name = None
+    supports_images = False
+
+    def workdir(self, tmp_dir):
+        """Return the path under which the reasoner sees the files in `tmp_dir`."""
+
+        raise NotImplementedError
+
+    def stream(self, tmp_dir, arguments, name, timeout=None, image=None):
+        """Reason over the files in `tmp_dir`; `name` is the file name of the proof.
+
+        If `image` is given, EYE starts from that compiled image in `tmp_dir` so only
+        the files in `arguments` need to be parsed. Return a `ReasonerStream`.
+        """
+
+        return ReasonerStream(self._stream(tmp_dir, arguments, name, timeout, image))
+
+    def run(self, tmp_dir, arguments, name, timeout=None, image=None):
+        """Like `stream()`, but wait for the job to finish and return all output."""
+
+        result = self.stream(tmp_dir, arguments, name, timeout, image)
+        stdout = "".join(result)
+
+        return ReasonerResult(stdout, result.stderr, result.exited)
+
+    def _stream(self, tmp_dir, arguments, name, timeout, image):
+        """Yield the lines of the proof; return `(stderr, exited)` at the end."""
+
+        raise NotImplementedError
+
+
+class DockerBackend(ReasonerBackend):
+    """Containerized EYE reasoner, by default kept warm in a pool of workers."""
+
+    name = "docker"
+    supports_images = True
+
+    def workdir(self, tmp_dir):
+        return "/mnt"
+
+    def _stream(self, tmp_dir, arguments, name, timeout, image):
+        image_name = os.getenv("EYE_IMAGE_NAME")
+        workdir = self.workdir(tmp_dir)
+        pool = get_pool(tmp_dir, workdir, image_name)
+
+        if pool is not None:
+            logger.debug(" ".join(arguments))
+            return (yield from pool.stream(arguments, timeout, image))
+
+        if image is not None:
+            command = eye_command(image)
+            entrypoint = ["--entrypoint", command[0]]
+            arguments = command[1:] + list(arguments)
+        else:
+            entrypoint = []
+
+        cmd = [
+            "docker",
+            "run",
+            "-i",
+            "--rm",
+            "--name",
+            container_name(),
+            "-v",
+            f"{tmp_dir}:{workdir}",
+            "-w",
+            workdir,
+        ]
+        cmd += entrypoint + [image_name]
+        return (yield from stream_command(cmd + list(arguments), timeout=timeout))
+
+
+class LocalBackend(ReasonerBackend):
+    """EYE reasoner installed on the host, found as `EYE_COMMAND` on the PATH."""
+
+    name = "local"
+    supports_images = True
+
+    def workdir(self, tmp_dir):
+        return os.path.abspath(tmp_dir)
+
+    def _stream(self, tmp_dir, arguments, name, timeout, image):
+        command = eye_command(image, os.getenv("EYE_COMMAND", "eye"))
+        executable = shutil.which(command[0])
+        if executable is None:
+            logger.error(f"Could not find '{command[0]}' on the PATH!")
+            return "", None
+
+        cmd = [executable] + command[1:] + list(arguments)
+        return (
+            yield from stream_command(cmd, cwd=self.workdir(tmp_dir), timeout=timeout)
+        )
+
+
+class StubBackend(ReasonerBackend):
+    """Replay proofs recorded in a previous run instead of reasoning.
+
+    The proof for job `name` is read from the file `<EYE_STUB_DIR>/<name>`, which means
+    that the working directory of any earlier run can serve as a recording.
+    """
+
+    name = "stub"
+
+    def workdir(self, tmp_dir):
+        return os.getenv("EYE_STUB_WORKDIR", "/mnt")
+
+    def _stream(self, tmp_dir, arguments, name, timeout, image):
+        recording = os.path.join(os.getenv("EYE_STUB_DIR", tmp_dir), name)
+
+        if not os.path.isfile(recording):
+            logger.error(f"There is no recorded proof at '{recording}'!")
+            return self._replay([], 1)
+
+        # Read the recording right away; by default, it is the very file the proof
+        # is written to while being parsed, which truncates it
+        logger.debug(f"Replaying proof recorded in '{recording}'...")
+        with open(recording) as fp:
+            lines = fp.readlines()
+
+        return self._replay(lines, 0)
+
+    def _replay(self, lines, exited):
+        yield from lines
+
+        return "", exited
+
+
+BACKENDS = {
+    backend.name: backend for backend in [DockerBackend, LocalBackend, StubBackend]
+}
+
+
+def get_backend(name=None):
+    """Instantiate the backend called `name`, defaulting to ENVVAR `EYE_BACKEND`."""
+
+    if name is None:
+        name = os.getenv("EYE_BACKEND", "docker")
+
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown reasoner backend '{name}', choose one of {list(BACKENDS)}"
+        )
+
+    return BACKENDS[name]()
+
+
+def compile_rule_set(tmp_dir, files, backend=None, timeout=None):
+    """Compile `files` into an EYE image, reusing it for as long as they don't change.
+
+    Return the image's file name in `tmp_dir` or `None` if the backend can't do that.
+    """
+
+    reasoner = get_backend(backend)
+    if not reasoner.supports_images:
+        return None
+
+    image = f"rules_{hash_files(tmp_dir, files)[:16]}.pvm"
+    if os.path.isfile(os.path.join(tmp_dir, image)):
+        logger.log("DETAIL", f"Reusing compiled rule set '{image}'")
+        return image
+
+    logger.info(f"Compiling rule set into '{image}'...")
+    result = reasoner.run(tmp_dir, ["--image", image] + list(files), image, timeout)
+
+    if not (result.ok and os.path.isfile(os.path.join(tmp_dir, image))):
+        logger.warning("Could not compile rule set, loading all rules instead!")
+        logger.trace(f"Reasoning logs:\n{result.stderr}")
+        return None
+
+    return image
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Prune RESTdesc rules that cannot contribute to reaching the goal."""
+
+
+import os
+
+from loguru import logger
+
+from .catalog import RuleCatalog, parse_rule_dependencies
+
+
+def read_rule_dependencies(directory, filename):
+    """Return the dependencies of the rules in a file; `None` if it can't be parsed."""
+
+    with open(os.path.join(directory, filename)) as fp:
+        text = fp.read()
+
+    try:
+        return parse_rule_dependencies(text)
+    except Exception as e:
+        logger.warning(f"Cannot parse '{filename}' to prune rules: {e!r}")
+        return None
+
+
+def prune_rules(directory, g, R, B=None, catalog=None):
+    """Return the rules in R that are backward-reachable from the goal `g`.
+
+    A rule is reachable if one of its conclusions may match a premise of the goal or
+    of another reachable rule. Rules in the background knowledge B are never pruned
+    but take part in the search. Rules that cannot be parsed are kept.
+    """
+
+    goal = read_rule_dependencies(directory, g)
+    if not goal:
+        logger.warning(f"No rule found in goal '{g}', not pruning R")
+        return list(R)
+
+    if catalog is None:
+        catalog = RuleCatalog(directory)
+    candidates = set(R) | ({B} if B is not None else set())
+    catalog.extend(candidates)
+    unparseable = {r for r in R if catalog[r].dependencies is None}
+
+    # Search backwards starting from the premises of the goal
+    needed = [key for premises, _ in goal for key in premises]
+    searched = set()
+    reachable = set()
+    while needed:
+        key = needed.pop()
+        if key in searched:
+            continue
+        searched.add(key)
+
+        for r in catalog.producers(key) & candidates:
+            if r not in reachable:
+                reachable.add(r)
+                needed.extend(catalog[r].premises)
+
+    kept = [r for r in R if r in reachable or r in unparseable]
+    logger.info(
+        f"Pruned {len(R) - len(kept)} of {len(R)} rules that cannot contribute "
+        "to reaching the goal"
+    )
+    logger.log("DETAIL", f"Pruned rules: {[r for r in R if r not in kept]}")
+
+    return kept
@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""A local stand-in for the hypermedia APIs used in the examples.
+
+The image API mirrors `img_api/index.js`, rendering the same templates; thumbnails
+are not actually resized. The simulation API is a minimal model -> instance ->
+simulation -> result chain described at `/`. Resources below `/chain` form the
+synthetic chains of the benchmark suite. Latency, size of binary payloads and
+the rate of failures (`503 Service Unavailable`) are configurable, such that the
+agent can be benchmarked end-to-end without external services.
+"""
+
+
+import hashlib
+import http.server
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from urllib.parse import urlparse
+
+from jinja2 import Environment, FileSystemLoader, Template
+from loguru import logger
+
+# Templates shared with the Node.js implementation of the image API
+TEMPLATES_DIR = os.path.normpath(
+    os.path.join(
+        os.path.dirname(os.path.realpath(__file__)), "..", "img_api", "templates"
+    )
+)
+
+# Names of the resources of the image API per language
+RESOURCE_NAMES = {
+    "images": {"en": "images", "de": "bilder", "fr": "photos"},
+    "thumbnail": {"en": "thumbnail", "de": "miniaturbild", "fr": "miniature"},
+}
+
+PROBLEMS = {
+    400: (
+        "Bad Request",
+        "The request was malformed and the server refuses to process it",
+    ),
+    404: ("Not Found", "The requested resource was not found on this server"),
+    406: (
+        "Not Acceptable",
+        "The requested (hyper-) media type is not supported for this resource",
+    ),
+    501: (
+        "Not Implemented",
+        "The request was understood, but the underlying implementation is not "
+        "available yet.",
+    ),
+    503: (
+        "Service Unavailable",
+        "The server is temporarily unable to handle the request (failure injected)",
+    ),
+}
+
+SIMULATION_PREFIXES = """\
+@prefix fmi: <https://purl.org/fmi-ontology#>.
+@prefix http: <http://www.w3.org/2011/http#>.
+@prefix sms: <https://purl.org/sms-ontology#>.
+"""
+
+# RESTdesc of the simulation API; each rule is one step towards a simulation result
+SIMULATION_RESTDESC = Template(
+    SIMULATION_PREFIXES
+    + """
+{
+  ?fmu a fmi:FMU.
+}
+=>
+{
+  _:request http:methodName "POST";
+            http:requestURI "{{ origin }}/models";
+            http:headers [ http:fieldName "Accept"; http:fieldValue "text/n3" ];
+            http:body ?fmu;
+            http:resp [ http:body _:model ].
+  _:model a sms:Model;
+          sms:instances _:instances.
+}.
+
+{
+  ?model a sms:Model;
+         sms:instances ?instances.
+}
+=>
+{
+  _:request http:methodName "POST";
+            http:requestURI ?instances;
+            http:headers [ http:fieldName "Accept"; http:fieldValue "text/n3" ];
+            http:resp [ http:body _:instance ].
+  _:instance sms:instanceOf ?model;
+             sms:experiments _:experiments.
+}.
+
+{
+  ?instance sms:instanceOf ?model;
+            sms:experiments ?experiments.
+}
+=>
+{
+  _:request http:methodName "POST";
+            http:requestURI ?experiments;
+            http:headers [ http:fieldName "Accept"; http:fieldValue "text/n3" ];
+            http:resp [ http:body _:simulation ].
+  _:simulation sms:simulates ?instance;
+               sms:result _:result.
+}.
+
+{
+  ?simulation sms:simulates ?instance;
+              sms:result ?result.
+}
+=>
+{
+  _:request http:methodName "GET";
+            http:requestURI ?result;
+            http:headers [ http:fieldName "Accept"; http:fieldValue "text/n3" ];
+            http:resp [ http:body ?result ].
+  ?result sms:resultOf ?simulation.
+}.
+"""
+)
+
+SIMULATION_RESPONSES = {
+    "model": Template(
+        SIMULATION_PREFIXES
+        + "\n<{{ url }}> a sms:Model;\n  sms:instances <{{ url }}/instances>.\n"
+    ),
+    "instance": Template(
+        SIMULATION_PREFIXES
+        + "\n<{{ url }}> sms:instanceOf <{{ model_url }}>;\n"
+        + "  sms:experiments <{{ url }}/experiments>.\n"
+    ),
+    "simulation": Template(
+        SIMULATION_PREFIXES
+        + "\n<{{ url }}> sms:simulates <{{ instance_url }}>;\n"
+        + "  sms:result <{{ url }}/result>.\n"
+    ),
+    "result": Template(
+        SIMULATION_PREFIXES + "\n<{{ url }}> sms:resultOf <{{ simulation_url }}>.\n"
+    ),
+}
+
+# Resource at stage `i` of a synthetic chain, linking to all branches of stage `i+1`
+CHAIN_RESPONSE = Template(
+    """\
+@prefix bench: <http://example.org/benchmark#>.
+
+<{{ url }}> a bench:Stage{{ stage }}
+{%- for branch in range(branching) %};
+  bench:link{{ branch }} <{{ origin }}/chain/{{ stage + 1 }}/{{ branch }}>
+{%- endfor %}.
+"""
+)
+
+
+def negotiate(accept, offered):
+    """Return the first media type in `offered` matched by `accept`; else `None`.
+
+    Quality values are ignored; the media types are considered in the order given
+    in the `Accept`-header.
+    """
+
+    if accept is None or accept.strip() == "":
+        return offered[0]
+
+    for media_range in accept.split(","):
+        media_range = media_range.split(";")[0].strip().lower()
+        for media_type in offered:
+            if media_range in [media_type, "*/*", f"{media_type.split('/')[0]}/*"]:
+                return media_type
+
+    return None
+
+
+def synthetic_payload(size, signature=b"\x89PNG\r\n\x1a\n"):
+    """Return `size` bytes starting with `signature`, e.g. to mimic a PNG image."""
+
+    return (signature + bytes(max(size - len(signature), 0)))[:size]
+
+
+class StandInServer(http.server.ThreadingHTTPServer):
+    """Threaded HTTP server holding configuration and state of the stand-in APIs.
+
+    `latency` is the time in seconds by which each response is delayed, varied
+    uniformly by +/- `jitter`; `payload_size` is the size in bytes of thumbnails and
+    simulation results (`None` returns the original image as thumbnail);
+    `failure_rate` is the probability with which a request fails with status 503;
+    `branching` is the number of links from each resource of a chain to the next.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 0),
+        language="en",
+        latency=0.0,
+        jitter=0.0,
+        payload_size=None,
+        failure_rate=0.0,
+        branching=1,
+        seed=None,
+    ):
+        super().__init__(address, StandInHandler)
+
+        self.language = language
+        self.latency = latency
+        self.jitter = jitter
+        self.payload_size = payload_size
+        self.failure_rate = failure_rate
+        self.branching = branching
+
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.images = {}
+        self.simulations = {}
+        self.n_requests = 0
+        self.n_failures = 0
+
+        self.templates = Environment(loader=FileSystemLoader(TEMPLATES_DIR))
+
+        images = f"/{RESOURCE_NAMES['images'][language]}"
+        self.paths = {
+            "collectionOfImages": images,
+            "thumbnail": RESOURCE_NAMES["thumbnail"][language],
+        }
+
+    @property
+    def origin(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def delay(self):
+        """Return the delay of the next response; whether to inject a failure."""
+
+        with self.lock:
+            self.n_requests += 1
+            delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+            fail = self.random.random() < self.failure_rate
+            if fail:
+                self.n_failures += 1
+
+        return max(delay, 0.0), fail
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def origin(self):
+        """The origin as requested by the client, like `req.headers.host` in Node."""
+
+        host = self.headers.get("host")
+        return self.server.origin if host is None else f"http://{host}"
+
+    # Responding ##########################################################################
+    def send(self, status, media_type, body, headers=None):
+        if isinstance(body, str):
+            body = body.encode()
+
+        self.send_response(status)
+        self.send_header("content-type", media_type)
+        self.send_header("content-length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def send_problem(self, status):
+        title, detail = PROBLEMS[status]
+        self.send(
+            status,
+            "application/problem+json",
+            json.dumps({"title": title, "status": status, "detail": detail}),
+        )
+
+    def render(self, status, accept, variants, data, headers=None):
+        """Render the template of the variant acceptable to the client."""
+
+        media_type = negotiate(accept, list(variants))
+        if media_type is None:
+            return self.send_problem(406)
+
+        self.send(
+            status,
+            media_type,
+            self.server.templates.get_template(variants[media_type]).render(data),
+            headers,
+        )
+
+    def read_body(self):
+        length = int(self.headers.get("content-length", "0"))
+        return self.rfile.read(length)
+
+    # Dispatching #########################################################################
+    def handle_any(self):
+        path = urlparse(self.path).path.rstrip("/") or "/"
+        delay, fail = self.server.delay()
+
+        body = self.read_body()
+        time.sleep(delay)
+
+        if fail:
+            return self.send_problem(503)
+
+        segments = path.split("/")[1:]
+        images = self.server.paths["collectionOfImages"]
+
+        if path == "/":
+            if self.command == "OPTIONS":
+                return self.simulation_restdesc()
+            return self.send_problem(501)
+        if path == images:
+            if self.command == "OPTIONS":
+                return self.restdesc_add_image()
+            if self.command == "POST":
+                return self.add_image(body)
+        elif path.startswith(f"{images}/") and len(segments) == 2:
+            if self.command == "OPTIONS":
+                return self.send_problem(501)
+            if self.command in ["GET", "HEAD"]:
+                return self.get_image(segments[1])
+        elif (
+            path.startswith(f"{images}/")
+            and len(segments) == 3
+            and segments[2] == self.server.paths["thumbnail"]
+        ):
+            if self.command == "OPTIONS":
+                return self.restdesc_get_thumbnail()
+            if self.command in ["GET", "HEAD"]:
+                return self.get_thumbnail(segments[1], path)
+        elif segments[0] == "models":
+            return self.simulation(segments, body)
+        elif segments[0] == "chain" and len(segments) == 3:
+            if self.command in ["GET", "HEAD"]:
+                return self.chain(segments[1], segments[2])
+
+        self.send_problem(404)
+
+    do_GET = handle_any
+    do_HEAD = handle_any
+    do_OPTIONS = handle_any
+    do_POST = handle_any
+    do_PUT = handle_any
+    do_DELETE = handle_any
+
+    def log_message(self, format, *args):
+        logger.trace(f"{self.address_string()} {format % args}")
+
+    # Image API ###########################################################################
+    def restdesc_add_image(self):
+        url = f"{self.origin}{self.server.paths['collectionOfImages']}"
+        self.render(
+            200,
+            self.headers.get("accept"),
+            {"text/n3": "add_image_restdesc.n3.j2"},
+            {"path": url},
+            {"allow": "POST,HEAD,OPTIONS"},
+        )
+
+    def restdesc_get_thumbnail(self):
+        self.render(
+            200,
+            self.headers.get("accept"),
+            {"text/n3": "get_thumbnail_restdesc.n3"},
+            {},
+            {"allow": "GET,HEAD,OPTIONS"},
+        )
+
+    def add_image(self, body):
+        if not body:
+            return self.send_problem(400)
+
+        image_id = hashlib.md5(body).hexdigest()
+        with self.server.lock:
+            self.server.images[image_id] = body
+
+        image_url = f"{self.origin}{self.server.paths['collectionOfImages']}/{image_id}"
+        thumbnail_url = f"{image_url}/{self.server.paths['thumbnail']}"
+
+        # The templates disagree on the name of the variable; provide both
+        self.render(
+            201,
+            self.headers.get("accept"),
+            {
+                "text/n3": "add_image_response.n3.j2",
+                "application/ld+json": "add_image_response.jsonld.j2",
+            },
+            {
+                "image_id": image_url,
+                "image_url": image_url,
+                "thumbnail_url": thumbnail_url,
+            },
+            {"location": image_url},
+        )
+
+    def get_image(self, image_id):
+        image = self.server.images.get(image_id)
+        if image is None:
+            return self.send_problem(404)
+
+        if negotiate(self.headers.get("accept"), ["image/png"]) is None:
+            return self.send_problem(406)
+
+        self.send(200, "image/png", image)
+
+    def get_thumbnail(self, image_id, path):
+        image = self.server.images.get(image_id)
+        if image is None:
+            return self.send_problem(404)
+
+        accept = self.headers.get("accept")
+        media_type = negotiate(accept, ["image/png", "text/n3", "application/ld+json"])
+        if media_type == "image/png":
+            size = self.server.payload_size
+            return self.send(
+                200, "image/png", image if size is None else synthetic_payload(size)
+            )
+
+        image_url = f"{self.origin}{self.server.paths['collectionOfImages']}/{image_id}"
+        self.render(
+            200,
+            accept,
+            {
+                "text/n3": "get_thumbnail_response.n3.j2",
+                "application/ld+json": "get_thumbnail_response.jsonld.j2",
+            },
+            {
+                "image_id": image_url,
+                "image_url": image_url,
+                "thumbnail_url": f"{self.origin}{path}",
+            },
+        )
+
+    # Simulation API ######################################################################
+    def simulation_restdesc(self):
+        if negotiate(self.headers.get("accept"), ["text/n3"]) is None:
+            return self.send_problem(406)
+
+        self.send(
+            200,
+            "text/n3",
+            SIMULATION_RESTDESC.render(origin=self.origin),
+            {"allow": "GET,HEAD,OPTIONS"},
+        )
+
+    def create(self, kind, parent, template_data):
+        """Create a resource of `kind` below `parent`; respond with its description."""
+
+        if negotiate(self.headers.get("accept"), ["text/n3"]) is None:
+            return self.send_problem(406)
+
+        path = f"{urlparse(parent).path}/{uuid.uuid4()}"
+        with self.server.lock:
+            self.server.simulations[path] = kind
+
+        url = f"{self.origin}{path}"
+        self.send(
+            201,
+            "text/n3",
+            SIMULATION_RESPONSES[kind].render(url=url, **template_data),
+            {"location": url},
+        )
+
+    def simulation(self, segments, body):
+        path = f"/{'/'.join(segments)}"
+        parent = os.path.dirname(path)
+        kind = self.server.simulations.get(parent)
+        url = f"{self.origin}{path}"
+
+        if self.command == "POST":
+            if segments == ["models"]:
+                if not body:
+                    return self.send_problem(400)
+                return self.create("model", url, {})
+            if segments[-1] == "instances" and kind == "model":
+                return self.create(
+                    "instance", url, {"model_url": f"{self.origin}{parent}"}
+                )
+            if segments[-1] == "experiments" and kind == "instance":
+                return self.create(
+                    "simulation", url, {"instance_url": f"{self.origin}{parent}"}
+                )
+        elif self.command in ["GET", "HEAD"]:
+            if segments[-1] == "result" and kind == "simulation":
+                accept = self.headers.get("accept")
+                media_type = negotiate(accept, ["text/n3", "application/octet-stream"])
+                if media_type == "text/n3":
+                    return self.send(
+                        200,
+                        media_type,
+                        SIMULATION_RESPONSES["result"].render(
+                            url=url, simulation_url=f"{self.origin}{parent}"
+                        ),
+                    )
+                if media_type is not None:
+                    size = self.server.payload_size or 0
+                    return self.send(200, media_type, synthetic_payload(size, b""))
+                return self.send_problem(406)
+            if path in self.server.simulations:
+                return self.send_problem(501)
+
+        self.send_problem(404)
+
+    # Synthetic chains ####################################################################
+    def chain(self, stage, branch):
+        if not (stage.isdigit() and branch.isdigit()):
+            return self.send_problem(404)
+        if negotiate(self.headers.get("accept"), ["text/n3"]) is None:
+            return self.send_problem(406)
+
+        self.send(
+            200,
+            "text/n3",
+            CHAIN_RESPONSE.render(
+                url=f"{self.origin}/chain/{stage}/{branch}",
+                origin=self.origin,
+                stage=int(stage),
+                branching=self.server.branching,
+            ),
+        )
+
+
+def start_standin_server(host="127.0.0.1", port=0, **kwargs):
+    """Start a stand-in server in a background thread; return it.
+
+    Call `shutdown()` on the server returned to stop it again.
+    """
+
+    server = StandInServer((host, port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Stand-in server listening on {server.origin}")
+
+    return server
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Keep track of the state of the PPA such that an interrupted run can be resumed."""
+
+
+import dataclasses
+import json
+import os
+from typing import List, Optional
+
+import rdflib
+from loguru import logger
+
+from .namespaces import NAMESPACE_MANAGER
+
+# The name of the file in the working directory holding the last checkpoint
+CHECKPOINT = "ppa_state.json"
+
+# Base used to parse relative IRIs like `<#rule_00>` without resolving them for good
+RELATIVE_BASE = "urn:x-ppa:relative"
+
+
+# Phases of one iteration of the PPA; each names the step to be executed next
+REPLAY = "replay"  # send the next request of a memoized plan
+PRE_PROOF = "pre_proof"  # (1) generate the pre-proof
+SELECT = "select"  # (2-4) evaluate the pre-proof, then select and execute requests
+POST_PROOF = "post_proof"  # (5b-7) generate the post-proof and compare
+DONE = "done"  # the PPA terminated; `status` holds the result
+
+
+@dataclasses.dataclass
+class PPAState(object):
+    """Everything needed to continue the PPA after the last executed requests.
+
+    Proofs, knowledge and the graph of shapes and user input are referenced by the
+    names of the files in `directory` that they were written to.
+    """
+
+    directory: str
+    H: List[str]
+    g: str
+    R: List[str]
+    B: Optional[str] = None
+    backend: Optional[str] = None
+    iteration: int = 0
+    phase: str = PRE_PROOF
+    pre_proof: Optional[str] = None
+    n_pre: Optional[int] = None
+    executed: List[str] = dataclasses.field(default_factory=list)
+    agent_knowledge: Optional[List[str]] = None
+    si: Optional[str] = None
+    status: Optional[int] = None
+
+    # The requests that led to the current knowledge, for memoizing plans
+    signature: Optional[str] = None
+    plan: List[dict] = dataclasses.field(default_factory=list)
+    pending: List[dict] = dataclasses.field(default_factory=list)
+
+    # Kept in memory only: the `ProofIndex` of `pre_proof` if it is available already
+    proof: object = dataclasses.field(default=None, repr=False, compare=False)
+
+    def to_dict(self):
+        # Avoid `dataclasses.asdict()`, which would deep-copy the proof as well
+        return {
+            field.name: getattr(self, field.name)
+            for field in dataclasses.fields(self)
+            if field.name != "proof"
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(**state)
+
+    def save(self):
+        """Write the state atomically to the checkpoint file in `directory`."""
+
+        path = os.path.join(self.directory, CHECKPOINT)
+        with open(f"{path}.tmp", "w") as fp:
+            json.dump(self.to_dict(), fp, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+        logger.log(
+            "DETAIL", f"Saved checkpoint: iteration {self.iteration}, '{self.phase}'"
+        )
+
+    @classmethod
+    def load(cls, directory):
+        """Read the last checkpoint stored in `directory`."""
+
+        with open(os.path.join(directory, CHECKPOINT)) as fp:
+            state = cls.from_dict(json.load(fp))
+
+        state.directory = directory
+
+        return state
+
+    def load_shapes_and_inputs(self):
+        """Parse the graph of shapes and user input stored with the checkpoint."""
+
+        graph = rdflib.Graph()
+        graph.namespace_manager = NAMESPACE_MANAGER
+
+        if self.si is None:
+            return graph
+
+        parsed = rdflib.Graph()
+        parsed.parse(
+            os.path.join(self.directory, self.si), format="n3", publicID=RELATIVE_BASE
+        )
+
+        # Restore relative IRIs like `<#rule_00>` as created by the PPA
+        def relative(term):
+            if isinstance(term, rdflib.URIRef) and term.startswith(RELATIVE_BASE):
+                return rdflib.URIRef(term[len(RELATIVE_BASE) :])
+            return term
+
+        for s, p, o in parsed:
+            graph.add((relative(s), relative(p), relative(o)))
+
+        return graph
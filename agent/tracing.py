@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Time the phases of the PPA and record where the time went.
+
+Each span is written as one line of JSON to `ppa_trace.jsonl` in the working
+directory, followed by a summary per iteration. Totals since the start of the
+process can be exported in the text format of Prometheus, e.g. for the textfile
+collector of the node exporter.
+"""
+
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from loguru import logger
+
+# The file in which the trace is stored within the working directory
+TRACE = "ppa_trace.jsonl"
+
+# Attributes of spans that are summed up per iteration and exported as counters
+COUNTERS = {
+    "bytes_sent": ("ppa_http_sent_bytes_total", "Bytes of request bodies sent"),
+    "bytes_received": (
+        "ppa_http_received_bytes_total",
+        "Bytes of response bodies received",
+    ),
+    "proof_triples": ("ppa_proof_triples_total", "Triples in all proofs deduced"),
+    "response_triples": (
+        "ppa_response_triples_total",
+        "Triples extracted from HTTP responses",
+    ),
+}
+
+
+class Tracer(object):
+    """Record the duration and attributes of spans, aggregated per iteration.
+
+    Spans may be nested and may be recorded concurrently by several threads; all of
+    them are attributed to the iteration set through `begin()`.
+    """
+
+    def __init__(self, metrics_path=None):
+        self.metrics_path = metrics_path
+
+        self.lock = threading.Lock()
+        self.path = None
+        self.iteration = None
+        self.current = None
+
+        self.durations = {}  # span -> [count, seconds] since the start of the process
+        self.counters = {name: 0 for name in COUNTERS}
+        self.n_iterations = 0
+        self.runs = {}  # status -> number of runs
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time the block; attributes can be added to the dictionary yielded."""
+
+        attributes = dict(attributes)
+        start = time.time()
+        begin = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            self.record(name, start, time.perf_counter() - begin, attributes)
+
+    def record(self, name, start, duration, attributes):
+        with self.lock:
+            count, seconds = self.durations.get(name, (0, 0.0))
+            self.durations[name] = (count + 1, seconds + duration)
+
+            for attribute in COUNTERS:
+                value = attributes.get(attribute)
+                if isinstance(value, (int, float)):
+                    self.counters[attribute] += value
+                    if self.current is not None:
+                        self.current["counters"][attribute] += value
+
+            if self.current is not None:
+                spans = self.current["spans"]
+                count, seconds = spans.get(name, (0, 0.0))
+                spans[name] = (count + 1, seconds + duration)
+
+            self.write(
+                dict(
+                    {
+                        "event": "span",
+                        "span": name,
+                        "iteration": self.iteration,
+                        "start": start,
+                        "duration": duration,
+                    },
+                    **attributes,
+                )
+            )
+
+    def write(self, record):
+        if self.path is None:
+            return
+
+        try:
+            with open(self.path, "a") as fp:
+                fp.write(json.dumps(record, default=str) + "\n")
+        except OSError as e:
+            logger.warning(f"Cannot write trace to '{self.path}': {e!r}")
+            self.path = None
+
+    def begin(self, directory, iteration):
+        """Attribute the following spans to `iteration` of the run in `directory`."""
+
+        path = None
+        if os.getenv("AGENT_TRACE", "1") not in ["0", "false", "no"]:
+            path = os.path.join(directory, TRACE)
+
+        if path != self.path or iteration != self.iteration:
+            self.end_iteration()
+
+        with self.lock:
+            self.path = path
+            if self.current is None:
+                self.iteration = iteration
+                self.current = {
+                    "start": time.perf_counter(),
+                    "spans": {},
+                    "counters": {name: 0 for name in COUNTERS},
+                }
+
+    def end_iteration(self):
+        """Write the summary of the current iteration, if any."""
+
+        with self.lock:
+            current, self.current = self.current, None
+            if current is None:
+                return
+
+            self.n_iterations += 1
+            self.write(
+                dict(
+                    {
+                        "event": "iteration",
+                        "iteration": self.iteration,
+                        "duration": time.perf_counter() - current["start"],
+                        "spans": {
+                            name: {"count": count, "duration": seconds}
+                            for name, (count, seconds) in current["spans"].items()
+                        },
+                    },
+                    **current["counters"],
+                )
+            )
+
+        self.export()
+
+    def end_run(self, status):
+        """Close the last iteration and count the run as finished with `status`."""
+
+        self.end_iteration()
+        with self.lock:
+            self.runs[status] = self.runs.get(status, 0) + 1
+            self.write({"event": "run", "status": status})
+            self.path = None
+            self.iteration = None
+
+        self.export()
+
+    def prometheus(self):
+        """Return the totals in the text-based exposition format of Prometheus."""
+
+        with self.lock:
+            lines = [
+                "# HELP ppa_span_duration_seconds Time spent in the phases of the PPA",
+                "# TYPE ppa_span_duration_seconds summary",
+            ]
+            for name, (count, seconds) in sorted(self.durations.items()):
+                lines.append(
+                    f'ppa_span_duration_seconds_sum{{span="{name}"}} {seconds}'
+                )
+                lines.append(
+                    f'ppa_span_duration_seconds_count{{span="{name}"}} {count}'
+                )
+
+            for attribute, (metric, description) in COUNTERS.items():
+                lines.append(f"# HELP {metric} {description}")
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {self.counters[attribute]}")
+
+            lines.append("# HELP ppa_iterations_total Iterations of the PPA")
+            lines.append("# TYPE ppa_iterations_total counter")
+            lines.append(f"ppa_iterations_total {self.n_iterations}")
+
+            lines.append("# HELP ppa_runs_total Runs of the PPA by exit status")
+            lines.append("# TYPE ppa_runs_total counter")
+            for status, count in sorted(self.runs.items()):
+                lines.append(f'ppa_runs_total{{status="{status}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+    def export(self):
+        """Write the totals to `metrics_path` atomically, if set."""
+
+        if self.metrics_path is None:
+            return
+
+        tmp = f"{self.metrics_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as fp:
+                fp.write(self.prometheus())
+            os.replace(tmp, self.metrics_path)
+        except OSError as e:
+            logger.warning(f"Cannot export metrics to '{self.metrics_path}': {e!r}")
+
+
+TRACER = None
+TRACER_LOCK = threading.Lock()
+
+
+def get_tracer():
+    """Return the tracer shared by all runs within this process."""
+
+    global TRACER
+
+    with TRACER_LOCK:
+        if TRACER is None:
+            TRACER = Tracer(os.getenv("AGENT_METRICS_FILE"))
+
+    return TRACER
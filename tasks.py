@@ -9,14 +9,15 @@
 
 
 import os
-import re
+import shutil
 import sys
+import threading
 
-import requests
-from invoke import Context, task
-from jinja2 import Environment, FileSystemLoader
+from invoke import task
 
-from agent import FAILURE, SUCCESS, logger, solve_api_composition_problem
+# Only the logger is imported eagerly; everything else is imported by the tasks
+# using it, such that `invoke --list` and the like start quickly
+from agent import logger
 
 
 # Utitily functions
@@ -30,46 +31,17 @@ def delete_all_files(directory):
         os.remove(file.path)
 
 
-def split_restdesc(text, directory):
-    """Store each RESTdesc rule in a separate file.
+def exit_with_status(status):
+    """Properly set exit code."""
 
-    This facilitates handling in the pragmatic proof algorithm as omitting a rule from
-    evaluation becomes trivial iff all rules are stored in a separate file.
-    """
-
-    # Extract prefix declarations
-    prefixes_regex = re.compile(
-        r"^(?P<prefix>@prefix) (?P<abbrv>[\w-]*:) (?P<url><[\w\d:\/\.#-]+>) *\.$",
-        re.MULTILINE,
-    )
-
-    prefixes_all = ""
-    for p, c, l in prefixes_regex.findall(text):
-        prefixes_all += f"{p} {c} {l} .\n"
-
-    # Get iterable for all rules in input
-    rules_regex = re.compile(
-        r"(?P<rule>{[.\n\s_:?\w\";\/\[\]]*}\n*=>\n*{[.\n\s_:?\w\";\/\[\]-]*\n*}\s*\.)"
-    )
+    from agent import SUCCESS
 
-    # # TODO Also get corresponding comment
-    # r"^#\s+[\w\s]*#*$"
-
-    # Write each rule to disk in a separate file
-    filenames = []
-    rule_number = 0
-    for rule in rules_regex.findall(text):
-        filename = f"rule_{rule_number:0>2}.n3"
-        filepath = os.path.join(directory, filename)
-
-        logger.debug(f"Saving RESTdesc rule as '{filename}'...")
-        with open(filepath, "w") as fp:
-            fp.write(f"{prefixes_all}\n{rule}")
-
-        filenames.append(filename)
-        rule_number += 1
+    if status == SUCCESS:
+        logger.info("Done! 😎")
+    else:
+        logger.error("💥 Terminating with non-zero exit code...")
 
-    return filenames
+    sys.exit(status)
 
 
 @task(
@@ -118,37 +90,9 @@ def download_restdesc(ctx, origin, tmp_dir, tmp_clean=False, selector=None):
         ],
         "ms": ["/"],
     }
-    content_type = "text/n3"
-
-    filenames = []
-
-    for path in api_paths[selector]:
-        href = f"{origin}{path}"
-        headers = {"accept": content_type}
+    from agent.discovery import discover_restdesc
 
-        logger.log("REQUEST", f"OPTIONS {href}")
-        r = requests.options(href, headers=headers)
-
-        restdesc = r.text
-        if restdesc == "" or r.status_code == 501:
-            logger.warning(f"RESTdesc for path '{path}' is empty/does not exist")
-        else:
-            if path == "/":
-                # Store each rule in a separate file so 'R without r' works better
-                filenames = split_restdesc(restdesc, tmp_dir)
-            else:
-                filename = "_".join(path.replace("_", "x").split("/")[1:]) + ".n3"
-                logger.debug(f"{filename}\n{restdesc}")
-
-                # Store on disk
-                path = os.path.join(tmp_dir, filename)
-                logger.trace(f"Writing RESTdesc to {path}...")
-                with open(path, "w") as fp:
-                    fp.write(restdesc)
-
-                filenames.append(filename)
-
-    return filenames
+    return discover_restdesc(origin, api_paths[selector], tmp_dir, "text/n3")
 
 
 @task(
@@ -157,11 +101,20 @@ def download_restdesc(ctx, origin, tmp_dir, tmp_clean=False, selector=None):
         "origin": "The root URL to the service instance",
         "tmp_dir": "The directory in which to store all files created during execution",
         "tmp_clean": "Delete all files in `tmp_dir` before starting",
-    }
+        "backend": "The reasoner backend to use: 'docker', 'local' or 'stub'",
+        "profile": "Profile each iteration: 'cpu', 'memory' or 'all'",
+    },
+    optional=["backend", "profile"],
 )
-def run_example(ctx, example, origin, tmp_dir, tmp_clean=False):
+def run_example(
+    ctx, example, origin, tmp_dir, tmp_clean=False, backend=None, profile=None
+):
     """Collect definition of specific API composition problem; then solve it."""
 
+    from jinja2 import Environment, FileSystemLoader
+
+    from agent import solve_api_composition_problem
+
     # Choose between the examples provided in this repository
     if example not in ["image-resizing", "simulation"]:
         logger.error(f"Example '{example}' not supported, exiting...")
@@ -224,12 +177,204 @@ def run_example(ctx, example, origin, tmp_dir, tmp_clean=False):
             fp.write(template.render(data))
 
     # Solve API composition problem
-    status = solve_api_composition_problem(ctx, tmp_dir, [H], g, R, B)
+    status = solve_api_composition_problem(
+        ctx, tmp_dir, [H], g, R, B, backend=backend, profile=profile
+    )
 
-    # Properly set exit code
-    if status == SUCCESS:
-        logger.info("Done! 😎")
-    else:
-        logger.error("💥 Terminating with non-zero exit code...")
+    exit_with_status(status)
 
-    sys.exit(status)
+
+@task(
+    help={
+        "manifest": "A YAML/JSON file listing the initial state and goal of each job",
+        "origin": "The root URL to the service instance",
+        "tmp_dir": "The directory in which to create a working directory per job",
+        "tmp_clean": "Delete all files in `tmp_dir` before starting",
+        "selector": "Identifier for which variant of the img-API to use ('en'/'de'/'fr')",
+        "processes": "The maximum number of jobs to solve in parallel",
+        "backend": "The reasoner backend to use: 'docker', 'local' or 'stub'",
+    },
+    optional=["selector", "processes", "backend"],
+)
+def batch(
+    ctx,
+    manifest,
+    origin,
+    tmp_dir,
+    tmp_clean=False,
+    selector=None,
+    processes=None,
+    backend=None,
+):
+    """Solve many API composition problems against the same API in parallel."""
+
+    from agent import FAILURE, SUCCESS
+    from agent.batch import read_manifest, solve_batch
+
+    jobs = read_manifest(manifest)
+    logger.info(f"Solving {len(jobs)} API composition problems from '{manifest}'...")
+
+    if tmp_clean == True:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # Discover _description formulas R_ once for all jobs
+    shared_dir = os.path.join(tmp_dir, "shared")
+    os.makedirs(shared_dir, exist_ok=True)
+    R = download_restdesc(ctx, origin, shared_dir, False, selector)
+
+    processes = int(processes) if processes is not None else None
+    n_failed = solve_batch(jobs, shared_dir, R, tmp_dir, processes, backend)
+
+    exit_with_status(SUCCESS if n_failed == 0 else FAILURE)
+
+
+@task(
+    help={
+        "tmp_dir": "The directory in which the interrupted run stored its files",
+        "backend": "The reasoner backend to use: 'docker', 'local' or 'stub'",
+        "profile": "Profile each iteration: 'cpu', 'memory' or 'all'",
+    },
+    optional=["backend", "profile"],
+)
+def resume(ctx, tmp_dir, backend=None, profile=None):
+    """Continue an interrupted run from its last checkpoint in `tmp_dir`.
+
+    Neither the proofs nor the HTTP requests completed before the checkpoint are
+    repeated.
+    """
+
+    from agent import resume_api_composition_problem
+
+    status = resume_api_composition_problem(ctx, tmp_dir, backend, profile)
+
+    exit_with_status(status)
+
+
+@task(
+    help={
+        "output": "The JSON file to write the results to",
+        "chain_length": "The number of requests needed to reach the goal",
+        "branching": "The number of alternative rules per request",
+        "n_rules": "The total number of rules, filled up with unrelated ones",
+        "repetitions": "How often to solve the problem",
+        "backend": "The reasoner backend to use: 'docker', 'local' or 'stub'",
+        "tmp_dir": "The directory in which to keep the files of all runs",
+        "latency": "The time in seconds by which each response is delayed",
+        "baseline": "Results of an earlier benchmark to compare against",
+        "tolerance": "The relative slowdown compared to `baseline` deemed a regression",
+    },
+    optional=["backend", "tmp_dir", "baseline"],
+)
+def benchmark(
+    ctx,
+    output="benchmark.json",
+    chain_length=3,
+    branching=1,
+    n_rules=0,
+    repetitions=3,
+    backend=None,
+    tmp_dir=None,
+    latency="0",
+    baseline=None,
+    tolerance="0.1",
+):
+    """Benchmark the PPA on a synthetic problem served by the local stand-in."""
+
+    from agent import FAILURE, SUCCESS
+    from agent.benchmark import (
+        compare_results,
+        read_results,
+        run_benchmark,
+        write_results,
+    )
+
+    results = run_benchmark(
+        int(chain_length),
+        int(branching),
+        int(n_rules),
+        int(repetitions),
+        backend,
+        tmp_dir,
+        float(latency),
+    )
+    write_results(output, results)
+    logger.info(f"Wrote benchmark results to '{output}'")
+
+    status = SUCCESS
+    if any(run["status"] != "success" for run in results["runs"]):
+        logger.error("Not all repetitions reached the goal!")
+        status = FAILURE
+
+    if baseline is not None:
+        regressions = compare_results(read_results(baseline), results, float(tolerance))
+        for regression in regressions:
+            logger.error(
+                f"Regression in {regression['metric']}: "
+                f"{regression['baseline']:.3f}s -> {regression['current']:.3f}s "
+                f"(x{regression['ratio']:.2f})"
+            )
+        if len(regressions) > 0:
+            status = FAILURE
+
+    exit_with_status(status)
+
+
+@task(
+    help={
+        "repetitions": "How often to evaluate each query per measurement",
+    },
+)
+def benchmark_queries(ctx, repetitions=100):
+    """Compare the SPARQL queries parsed per call to their prepared replacements."""
+
+    from agent.benchmark import benchmark_queries
+
+    benchmark_queries(int(repetitions))
+
+
+@task(
+    help={
+        "host": "The address to listen on",
+        "port": "The port to listen on",
+        "language": "Which variant of the img-API to serve ('en'/'de'/'fr')",
+        "latency": "The time in seconds by which each response is delayed",
+        "jitter": "The maximum deviation in seconds from `latency`",
+        "payload_size": "The size in bytes of thumbnails and simulation results",
+        "failure_rate": "The probability with which a request fails with status 503",
+        "seed": "Seed of the random number generator, for reproducible failures",
+    },
+    optional=["payload_size", "seed"],
+)
+def stand_in(
+    ctx,
+    host="127.0.0.1",
+    port=3000,
+    language="en",
+    latency="0",
+    jitter="0",
+    payload_size=None,
+    failure_rate="0",
+    seed=None,
+):
+    """Serve a local stand-in for the hypermedia APIs used in the examples."""
+
+    from agent.standin import start_standin_server
+
+    server = start_standin_server(
+        host,
+        int(port),
+        language=language,
+        latency=float(latency),
+        jitter=float(jitter),
+        payload_size=int(payload_size) if payload_size is not None else None,
+        failure_rate=float(failure_rate),
+        seed=int(seed) if seed is not None else None,
+    )
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        logger.info(
+            f"Served {server.n_requests} requests, {server.n_failures} failed on purpose"
+        )
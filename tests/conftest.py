@@ -12,8 +12,10 @@ https://docs.python-guide.org/writing/structure/#test-suite
 for an explanation.
 """
 
+import http.server
 import os
 import sys
+import threading
 
 import pytest
 import yaml
@@ -31,6 +33,49 @@ sys.path.insert(0, BASEPATH)
 import agent  # noqa -- import has to happen _after_ modifying PATH
 
 
+@pytest.fixture(autouse=True)
+def isolated_caches(monkeypatch, tmp_path):
+    """Keep the caches and statistics the agent persists out of `$HOME`.
+
+    The process-wide singletons are reset as well, such that no test reuses the
+    HTTP client, cost model or proof cache configured by a previous one.
+    """
+
+    cache_home = tmp_path / "cache"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_home))
+    monkeypatch.setenv("AGENT_HTTP_CACHE_DIR", str(cache_home / "http"))
+    monkeypatch.setenv("AGENT_LATENCY_STATS", str(cache_home / "latency.json"))
+    monkeypatch.setenv("AGENT_PLANS_DIR", str(cache_home / "plans"))
+    monkeypatch.delenv("EYE_CACHE_DIR", raising=False)
+
+    monkeypatch.setattr(agent.client, "HTTP_CLIENT", None)
+    monkeypatch.setattr(agent.cost, "COST_MODEL", None)
+    monkeypatch.setattr(agent.cache, "PROOF_CACHE", None)
+
+
+@pytest.fixture
+def serve_http():
+    """Return a function serving HTTP with a handler class on a local port.
+
+    The function returns the origin of the server. All servers started by a test
+    are shut down afterwards, also if the test fails.
+    """
+
+    servers = []
+
+    def serve(handler):
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield serve
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
 def pytest_generate_tests(metafunc):
     """Parameterize tests by reading their consituents from a YAML-file."""
 
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Unit tests for solving batches of API composition problems."""
+
+import json
+import os
+import shutil
+
+import pytest
+
+import agent.cache
+import agent.catalog
+import agent.reasoner
+from agent.batch import init_worker, read_manifest, solve_batch, solve_job
+from agent.catalog import RuleCatalog, get_rule_catalog
+
+test_data_base_path = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "tests", "data")
+)
+
+
+class TestBatch(object):
+    def test_read_manifest(self, tmp_path):
+        (tmp_path / "manifest.yaml").write_text(
+            "background: b.n3\n"
+            "jobs:\n"
+            "  - initial_state: h0.n3\n"
+            "    goal: g.n3\n"
+            "  - name: second\n"
+            "    initial_state: /abs/h1.n3\n"
+            "    goal: g.n3\n"
+        )
+
+        jobs = read_manifest(str(tmp_path / "manifest.yaml"))
+
+        assert [job["name"] for job in jobs] == ["0000", "second"]
+        assert jobs[0]["H"] == str(tmp_path / "h0.n3")
+        assert jobs[1]["H"] == "/abs/h1.n3"
+        assert jobs[1]["B"] == str(tmp_path / "b.n3")
+
+    def test_jobs_are_isolated(self, monkeypatch, tmp_path):
+        # Nothing to replay, so each job fails right after setting up its directory
+        monkeypatch.setenv("EYE_STUB_DIR", str(tmp_path / "recordings"))
+        monkeypatch.setenv("EYE_CACHE_DIR", str(tmp_path / "proof_cache"))
+
+        shared_dir = tmp_path / "shared"
+        shared_dir.mkdir()
+        R = ["images.n3"]
+        shutil.copy(os.path.join(test_data_base_path, "images.n3"), shared_dir)
+        for filename in ["h.n3", "g.n3", "b.n3"]:
+            (tmp_path / filename).write_text("<#a> <#b> <#c>.\n")
+
+        jobs = [
+            {
+                "name": name,
+                "H": str(tmp_path / "h.n3"),
+                "g": str(tmp_path / "g.n3"),
+                "B": str(tmp_path / "b.n3"),
+            }
+            for name in ["one", "two", "three"]
+        ]
+
+        n_failed = solve_batch(jobs, str(shared_dir), R, str(tmp_path), 2, "stub")
+
+        assert n_failed == 3
+        results = json.loads((tmp_path / "batch_results.json").read_text())
+        assert results == {"one": 1, "three": 1, "two": 1}
+        for name in ["one", "two", "three"]:
+            assert os.path.isfile(tmp_path / name / "00_init_knowledge.n3")
+            assert os.path.samefile(
+                tmp_path / name / "images.n3", shared_dir / "images.n3"
+            )
+
+    def test_leaves_environment_alone(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("EYE_STUB_DIR", str(tmp_path / "recordings"))
+        monkeypatch.delenv("EYE_CACHE_DIR", raising=False)
+        (tmp_path / "shared").mkdir()
+        for filename in ["h.n3", "g.n3", "b.n3"]:
+            (tmp_path / filename).write_text("<#a> <#b> <#c>.\n")
+        jobs = [
+            {
+                "name": "one",
+                "H": str(tmp_path / "h.n3"),
+                "g": str(tmp_path / "g.n3"),
+                "B": str(tmp_path / "b.n3"),
+            }
+        ]
+
+        solve_batch(jobs, str(tmp_path / "shared"), [], str(tmp_path), 1, "stub")
+
+        assert "EYE_CACHE_DIR" not in os.environ
+        assert os.path.isdir(tmp_path / "proof_cache")
+
+    def test_workers_reuse_parsed_rules(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(agent.catalog, "SHARED_RULES", {})
+        shutil.copy(os.path.join(test_data_base_path, "images.n3"), tmp_path)
+        (rule,) = RuleCatalog(str(tmp_path)).extend(["images.n3"])
+
+        init_worker(str(tmp_path / "proof_cache"), [rule])
+        job_dir = tmp_path / "one"
+        job_dir.mkdir()
+        shutil.copy(os.path.join(test_data_base_path, "images.n3"), job_dir)
+
+        assert get_rule_catalog(str(job_dir)).add("images.n3") is rule
+        assert agent.cache.get_proof_cache().directory == str(tmp_path / "proof_cache")
+
+    def test_job_stops_its_eye_workers(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("EYE_STUB_DIR", str(tmp_path / "recordings"))
+        monkeypatch.setenv("EYE_CACHE_DIR", str(tmp_path / "proof_cache"))
+        for filename in ["h.n3", "g.n3"]:
+            (tmp_path / filename).write_text("<#a> <#b> <#c>.\n")
+
+        class FakePool(object):
+            closed = False
+
+            def close(self):
+                self.closed = True
+
+        directory = str(tmp_path / "one")
+        mine, other = FakePool(), FakePool()
+        pools = {
+            (directory, "/mnt", "eye"): mine,
+            (str(tmp_path / "two"), "/mnt", "eye"): other,
+        }
+        monkeypatch.setattr(agent.reasoner, "POOLS", pools)
+
+        job = {
+            "name": "one",
+            "H": str(tmp_path / "h.n3"),
+            "g": str(tmp_path / "g.n3"),
+            "B": None,
+            "directory": directory,
+        }
+        with pytest.raises(NotImplementedError):  # B is required, see the PPA
+            solve_job(job, str(tmp_path), [], "stub")
+
+        assert mine.closed
+        assert not other.closed
+        assert list(pools.values()) == [other]
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Unit tests for the end-to-end benchmark suite."""
+
+import copy
+import os
+import shutil
+
+import pytest
+import rdflib
+import requests
+
+from agent.benchmark import (
+    compare_results,
+    generate_problem,
+    phases_from_trace,
+    run_benchmark,
+)
+from agent.catalog import RuleCatalog
+from agent.rules import prune_rules
+from agent.standin import start_standin_server
+from agent.tracing import TRACE, Tracer
+
+BENCH = rdflib.Namespace("http://example.org/benchmark#")
+
+
+def results(**medians):
+    return {
+        "parameters": {"chain_length": 3},
+        "summary": {metric: {"median": value} for metric, value in medians.items()},
+    }
+
+
+class TestBenchmark(object):
+    def test_generate_problem(self, tmp_path):
+        H, g, R, B = generate_problem(str(tmp_path), "http://api", 3, 2, n_rules=10)
+
+        assert len(R) == 10
+        for filename in [H, g, B] + R:
+            rdflib.Graph().parse(str(tmp_path / filename), format="n3")
+
+        pruned = prune_rules(str(tmp_path), g, R, None, RuleCatalog(str(tmp_path)))
+        assert pruned == [filename for filename in R if filename.startswith("stage")]
+
+    def test_standin_serves_chain(self):
+        server = start_standin_server(branching=2)
+        try:
+            r = requests.get(f"{server.origin}/chain/1/1")
+        finally:
+            server.shutdown()
+
+        graph = rdflib.Graph().parse(data=r.text, format="n3")
+        resource = rdflib.URIRef(f"{server.origin}/chain/1/1")
+        assert (resource, rdflib.RDF.type, BENCH.Stage1) in graph
+        assert graph.value(resource, BENCH.link1) == rdflib.URIRef(
+            f"{server.origin}/chain/2/1"
+        )
+
+    def test_phases_from_trace(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("AGENT_TRACE", "1")
+        tracer = Tracer()
+
+        tracer.begin(str(tmp_path), 0)
+        tracer.record("reasoning", 0.0, 0.5, {})
+        tracer.record("find_rule_applications", 0.0, 0.1, {})
+        tracer.record("identify_http_requests", 0.0, 0.2, {})
+        tracer.begin(str(tmp_path), 1)
+        tracer.record("http", 0.0, 0.3, {})
+        tracer.record("http_request", 0.0, 0.3, {})  # nested in `http`
+        tracer.record("knowledge_update", 0.0, 0.05, {})
+        tracer.end_run("success")
+
+        assert phases_from_trace(str(tmp_path / TRACE)) == [
+            {
+                "iteration": 0,
+                "reasoning": 0.5,
+                "proof_processing": pytest.approx(0.3),
+                "http": 0.0,
+                "knowledge_update": 0.0,
+            },
+            {
+                "iteration": 1,
+                "reasoning": 0.0,
+                "proof_processing": 0.0,
+                "http": 0.3,
+                "knowledge_update": 0.05,
+            },
+        ]
+
+    def test_compare_results(self):
+        baseline = results(wall=1.0, reasoning=0.5, proof_processing=0.1, http=0.2)
+        baseline["summary"]["knowledge_update"] = {"median": 0.001}
+
+        current = copy.deepcopy(baseline)
+        current["summary"]["reasoning"]["median"] = 0.8
+        current["summary"]["http"]["median"] = 0.21
+        current["summary"]["knowledge_update"]["median"] = 0.002
+
+        assert [r["metric"] for r in compare_results(baseline, current)] == [
+            "reasoning"
+        ]
+
+        current["parameters"]["chain_length"] = 4
+        with pytest.raises(ValueError):
+            compare_results(baseline, current)
+
+    @pytest.mark.skipif(
+        shutil.which(os.getenv("EYE_COMMAND", "eye")) is None,
+        reason="requires the EYE reasoner on the PATH",
+    )
+    def test_run_benchmark(self, tmp_path):
+        results = run_benchmark(
+            2, 1, repetitions=1, backend="local", tmp_dir=str(tmp_path)
+        )
+
+        (run,) = results["runs"]
+        assert run["status"] == "success"
+        assert run["n_requests"] >= 2
+        assert results["summary"]["reasoning"]["median"] > 0
+
+    def test_run_benchmark_using_stub(self, tmp_path):
+        results = run_benchmark(
+            3, 2, n_rules=8, repetitions=2, backend="stub", tmp_dir=str(tmp_path)
+        )
+
+        assert [run["status"] for run in results["runs"]] == ["success"] * 2
+        assert [run["n_requests"] for run in results["runs"]] == [3] * 2
+        for run in results["runs"]:
+            assert [i["iteration"] for i in run["iterations"]] == [0, 1, 2, 3]
+            assert sum(i["http"] for i in run["iterations"]) > 0
+        for phase in ["reasoning", "proof_processing", "http", "knowledge_update"]:
+            assert results["summary"][phase]["median"] > 0
+        assert results["summary"]["iterations"]["median"] == 4
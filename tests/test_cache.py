@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Unit tests for the proof cache."""
+
+import os
+
+from agent.cache import ProofCache
+
+
+def write(directory, filename, content):
+    with open(os.path.join(directory, filename), "w") as fp:
+        fp.write(content)
+
+
+class TestProofCache(object):
+    def test_key_depends_on_contents(self, tmp_path):
+        write(tmp_path, "facts.n3", "<#a> <#b> <#c>.")
+        write(tmp_path, "goal.n3", "")
+        key_before = ProofCache.key(tmp_path, ["facts.n3"], "goal.n3", ["docker"])
+
+        write(tmp_path, "facts.n3", "<#a> <#b> <#d>.")
+        key_after = ProofCache.key(tmp_path, ["facts.n3"], "goal.n3", ["docker"])
+
+        assert key_before != key_after
+        assert key_after == ProofCache.key(
+            tmp_path, ["facts.n3"], "goal.n3", ["docker"]
+        )
+        assert key_after != ProofCache.key(tmp_path, ["facts.n3"], "goal.n3", ["local"])
+
+    def test_hits_and_misses(self, tmp_path):
+        cache = ProofCache(directory=str(tmp_path))
+
+        assert cache.get("ab12") is None
+        cache.put("ab12", "proof")
+
+        assert cache.get("ab12") == "proof"
+        assert ProofCache(directory=str(tmp_path)).get("ab12") == "proof"
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_memory_is_bounded(self):
+        cache = ProofCache(max_entries=2)
+
+        for key in ["a1", "b2", "c3"]:
+            cache.put(key, key)
+
+        assert list(cache.memory) == ["b2", "c3"]
+
+    def test_size_based_eviction(self, tmp_path):
+        cache = ProofCache(directory=str(tmp_path), max_bytes=10)
+
+        cache.put("aa11", "12345678")
+        os.utime(cache._path("aa11"), (0, 0))
+        cache.put("bb22", "12345678")
+
+        assert not os.path.isfile(cache._path("aa11"))
+        assert os.path.isfile(cache._path("bb22"))
+        assert cache.size == 8
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Unit tests for the catalog of RESTdesc rules."""
+
+import os
+import shutil
+
+import rdflib
+from rdflib.namespace import RDF
+
+from agent.catalog import ANY, RuleCatalog
+
+test_data_base_path = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "tests", "data")
+)
+
+DBPEDIA = rdflib.Namespace("http://dbpedia.org/resource/")
+EX = rdflib.Namespace("http://example.org/image#")
+
+PARAMETERS = """\
+@prefix ex: <http://example.org/image#>.
+@prefix http: <http://www.w3.org/2011/http#>.
+@prefix sh: <http://www.w3.org/ns/shacl#>.
+
+{
+  ?image ex:smallThumbnail ?thumbnail.
+}
+=>
+{
+  _:request http:methodName "PUT";
+            http:requestURI ?thumbnail;
+            http:body _:parameters.
+  _:shape a sh:NodeShape;
+          sh:targetNode _:parameters.
+}.
+"""
+
+
+def make_catalog(tmp_path):
+    for filename in ["images.n3", "images_x_thumbnail.n3"]:
+        shutil.copy(os.path.join(test_data_base_path, filename), tmp_path)
+    (tmp_path / "parameters.n3").write_text(PARAMETERS)
+
+    catalog = RuleCatalog(str(tmp_path), "/mnt/ppa")
+    catalog.extend(["images.n3", "images_x_thumbnail.n3", "parameters.n3"])
+
+    return catalog
+
+
+class TestRuleCatalog(object):
+    def test_lookup_by_source(self, tmp_path):
+        catalog = make_catalog(tmp_path)
+
+        rule = catalog.lookup(rdflib.URIRef("file:///mnt/ppa/images_x_thumbnail.n3"))
+        assert rule.filename == "images_x_thumbnail.n3"
+        assert catalog.lookup(f"file://{tmp_path}/images.n3").filename == "images.n3"
+        assert catalog.lookup("file:///mnt/ppa/00_init_facts.n3") is None
+
+    def test_index_by_predicates(self, tmp_path):
+        catalog = make_catalog(tmp_path)
+
+        assert catalog.producers(EX.smallThumbnail) == {"images.n3"}
+        assert catalog.consumers(EX.smallThumbnail) == {
+            "images_x_thumbnail.n3",
+            "parameters.n3",
+        }
+        assert catalog.consumers((RDF.type, DBPEDIA.Image)) == {"images.n3"}
+        assert catalog.consumers(RDF.type) == {"images.n3"}
+        assert len(catalog.producers(ANY)) == 3
+
+    def test_index_by_target_node(self, tmp_path):
+        catalog = make_catalog(tmp_path)
+
+        (_, _, target), *_ = catalog["parameters.n3"].shapes
+        assert catalog.requiring_input(catalog.target_node(target)).filename == (
+            "parameters.n3"
+        )
+
+    def test_parses_modified_files_again(self, tmp_path):
+        catalog = make_catalog(tmp_path)
+        rule = catalog["parameters.n3"]
+        assert catalog.add("parameters.n3") is rule
+
+        (tmp_path / "parameters.n3").write_text(
+            PARAMETERS.replace("ex:smallThumbnail", "ex:largeThumbnail")
+        )
+        os.utime(tmp_path / "parameters.n3", ns=(0, 0))
+
+        assert catalog.add("parameters.n3") is not rule
+        assert catalog.consumers(EX.smallThumbnail) == {"images_x_thumbnail.n3"}
+        assert catalog.consumers(EX.largeThumbnail) == {"parameters.n3"}
+
+    def test_unindexes_updated_and_discarded_files(self, tmp_path):
+        catalog = make_catalog(tmp_path)
+        source = "file:///mnt/ppa/parameters.n3"
+        rule = catalog.lookup(source)
+
+        (tmp_path / "parameters.n3").write_text(PARAMETERS.replace("PUT", "PATCH"))
+        os.utime(tmp_path / "parameters.n3", ns=(0, 0))
+        updated = catalog.add("parameters.n3")
+
+        assert updated is not rule
+        assert catalog.lookup(source) is updated
+        assert catalog.lookup(f"file://{tmp_path}/parameters.n3") is updated
+
+        assert catalog.discard("parameters.n3") is updated
+        assert "parameters.n3" not in catalog
+        assert catalog.lookup(source) is None
+        assert "parameters.n3" not in catalog.by_source.values()
+        assert catalog.consumers(EX.smallThumbnail) == {"images_x_thumbnail.n3"}
+        assert not catalog.by_target_node
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Unit tests for the HTTP client shared by discovery and execution."""
+
+import http.server
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from agent.agent import FileBody
+from agent.client import HttpClient
+
+
+class FlakyHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections alive
+    timeout = 5  # don't wait forever for a body that is never sent
+
+    calls = []
+    bodies = []
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def respond(self):
+        cls = type(self)
+        length = int(self.headers.get("content-length", "0"))
+        body = self.rfile.read(length)
+        with cls.lock:
+            cls.bodies.append(body)
+            cls.calls.append((self.command, self.client_address[1]))
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+
+        time.sleep(0.05)
+        status = 503 if self.path == "/flaky" and len(cls.calls) == 1 else 200
+
+        with cls.lock:
+            cls.active -= 1
+
+        self.send_response(status)
+        self.send_header("content-length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    do_GET = respond
+    do_POST = respond
+    do_PUT = respond
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def origin(serve_http):
+    FlakyHandler.calls = []
+    FlakyHandler.bodies = []
+    FlakyHandler.active = 0
+    FlakyHandler.max_active = 0
+
+    return serve_http(FlakyHandler)
+
+
+class TestHttpClient(object):
+    def test_retries_idempotent_requests(self, origin):
+        client = HttpClient(backoff_factor=0)
+
+        response = client.get(f"{origin}/flaky")
+
+        assert response.status_code == 200
+        assert len(FlakyHandler.calls) == 2
+
+    def test_retries_put_of_file_body(self, origin, tmp_path):
+        payload = bytes(range(256)) * 400
+        (tmp_path / "model.fmu").write_bytes(payload)
+        body = FileBody(str(tmp_path / "model.fmu"))
+        client = HttpClient(backoff_factor=0, timeout=5)
+
+        try:
+            response = client.send(
+                requests.Request("PUT", f"{origin}/flaky", data=body)
+            )
+        finally:
+            body.close()
+
+        assert response.status_code == 200
+        assert FlakyHandler.bodies == [payload, payload]
+
+    def test_does_not_retry_post(self, origin):
+        client = HttpClient(backoff_factor=0)
+
+        response = client.send(requests.Request("POST", f"{origin}/flaky"))
+
+        assert response.status_code == 503
+        assert len(FlakyHandler.calls) == 1
+
+    def test_reuses_connections(self, origin):
+        client = HttpClient()
+
+        for _ in range(3):
+            client.get(f"{origin}/")
+
+        assert len({port for _, port in FlakyHandler.calls}) == 1
+
+    def test_limits_concurrency_per_origin(self, origin):
+        client = HttpClient(max_per_origin=2)
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            list(executor.map(lambda _: client.get(f"{origin}/"), range(6)))
+
+        assert len(FlakyHandler.calls) == 6
+        assert FlakyHandler.max_active <= 2
+
+    def test_streamed_responses_count_until_read(self, origin):
+        client = HttpClient(max_per_origin=1)
+
+        streamed = client.get(f"{origin}/", stream=True)
+        waiting = ThreadPoolExecutor(max_workers=1)
+        second = waiting.submit(client.get, f"{origin}/")
+        time.sleep(0.2)
+
+        assert len(FlakyHandler.calls) == 1
+        assert streamed.content == b"ok"
+        assert second.result(timeout=5).status_code == 200
+        waiting.shutdown()
+
+        client.get(f"{origin}/", stream=True).close()
+        assert client.get(f"{origin}/").status_code == 200
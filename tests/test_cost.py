@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Unit tests for the cost model used to select ground requests."""
+
+import pytest
+import requests
+
+from agent.cost import CostModel, get_selection_strategy
+
+
+class TestCostModel(object):
+    def test_ewma_is_persisted(self, tmp_path):
+        cost_model = CostModel(path=str(tmp_path / "latency.json"), alpha=0.5)
+        cost_model.observe("http://example.com", "rule_00.n3", 2.0)
+        cost_model.observe("http://example.com", "rule_00.n3", 4.0)
+        cost_model.save()
+
+        restored = CostModel(path=str(tmp_path / "latency.json"))
+
+        assert restored.expected_duration("http://example.com", "rule_00.n3") == 3.0
+        assert restored.stats["http://example.com rule_00.n3"]["n"] == 2
+
+    def test_fallbacks(self, tmp_path):
+        (tmp_path / "rule_01.n3").write_text(
+            "@prefix ppa: <https://github.com/UdSAES/pragmatic-proof-agent#>.\n"
+            "{ ?a ?b ?c. } => { _:request ppa:expectedDuration 30. }.\n"
+        )
+        (tmp_path / "rule_02.n3").write_text("{ ?a ?b ?c. } => { ?a ?b ?c. }.\n")
+        cost_model = CostModel(default=5.0)
+        cost_model.observe("http://example.com", "rule_00.n3", 2.0)
+
+        def expected_duration(origin, rule):
+            return cost_model.expected_duration(origin, rule, str(tmp_path))
+
+        assert expected_duration("http://example.com", "rule_01.n3") == 30.0
+        assert expected_duration("http://example.com", "rule_02.n3") == 2.0
+        assert expected_duration("http://example.org", "rule_02.n3") == 5.0
+
+
+class TestSelectionStrategies(object):
+    def test_cheapest_first(self):
+        cost_model = CostModel()
+        cost_model.observe("http://slow.example.com", "rule_00.n3", 10.0)
+        cost_model.observe("http://fast.example.com", "rule_01.n3", 0.1)
+        ground_requests = [
+            ("rule_00.n3", requests.Request("POST", "http://slow.example.com/a")),
+            ("rule_01.n3", requests.Request("GET", "http://fast.example.com/b")),
+        ]
+
+        first = get_selection_strategy("first")(ground_requests, cost_model, "")
+        cheapest = get_selection_strategy("cost")(ground_requests, cost_model, "")
+
+        assert [r for r, _ in first] == ["rule_00.n3", "rule_01.n3"]
+        assert [r for r, _ in cheapest] == ["rule_01.n3", "rule_00.n3"]
+
+    def test_unknown_strategy(self):
+        with pytest.raises(ValueError):
+            get_selection_strategy("random")
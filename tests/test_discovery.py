@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Unit tests for discovering RESTdesc descriptions."""
+
+import http.server
+import json
+import os
+import time
+
+import pytest
+import rdflib
+
+import agent.client
+from agent.client import HttpClient
+from agent.discovery import CATALOG, discover_restdesc, split_restdesc
+
+PREFIXES = """\
+@prefix dbpedia: <http://dbpedia.org/resource/>.
+PREFIX dbpedia-owl: <http://dbpedia.org/ontology/>
+@prefix ex: <http://example.org/image#>.
+@prefix http: <http://www.w3.org/2011/http#>.
+"""
+
+ADD_IMAGE = """\
+{
+  ?image a dbpedia:Image .
+}
+=>
+{
+  _:request http:methodName "POST";
+            http:requestURI "/images/";
+            http:body ?image ;
+            http:resp [ http:body ?image ].
+  ?image ex:comments _:comments ;
+         ex:smallThumbnail _:thumb .
+}."""
+
+GET_THUMBNAIL = """\
+{
+  ?image ex:smallThumbnail ?thumbnail.
+}
+=>
+{
+  _:request http:methodName "GET";
+            http:requestURI ?thumbnail;
+            http:resp [ http:body ?thumbnail ].
+  ?image dbpedia-owl:thumbnail ?thumbnail.
+  ?thumbnail a dbpedia:Image;
+             dbpedia-owl:height 80.0.
+}."""
+
+DOCUMENTS = {}
+
+
+class RESTdescHandler(http.server.BaseHTTPRequestHandler):
+    def do_OPTIONS(self):
+        time.sleep(0.2)
+        body = DOCUMENTS.get(self.path, "").encode()
+        self.send_response(200 if body else 501)
+        self.send_header("content-type", "text/n3")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def origin(monkeypatch, serve_http):
+    monkeypatch.setattr(agent.client, "HTTP_CLIENT", HttpClient())
+    DOCUMENTS.clear()
+
+    return serve_http(RESTdescHandler)
+
+
+class TestDiscovery(object):
+    def test_split_restdesc(self):
+        text = (
+            f"{PREFIXES}\n# A comment with {{ braces }} => and periods.\n"
+            f"{ADD_IMAGE}\n\nex:a ex:b 'not a rule: {{ }} => {{ }}.'.\n"
+            f"{GET_THUMBNAIL}\n"
+        )
+
+        directives, rules = split_restdesc(text)
+
+        assert rules == [ADD_IMAGE, GET_THUMBNAIL]
+        assert (
+            directives.splitlines()
+            == PREFIXES.replace(
+                "PREFIX dbpedia-owl: <http://dbpedia.org/ontology/>",
+                "@prefix dbpedia-owl: <http://dbpedia.org/ontology/>.",
+            ).splitlines()
+        )
+        for rule in rules:
+            graph = rdflib.Graph().parse(data=f"{directives}\n{rule}", format="n3")
+            assert len(graph) == 1
+
+    def test_discovers_concurrently(self, origin, tmp_path):
+        DOCUMENTS["/images"] = f"{PREFIXES}\n{ADD_IMAGE}\n"
+        DOCUMENTS["/images/_/thumbnail"] = f"{PREFIXES}\n{GET_THUMBNAIL}\n"
+
+        start = time.monotonic()
+        filenames = discover_restdesc(
+            origin, ["/images", "/images/_", "/images/_/thumbnail"], str(tmp_path)
+        )
+
+        assert time.monotonic() - start < 3 * 0.2
+        assert filenames == ["images.n3", "images_x_thumbnail.n3"]
+
+    def test_updates_catalog_incrementally(self, origin, tmp_path):
+        DOCUMENTS["/"] = f"{PREFIXES}\n{ADD_IMAGE}\n\n{GET_THUMBNAIL}\n"
+        add_image, get_thumbnail = discover_restdesc(origin, ["/"], str(tmp_path))
+
+        with open(tmp_path / CATALOG) as fp:
+            catalog = json.load(fp)
+        assert sorted(entry["file"] for entry in catalog.values()) == sorted(
+            [add_image, get_thumbnail]
+        )
+        assert '"POST"' in (tmp_path / add_image).read_text()
+        assert '"GET"' in (tmp_path / get_thumbnail).read_text()
+
+        # Unchanged rules keep their name and are not written again, regardless of
+        # their position; vanished rules are removed
+        os.utime(tmp_path / get_thumbnail, (0, 0))
+        DOCUMENTS["/"] = f"{PREFIXES}\n{GET_THUMBNAIL}\n"
+
+        assert discover_restdesc(origin, ["/"], str(tmp_path)) == [get_thumbnail]
+        assert os.path.getmtime(tmp_path / get_thumbnail) == 0
+        assert not (tmp_path / add_image).exists()
+
+        changed = GET_THUMBNAIL.replace("80.0", "160.0")
+        DOCUMENTS["/"] = f"{PREFIXES}\n{changed}\n"
+        (filename,) = discover_restdesc(origin, ["/"], str(tmp_path))
+        assert filename != get_thumbnail
+        assert "160.0" in (tmp_path / filename).read_text()
+        assert not (tmp_path / get_thumbnail).exists()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Unit tests for the HTTP cache."""
+
+import http.server
+import os
+
+import pytest
+import requests
+
+from agent.client import HttpClient
+from agent.httpcache import HttpCache
+
+RESTDESC = b"{ ?image a dbpedia:Image. } => { _:request http:methodName 'GET'. }.\n"
+
+
+class RESTdescHandler(http.server.BaseHTTPRequestHandler):
+    calls = []
+
+    def respond(self):
+        type(self).calls.append(
+            (self.command, self.path, self.headers.get("if-none-match"))
+        )
+
+        if self.command == "POST":
+            self.send_response(201)
+            self.send_header("location", "/fresh/created")
+            self.send_header("content-length", "0")
+            self.end_headers()
+            return
+        elif self.path.startswith("/fresh"):
+            self.send_response(200)
+            self.send_header("cache-control", "max-age=3600")
+        elif self.path == "/uncacheable":
+            self.send_response(200)
+        elif self.headers.get("if-none-match") == '"v1"':
+            self.send_response(304)
+            self.send_header("etag", '"v1"')
+            self.end_headers()
+            return
+        else:
+            self.send_response(200)
+            self.send_header("etag", '"v1"')
+
+        body = RESTDESC if self.path != "/large" else b"x" * 4096
+        self.send_header("content-type", self.headers.get("accept", "text/n3"))
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = respond
+    do_OPTIONS = respond
+    do_POST = respond
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def origin(serve_http):
+    RESTdescHandler.calls = []
+
+    return serve_http(RESTdescHandler)
+
+
+class TestHttpCache(object):
+    def test_revalidates_using_etag(self, origin, tmp_path):
+        client = HttpClient(cache=HttpCache(str(tmp_path)))
+
+        first = client.options(f"{origin}/images", headers={"accept": "text/n3"})
+        second = client.options(f"{origin}/images", headers={"accept": "text/n3"})
+
+        assert first.text == second.text == RESTDESC.decode()
+        assert second.status_code == 200
+        assert second.from_cache
+        assert RESTdescHandler.calls == [
+            ("OPTIONS", "/images", None),
+            ("OPTIONS", "/images", '"v1"'),
+        ]
+
+    def test_serves_fresh_responses(self, origin, tmp_path):
+        client = HttpClient(cache=HttpCache(str(tmp_path)))
+
+        for _ in range(3):
+            response = client.get(f"{origin}/fresh")
+            assert response.content == RESTDESC
+
+        assert len(RESTdescHandler.calls) == 1
+
+    def test_keyed_by_accept(self, origin, tmp_path):
+        client = HttpClient(cache=HttpCache(str(tmp_path)))
+
+        client.get(f"{origin}/fresh", headers={"accept": "text/n3"})
+        response = client.get(f"{origin}/fresh", headers={"accept": "text/turtle"})
+
+        assert response.headers["content-type"] == "text/turtle"
+        assert len(RESTdescHandler.calls) == 2
+
+    def test_does_not_store_without_validators(self, origin, tmp_path):
+        client = HttpClient(cache=HttpCache(str(tmp_path)))
+
+        client.get(f"{origin}/uncacheable")
+        response = client.get(f"{origin}/uncacheable")
+
+        assert not response.from_cache
+        assert len(RESTdescHandler.calls) == 2
+
+    def test_persists_across_instances(self, origin, tmp_path):
+        HttpClient(cache=HttpCache(str(tmp_path))).get(f"{origin}/fresh")
+        response = HttpClient(cache=HttpCache(str(tmp_path))).get(f"{origin}/fresh")
+
+        assert response.from_cache
+        assert len(RESTdescHandler.calls) == 1
+
+    def test_evicts_least_recently_used(self, origin, tmp_path):
+        cache = HttpCache(str(tmp_path), max_bytes=6000)
+        client = HttpClient(cache=cache)
+
+        client.get(f"{origin}/large").content
+        os.utime(next(tmp_path.glob("*/*/*.json")), (0, 0))
+        client.get(f"{origin}/large", headers={"accept": "text/turtle"}).content
+
+        assert cache.size <= 6000
+        assert len(list(tmp_path.glob("*/*/*.body"))) == 1
+
+    def test_keeps_conditions_out_of_request(self, origin, tmp_path):
+        client = HttpClient(cache=HttpCache(str(tmp_path)))
+
+        client.get(f"{origin}/images")
+        response = client.get(f"{origin}/images")
+
+        assert RESTdescHandler.calls[-1] == ("GET", "/images", '"v1"')
+        assert "if-none-match" not in response.request.headers
+
+    def test_unsafe_requests_invalidate(self, origin, tmp_path):
+        client = HttpClient(cache=HttpCache(str(tmp_path)))
+
+        for path in ["/fresh", "/fresh/created", "/fresh/other"]:
+            client.get(f"{origin}{path}")
+        client.get(f"{origin}/fresh", headers={"accept": "text/turtle"})
+        client.send(requests.Request("POST", f"{origin}/fresh"))
+
+        assert not client.get(f"{origin}/fresh").from_cache
+        assert not client.get(
+            f"{origin}/fresh", headers={"accept": "text/turtle"}
+        ).from_cache
+        assert not client.get(f"{origin}/fresh/created").from_cache
+        assert client.get(f"{origin}/fresh/other").from_cache
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Unit tests for the agent's knowledge base."""
+
+import rdflib
+from rdflib.namespace import RDF
+
+from agent.agent import update_shapes_and_input
+from agent.knowledge import KnowledgeBase
+from agent.namespaces import REASON, SHACL
+
+
+class TestKnowledgeBase(object):
+    def test_extend_writes_delta_only(self, tmp_path):
+        (tmp_path / "00_init_facts.n3").write_text("<#a> <#b> <#c>.\n")
+        knowledge = KnowledgeBase(str(tmp_path), ["00_init_facts.n3"])
+
+        delta = rdflib.Graph()
+        delta.add(
+            (rdflib.URIRef("http://example.org/x"), rdflib.RDF.value, rdflib.Literal(1))
+        )
+        extended = knowledge.extend(delta, "00_sub_facts.n3")
+
+        written = rdflib.Graph().parse(tmp_path / "00_sub_facts.n3", format="n3")
+        assert set(written) == set(delta)
+        assert extended.files == ["00_init_facts.n3", "00_sub_facts.n3"]
+        assert knowledge.files == ["00_init_facts.n3"]  # may still be used instead
+
+    def test_superseded_facts_no_longer_reach_reasoner(self, tmp_path):
+        shape = rdflib.URIRef("http://example.org/shapes#parameters")
+        focus_node = rdflib.URIRef(f"file://{tmp_path}/parameters.n3")
+        rule = rdflib.URIRef(f"file://{tmp_path}/models.n3")
+        variable = rdflib.Variable("shape")
+
+        # The initial state still refers to the shape through a variable
+        (tmp_path / "00_init_facts.n3").write_text(
+            f"<#a> <#b> <#c>.\n{variable.n3()} {SHACL.targetNode.n3()} <{focus_node}>.\n"
+        )
+        (tmp_path / "00_sub_facts.n3").write_text("<#d> <#e> <#f>.\n")
+        knowledge = KnowledgeBase(
+            str(tmp_path), ["00_init_facts.n3", "00_sub_facts.n3"]
+        )
+        H = rdflib.Graph().parse(tmp_path / "00_init_facts.n3", format="n3")
+        assert (variable, SHACL.targetNode, focus_node) in H
+
+        # ...which the response substitutes by the shape it states
+        shapes_and_inputs = rdflib.Graph()
+        shapes_and_inputs.add((rdflib.URIRef("#models"), REASON.source, rule))
+        shapes_and_inputs.add((rdflib.URIRef("#models"), RDF.predicate, variable))
+        shapes_and_inputs.add((variable, SHACL.targetNode, focus_node))
+        delta = rdflib.Graph()
+        delta.add((shape, RDF.type, SHACL.NodeShape))
+        delta.add((shape, SHACL.targetNode, focus_node))
+
+        superseded = set()
+        update_shapes_and_input(
+            shapes_and_inputs,
+            delta,
+            rule,
+            rdflib.URIRef(f"file://{tmp_path}/01_sub_facts.n3"),
+            superseded,
+        )
+        assert (variable, SHACL.targetNode, focus_node) in superseded
+
+        extended = knowledge.extend(delta, "01_sub_facts.n3", superseded)
+
+        # Everything passed to the reasoner, i.e. the union of all files
+        union = rdflib.Graph()
+        for file in extended.files:
+            union.parse(tmp_path / file, format="n3")
+
+        assert extended.files == ["00_sub_facts.n3", "01_sub_facts.n3"]
+        assert (variable, SHACL.targetNode, focus_node) not in union
+        assert (shape, SHACL.targetNode, focus_node) in union
+        stale = {(variable, SHACL.targetNode, focus_node)}
+        sub = rdflib.Graph().parse(tmp_path / "00_sub_facts.n3", format="n3")
+        assert set(union) == (set(H) - stale) | set(sub) | set(delta)
+
+        # The files of the knowledge base before remain untouched
+        unchanged = rdflib.Graph().parse(tmp_path / "00_init_facts.n3", format="n3")
+        assert set(unchanged) == set(H)
+
+    def test_extend_without_superseded_facts_parses_nothing(self, tmp_path):
+        knowledge = KnowledgeBase(str(tmp_path), ["missing.n3"])
+
+        extended = knowledge.extend(rdflib.Graph(), "00_sub_facts.n3", set())
+
+        assert extended.files == ["missing.n3", "00_sub_facts.n3"]
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Unit tests for memoizing and replaying plans."""
+
+import http.server
+
+import invoke
+import rdflib
+
+import agent
+from agent.cost import CostModel
+from agent.namespaces import NAMESPACE_MANAGER
+from agent.plans import (
+    PlanStore,
+    get_plan_store,
+    instantiate,
+    make_template,
+    step_sources,
+)
+from agent.state import PRE_PROOF, REPLAY, PPAState
+
+IMAGE = "file:///data/image.png"
+STEPS = [
+    {
+        "rule": "images.n3",
+        "method": "POST",
+        "url": "http://example.com/images",
+        "headers": {"accept": "text/n3"},
+        "params": {},
+        "body": IMAGE,
+        "status": 201,
+        "bindings": {"header location": "http://example.com/images/1"},
+    },
+    {
+        "rule": "images_x_thumbnail.n3",
+        "method": "GET",
+        "url": "http://example.com/images/1/thumbnail",
+        "headers": {},
+        "params": {},
+        "body": None,
+        "status": 200,
+        "bindings": {},
+    },
+]
+
+
+class ImageHandler(http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers["content-length"]))
+        self.send_response(201)
+        self.send_header("location", "/images/42")
+        self.end_headers()
+
+    def do_GET(self):
+        self.send_response(200 if self.path == "/images/42/thumbnail" else 404)
+        self.send_header("content-type", "text/plain")
+        self.end_headers()
+        self.wfile.write(b"thumbnail")
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPlans(object):
+    def test_template_references_earlier_bindings(self):
+        template = make_template(STEPS, {f"s {rdflib.RDF.type}": IMAGE})
+
+        assert template[0]["url"] == {"value": "http://example.com/images"}
+        assert template[0]["body"] == {
+            "ref": ["H", f"s {rdflib.RDF.type}"],
+            "suffix": "",
+        }
+        assert template[1]["url"] == {
+            "ref": ["0", "header location"],
+            "suffix": "/thumbnail",
+        }
+
+        sources = step_sources(
+            {f"s {rdflib.RDF.type}": "file:///data/other.png"},
+            [{"bindings": {"header location": "http://example.com/images/7"}}],
+        )
+        assert instantiate(template[0]["body"], sources) == "file:///data/other.png"
+        assert instantiate(template[1]["url"], sources) == (
+            "http://example.com/images/7/thumbnail"
+        )
+        assert instantiate(template[1]["url"], sources[:1]) is None
+
+    def test_replay(self, monkeypatch, tmp_path, serve_http):
+        monkeypatch.setenv("AGENT_PLANS", "1")
+        monkeypatch.setenv("AGENT_PLANS_DIR", str(tmp_path / "plans"))
+        monkeypatch.setattr(agent.cost, "COST_MODEL", CostModel())
+
+        origin = serve_http(ImageHandler)
+
+        image = tmp_path / "image.png"
+        image.write_bytes(b"\x89PNG")
+        (tmp_path / "00_init_facts.n3").write_text(
+            f"<file://{image}> a <http://dbpedia.org/resource/Image>.\n"
+        )
+        steps = [dict(step) for step in STEPS]
+        steps[0]["url"] = f"{origin}/images"
+        steps[1]["url"] = f"{origin}/images/1/thumbnail"
+        steps[0]["bindings"] = {"header location": f"{origin}/images/1"}
+        (tmp_path / "images.n3").write_text(
+            f'{{}} => {{ _:r <#uri> "{origin}/images" }}.'
+        )
+        PlanStore(str(tmp_path / "plans")).put(
+            "abc", make_template(steps, {f"s {rdflib.RDF.type}": IMAGE})
+        )
+
+        state = PPAState(str(tmp_path), ["00_init_facts.n3"], "goal.n3", [])
+        state.signature = "abc"
+        state.phase = REPLAY
+        shapes_and_inputs = rdflib.Graph()
+        shapes_and_inputs.namespace_manager = NAMESPACE_MANAGER
+        ctx = invoke.context.Context()  # empty context
+
+        for _ in range(3):
+            agent.agent.replay_plan_step(ctx, state, shapes_and_inputs)
+
+        assert state.phase == PRE_PROOF
+        assert [step["status"] for step in state.plan] == [201, 200]
+        assert state.plan[1]["url"] == f"{origin}/images/42/thumbnail"
+        assert state.H == ["00_init_facts.n3", "00_sub_facts.n3", "01_sub_facts.n3"]
+
+    def test_disabled_by_default(self, monkeypatch):
+        monkeypatch.delenv("AGENT_PLANS", raising=False)
+
+        assert get_plan_store() is None
+
+    def test_replay_never_sends_values_of_recorded_run(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("AGENT_PLANS", "1")
+        monkeypatch.setenv("AGENT_PLANS_DIR", str(tmp_path / "plans"))
+        sent = []
+        monkeypatch.setattr(agent.agent, "send_http_requests", sent.append)
+
+        # The URL stems from a response that wasn't recorded; it's not in the rule
+        steps = [dict(STEPS[1], url="http://example.com/images/1/thumbnail")]
+        template = make_template(steps, {})
+        assert template[0]["url"] == {"value": "http://example.com/images/1/thumbnail"}
+        PlanStore(str(tmp_path / "plans")).put("abc", template)
+
+        (tmp_path / "00_init_facts.n3").write_text("<#a> <#b> <#c>.\n")
+        (tmp_path / "images_x_thumbnail.n3").write_text("<#d> <#e> <#f>.\n")
+        state = PPAState(str(tmp_path), ["00_init_facts.n3"], "goal.n3", [])
+        state.signature = "abc"
+        state.phase = REPLAY
+
+        agent.agent.replay_plan_step(None, state, rdflib.Graph())
+
+        assert sent == []
+        assert state.phase == PRE_PROOF
+        assert state.plan == []
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Unit tests for profiling the iterations of the PPA."""
+
+import pstats
+import tracemalloc
+
+import pytest
+
+import agent.agent
+from agent.agent import SUCCESS, run_pragmatic_proof_algorithm
+from agent.profiling import get_profiler
+from agent.state import DONE, POST_PROOF, PRE_PROOF, PPAState
+
+ALLOCATED = []
+
+
+def allocate(ctx, state, shapes_and_inputs):
+    ALLOCATED.extend(bytearray(1024) for _ in range(100))
+    state.phase = POST_PROOF
+
+
+def next_iteration(ctx, state, shapes_and_inputs):
+    state.iteration += 1
+    if state.iteration == 2:
+        state.phase = DONE
+        state.status = SUCCESS
+    else:
+        state.phase = PRE_PROOF
+
+
+@pytest.fixture
+def steps(monkeypatch):
+    monkeypatch.setitem(agent.agent.STEPS, PRE_PROOF, allocate)
+    monkeypatch.setitem(agent.agent.STEPS, POST_PROOF, next_iteration)
+
+
+class TestProfiling(object):
+    def test_profiles_each_iteration(self, steps, tmp_path):
+        state = PPAState(str(tmp_path), [], "goal.n3", [])
+
+        status = run_pragmatic_proof_algorithm(None, state, None, profile="all")
+
+        assert status == SUCCESS
+        for iteration in ["00", "01"]:
+            stats = pstats.Stats(str(tmp_path / f"{iteration}_profile.pstats"))
+            assert any(name == "allocate" for _, _, name in stats.stats)
+
+            allocations = (tmp_path / f"{iteration}_allocations.txt").read_text()
+            assert "test_profiling.py" in allocations
+        assert not tracemalloc.is_tracing()
+
+    def test_profiles_cpu_only(self, steps, tmp_path, monkeypatch):
+        monkeypatch.setenv("AGENT_PROFILE", "cpu")
+        state = PPAState(str(tmp_path), [], "goal.n3", [])
+
+        run_pragmatic_proof_algorithm(None, state, None)
+
+        assert (tmp_path / "00_profile.pstats").exists()
+        assert not (tmp_path / "00_allocations.txt").exists()
+
+    def test_disabled_by_default(self, steps, tmp_path, monkeypatch):
+        monkeypatch.delenv("AGENT_PROFILE", raising=False)
+        state = PPAState(str(tmp_path), [], "goal.n3", [])
+
+        run_pragmatic_proof_algorithm(None, state, None)
+
+        assert get_profiler(str(tmp_path)) is None
+        assert not list(tmp_path.glob("*_profile.pstats"))
+        assert not list(tmp_path.glob("*_allocations.txt"))
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Unit tests for indexing proofs."""
+
+import os
+
+import invoke
+import pytest
+import rdflib
+
+import agent
+from agent.proof import ProofIndex, ProofReader, ProofWriter
+
+test_data_base_path = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "tests", "data")
+)
+proof_path = os.path.join(test_data_base_path, "00_pre_proof.n3")
+
+
+class TestProofIndex(object):
+    @pytest.mark.parametrize(
+        "source",
+        [
+            "file:///mnt/images.n3",
+            "file:///mnt/images_x_thumbnail.n3",
+            "file:///mnt/00_init_facts.n3",
+            "file:///mnt/unknown.n3",
+        ],
+    )
+    def test_matches_sparql(self, source):
+        index = ProofIndex.load(proof_path)
+        source = rdflib.URIRef(source)
+
+        count = index.graph.query(
+            f"SELECT ?x ?y WHERE {{ ?x ?p0 {source.n3()}. ?y ?p1 ?x. }}"
+        )
+        applications = index.graph.query(
+            (
+                "SELECT ?a ?b ?c ?x "
+                "WHERE { "
+                f"?a r:source {source.n3()}. "
+                "?b ?p ?a. "
+                "?c r:rule ?b. "
+                "?c r:gives ?x. "
+                "}"
+            )
+        )
+
+        assert index.count_applications(source) == len(count)
+        assert sorted(index.rule_applications(source)) == sorted(applications)
+
+    def test_find_rule_applications(self):
+        ctx = invoke.context.Context()  # empty context
+        R = ["images.n3", "images_x_thumbnail.n3"]
+
+        n_path = agent.agent.find_rule_applications(ctx, proof_path, R, "/mnt")
+        n_index = agent.agent.find_rule_applications(
+            ctx, ProofIndex.load(proof_path), R, "/mnt"
+        )
+
+        assert n_path == n_index == 2
+
+
+class TestProofReader(object):
+    def test_parse_while_writing(self, tmp_path):
+        with open(proof_path) as fp:
+            lines = fp.readlines()
+        stored = []
+
+        writer = ProofWriter(str(tmp_path / "proof.n3"))
+        reader = ProofReader(
+            lines, normalise=agent.agent.correct_n3_syntax, writer=writer
+        )
+        graph = reader.parse(rdflib.Graph())
+        writer.close(stored.append)
+
+        assert len(graph) == len(ProofIndex.load(proof_path))
+        assert stored == [str(tmp_path / "proof.n3")]
+        assert (tmp_path / "proof.n3").read_text() == "".join(lines)
+
+    def test_normalise_prefixes_only(self):
+        reader = ProofReader(
+            ["PREFIX ex: <http://example.org/>\n", "ex:a ex:b ex:c.\n"],
+            normalise=agent.agent.correct_n3_syntax,
+            keep=True,
+        )
+
+        assert list(reader.statements()) == [
+            "@prefix ex: <http://example.org/>.",
+            "\nex:a ex:b ex:c.",
+        ]
+        assert reader.kept == [
+            "@prefix ex: <http://example.org/>.\n",
+            "ex:a ex:b ex:c.\n",
+        ]
+
+    def test_parse_statements_once_complete(self):
+        graph = rdflib.Graph()
+        parsed = []
+
+        def lines():
+            yield "@prefix ex: <http://example.org/>.\n"
+            yield 'ex:a ex:b """a long\n'
+            parsed.append(len(graph))
+            yield 'string. {""".\n'
+            parsed.append(len(graph))
+            yield "ex:c ex:d { ex:e ex:f ex:g.\n"
+            parsed.append(len(graph))
+            yield "}.\n"
+
+        ProofReader(lines()).parse(graph)
+
+        assert parsed == [0, 1, 1]
+        assert len(graph) == 2
+        ex = rdflib.Namespace("http://example.org/")
+        assert graph.value(ex.a, ex.b) == rdflib.Literal("a long\nstring. {")
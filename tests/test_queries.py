@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Unit tests for the registry of prepared SPARQL queries."""
+
+import pytest
+import rdflib
+
+from agent.benchmark import benchmark_queries, query_graphs
+from agent.catalog import find_shapes_in_rule
+from agent.namespaces import NAMESPACE_MANAGER
+from agent.queries import QUERIES, prepared_query, query
+
+NAMESPACES = dict(NAMESPACE_MANAGER.namespaces())
+
+RULE = """\
+@prefix http: <http://www.w3.org/2011/http#>.
+@prefix sh: <http://www.w3.org/ns/shacl#>.
+@prefix ex: <http://example.org/>.
+
+{
+  ?image ex:thumbnail ?thumbnail.
+}
+=>
+{
+  _:request http:methodName "POST";
+            http:requestURI ?thumbnail;
+            http:body _:parameters.
+  ex:ParameterShape a sh:NodeShape;
+                    sh:targetNode _:parameters.
+}.
+"""
+
+
+class TestQueries(object):
+    @pytest.mark.parametrize("name", ["request", "node_shapes"])
+    def test_prepared_matches_adhoc(self, name):
+        request, shapes, _ = query_graphs()
+        graph = request if name == "request" else shapes
+
+        expected = set(graph.query(QUERIES[name], initNs=NAMESPACES))
+
+        assert set(query(graph, name)) == expected
+        assert len(expected) > 0
+
+    def test_binds_parameters(self):
+        _, shapes, rule = query_graphs()
+
+        text = QUERIES["shapes_of_rule"].replace("?rule", rule.n3())
+        expected = set(shapes.query(text, initNs=NAMESPACES))
+
+        rows = set(query(shapes, "shapes_of_rule", rule=rule))
+        assert rows == expected
+        assert {row[0] for row in rows} == {
+            rdflib.URIRef("http://example.org/shapes#input")
+        }
+        assert list(query(shapes, "shapes_of_rule", rule=rdflib.URIRef("#x"))) == []
+
+    def test_prepares_once(self):
+        assert prepared_query("request") is prepared_query("request")
+
+    def test_finds_shapes_by_walking_indices(self):
+        ((shape, predicate, target),) = find_shapes_in_rule(RULE)
+
+        assert shape == rdflib.URIRef("http://example.org/ParameterShape")
+        assert predicate == rdflib.URIRef("http://www.w3.org/ns/shacl#targetNode")
+        assert isinstance(target, rdflib.BNode)
+
+    def test_benchmark_queries(self):
+        results = benchmark_queries(repetitions=5)
+
+        assert set(results) == {
+            "request",
+            "shapes_of_rule",
+            "node_shapes",
+            "headers",
+            "shapes_in_rule",
+        }
+        for timings in results.values():
+            assert 0 < timings["prepared"] < timings["adhoc"]
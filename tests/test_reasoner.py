@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Unit tests for the reasoner backends."""
+
+import os
+import shutil
+import stat
+
+import invoke
+import pytest
+
+import agent
+from agent.reasoner import EyeWorkerPool, StubBackend, compile_rule_set, get_backend
+
+test_data_base_path = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "tests", "data")
+)
+
+# Stands in for `docker`: runs the shell of the "container" on the host instead
+FAKE_DOCKER = """#!/bin/sh
+echo "$@" >> "$FAKE_DOCKER_LOG"
+case "$1" in
+  run) exec sh ;;
+  *) exit 0 ;;
+esac
+"""
+
+# Stands in for `eye`: writes two lines to stdout, one to stderr
+FAKE_EYE = """#!/bin/sh
+[ "$1" = slow ] && sleep 3
+echo "<#a> <#b> <#$1>."
+echo "<#c> <#d> <#e>."
+echo "log of $1" >&2
+[ "$1" = fail ] && exit 3
+exit 0
+"""
+
+
+@pytest.fixture
+def fake_docker(monkeypatch, tmp_path):
+    """Put fake `docker` and `eye` executables on the PATH; return the docker log."""
+
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    for name, script in [("docker", FAKE_DOCKER), ("eye", FAKE_EYE)]:
+        path = bin_dir / name
+        path.write_text(script)
+        path.chmod(path.stat().st_mode | stat.S_IXUSR)
+
+    log = tmp_path / "docker.log"
+    log.touch()
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_DOCKER_LOG", str(log))
+
+    return log
+
+
+def run_job(pool, *arguments, timeout=None):
+    """Consume a job of `pool`; return the lines yielded and `(stderr, exited)`."""
+
+    lines = []
+    stream = pool.stream(list(arguments), timeout)
+    try:
+        while True:
+            lines.append(next(stream))
+    except StopIteration as e:
+        return lines, e.value
+
+
+def proof_lines(name):
+    return [f"<#a> <#b> <#{name}>.\n", "<#c> <#d> <#e>.\n"]
+
+
+class TestEyeWorkerPool(object):
+    def test_reads_output_up_to_marker(self, fake_docker, tmp_path):
+        pool = EyeWorkerPool(str(tmp_path), "/mnt", "eye:latest")
+        try:
+            (worker,) = list(pool.idle.queue)
+
+            assert run_job(pool, "one") == (proof_lines("one"), ("log of one\n", 0))
+            assert run_job(pool, "fail") == (proof_lines("fail"), ("log of fail\n", 3))
+            assert list(pool.idle.queue) == [worker]
+        finally:
+            pool.close()
+
+        assert f"run -i --rm --name {worker.name}" in fake_docker.read_text()
+        assert not worker.alive
+
+    def test_recycles_workers_after_max_jobs(self, fake_docker, tmp_path):
+        pool = EyeWorkerPool(str(tmp_path), "/mnt", "eye:latest", max_jobs=2)
+        try:
+            (first,) = list(pool.idle.queue)
+            run_job(pool, "one")
+            assert list(pool.idle.queue) == [first]
+
+            run_job(pool, "two")
+            (second,) = list(pool.idle.queue)
+            assert second is not first
+            assert not first.alive
+
+            assert run_job(pool, "three")[0] == proof_lines("three")
+        finally:
+            pool.close()
+
+    def test_kills_workers_that_time_out(self, fake_docker, tmp_path):
+        pool = EyeWorkerPool(str(tmp_path), "/mnt", "eye:latest")
+        try:
+            (worker,) = list(pool.idle.queue)
+
+            assert run_job(pool, "slow", timeout=0.5) == ([], ("", None))
+            assert f"kill {worker.name}" in fake_docker.read_text()
+            assert not worker.alive
+
+            assert run_job(pool, "two") == (proof_lines("two"), ("log of two\n", 0))
+        finally:
+            pool.close()
+
+    def test_replaces_workers_of_abandoned_jobs(self, fake_docker, tmp_path):
+        pool = EyeWorkerPool(str(tmp_path), "/mnt", "eye:latest")
+        try:
+            (worker,) = list(pool.idle.queue)
+
+            stream = pool.stream(["one"])
+            assert next(stream) == proof_lines("one")[0]
+            stream.close()  # e.g. parsing the proof failed
+
+            assert f"kill {worker.name}" in fake_docker.read_text()
+            assert list(pool.idle.queue) != [worker]
+            assert run_job(pool, "two") == (proof_lines("two"), ("log of two\n", 0))
+        finally:
+            pool.close()
+
+
+class TestReasonerBackends(object):
+    @pytest.mark.parametrize("name", ["docker", "local", "stub"])
+    def test_get_backend(self, name):
+        assert get_backend(name).name == name
+
+    def test_get_backend_unknown(self):
+        with pytest.raises(ValueError):
+            get_backend("cwm")
+
+    def test_stub_replays_recorded_proof(self, monkeypatch):
+        monkeypatch.setenv("EYE_STUB_DIR", test_data_base_path)
+
+        result = StubBackend().run("/tmp", [], "00_pre_proof.n3")
+
+        assert result.ok
+        assert "r:Proof" in result.stdout
+
+    def test_stub_fails_without_recording(self, monkeypatch):
+        monkeypatch.setenv("EYE_STUB_DIR", test_data_base_path)
+
+        result = StubBackend().run("/tmp", [], "99_pre_proof.n3")
+
+        assert not result.ok
+
+    def test_eye_generate_proof_using_stub(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("EYE_STUB_DIR", test_data_base_path)
+        ctx = invoke.context.Context()  # empty context
+        for filename in ["images.n3", "goal.n3"]:
+            shutil.copy(
+                os.path.join(test_data_base_path, "images.n3"), tmp_path / filename
+            )
+
+        status, proof = agent.agent.eye_generate_proof(
+            ctx, str(tmp_path), ["images.n3"], "goal.n3", "00_pre", "stub"
+        )
+
+        assert status == agent.SUCCESS
+        assert proof.path == os.path.join(str(tmp_path), "00_pre_proof.n3")
+        assert os.path.isfile(proof.path)
+        assert len(proof) > 0
+
+    def test_eye_generate_proof_replays_working_directory(self, monkeypatch, tmp_path):
+        monkeypatch.delenv("EYE_STUB_DIR", raising=False)
+        ctx = invoke.context.Context()  # empty context
+        recording = os.path.join(test_data_base_path, "00_pre_proof.n3")
+        shutil.copy(recording, tmp_path)
+        for filename in ["images.n3", "goal.n3"]:
+            shutil.copy(
+                os.path.join(test_data_base_path, "images.n3"), tmp_path / filename
+            )
+
+        status, proof = agent.agent.eye_generate_proof(
+            ctx, str(tmp_path), ["images.n3"], "goal.n3", "00_pre", "stub"
+        )
+
+        assert status == agent.SUCCESS
+        assert len(proof) > 0
+        assert os.path.getsize(proof.path) == os.path.getsize(recording)
+
+    def test_compile_rule_set_once(self, monkeypatch, tmp_path):
+        # Fake EYE that creates the image and records how often it was called
+        eye = tmp_path / "eye"
+        eye.write_text('#!/bin/sh\necho run >> calls.log\ntouch "$2"\n')
+        eye.chmod(0o755)
+        monkeypatch.setenv("EYE_COMMAND", str(eye))
+        shutil.copy(os.path.join(test_data_base_path, "images.n3"), tmp_path)
+
+        image = compile_rule_set(str(tmp_path), ["images.n3"], "local")
+
+        assert image.endswith(".pvm")
+        assert os.path.isfile(tmp_path / image)
+        assert compile_rule_set(str(tmp_path), ["images.n3"], "local") == image
+        assert (tmp_path / "calls.log").read_text() == "run\n"
+
+    def test_compile_rule_set_unsupported(self, tmp_path):
+        assert compile_rule_set(str(tmp_path), ["images.n3"], "stub") is None
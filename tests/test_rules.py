@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Unit tests for pruning RESTdesc rules."""
+
+import os
+import shutil
+
+from agent.rules import prune_rules
+
+test_data_base_path = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "tests", "data")
+)
+
+PREFIXES = (
+    "@prefix dbpedia: <http://dbpedia.org/resource/>.\n"
+    "@prefix dbpedia-owl: <http://dbpedia.org/ontology/>.\n"
+    "@prefix ex: <http://example.org/image#>.\n"
+    "@prefix http: <http://www.w3.org/2011/http#>.\n"
+)
+
+
+class TestPruneRules(object):
+    def test_keeps_backward_reachable_rules(self, tmp_path):
+        for filename in ["images.n3", "images_x_thumbnail.n3"]:
+            shutil.copy(os.path.join(test_data_base_path, filename), tmp_path)
+        (tmp_path / "goal.n3").write_text(
+            PREFIXES
+            + "{ ?i dbpedia-owl:thumbnail ?t. } => { ?i dbpedia-owl:thumbnail ?t. }.\n"
+        )
+        (tmp_path / "comments.n3").write_text(
+            PREFIXES
+            + '{ ?i ex:comments ?c. } => { _:r http:methodName "GET"; http:requestURI ?c. ?c ex:text ?x. }.\n'
+        )
+        (tmp_path / "broken.n3").write_text("{ ?i ex:comments")
+
+        R = ["images.n3", "comments.n3", "images_x_thumbnail.n3", "broken.n3"]
+        kept = prune_rules(str(tmp_path), "goal.n3", R)
+
+        assert kept == ["images.n3", "images_x_thumbnail.n3", "broken.n3"]
+
+    def test_background_rules_extend_search(self, tmp_path):
+        (tmp_path / "goal.n3").write_text(
+            PREFIXES + "{ ?i a dbpedia:Thumbnail. } => { ?i a dbpedia:Thumbnail. }.\n"
+        )
+        (tmp_path / "background.n3").write_text(
+            PREFIXES + "{ ?i ex:smallThumbnail ?t. } => { ?t a dbpedia:Thumbnail. }.\n"
+        )
+        shutil.copy(os.path.join(test_data_base_path, "images.n3"), tmp_path)
+
+        assert prune_rules(str(tmp_path), "goal.n3", ["images.n3"]) == []
+        assert prune_rules(
+            str(tmp_path), "goal.n3", ["images.n3"], "background.n3"
+        ) == ["images.n3"]
@@ -14,11 +14,26 @@ import pytest
 import requests
 from loguru import logger
 
+from agent.standin import start_standin_server
+
 test_data_base_path = os.path.normpath(
     os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "tests", "data")
 )
 
 
+@pytest.fixture(scope="module")
+def standin_origin():
+    """Origin of a local stand-in for the image API unless `API_ORIGIN` is set."""
+
+    if os.getenv("API_ORIGIN") is not None:
+        yield None
+        return
+
+    server = start_standin_server()
+    yield server.origin
+    server.shutdown()
+
+
 class TestImageResizeAPI(object):
     origin = os.getenv("API_ORIGIN", "")
 
@@ -135,8 +150,9 @@ class TestImageResizeAPI(object):
         content_type,
         body,
         status_code,
+        standin_origin,
     ):
-        href = f"{origin}{path}"
+        href = f"{standin_origin or origin}{path}"
         headers = {"accept": accept}
         data = None
 
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Unit tests for the local stand-in of the example APIs."""
+
+import os
+import time
+
+import pytest
+import rdflib
+import requests
+
+from agent.discovery import split_restdesc
+from agent.standin import negotiate, start_standin_server
+
+test_data_base_path = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "tests", "data")
+)
+
+SMS = rdflib.Namespace("https://purl.org/sms-ontology#")
+
+
+@pytest.fixture
+def standin(request):
+    server = start_standin_server(**getattr(request, "param", {}))
+    yield server
+    server.shutdown()
+
+
+def post_image(origin, path="/images"):
+    with open(os.path.join(test_data_base_path, "example.png"), "rb") as fp:
+        return requests.post(
+            f"{origin}{path}",
+            data=fp.read(),
+            headers={"content-type": "application/octet-stream", "accept": "text/n3"},
+        )
+
+
+class TestStandInServer(object):
+    def test_negotiate(self):
+        assert negotiate(None, ["text/n3", "application/ld+json"]) == "text/n3"
+        assert negotiate("application/ld+json;q=0.9, text/n3", ["text/n3"]) == (
+            "text/n3"
+        )
+        assert negotiate("image/*", ["text/n3", "image/png"]) == "image/png"
+        assert negotiate("text/html", ["text/n3"]) is None
+
+    @pytest.mark.parametrize(
+        "standin", [{"language": "de", "payload_size": 1000}], indirect=True
+    )
+    def test_image_flow(self, standin):
+        restdesc = requests.options(
+            f"{standin.origin}/bilder", headers={"accept": "text/n3"}
+        )
+        assert f'"{standin.origin}/bilder"' in restdesc.text
+
+        r = post_image(standin.origin, "/bilder")
+        assert r.status_code == 201
+        graph = rdflib.Graph().parse(data=r.text, format="n3")
+        (image, _, thumbnail), *_ = graph
+        assert str(thumbnail) == f"{image}/miniaturbild"
+
+        r = requests.get(str(thumbnail), headers={"accept": "image/png"})
+        assert r.headers["content-type"] == "image/png"
+        assert len(r.content) == 1000
+
+        r = requests.get(str(thumbnail), headers={"accept": "application/ld+json"})
+        assert r.json()["@id"] == str(image)
+
+    def test_simulation_flow(self, standin):
+        restdesc = requests.options(f"{standin.origin}/", headers={"accept": "text/n3"})
+        directives, rules = split_restdesc(restdesc.text)
+        assert len(rules) == 4
+
+        with open(os.path.join(test_data_base_path, "example.png"), "rb") as fp:
+            r = requests.post(f"{standin.origin}/models", data=fp.read())
+        model = rdflib.Graph().parse(data=r.text, format="n3")
+        instances = next(model.objects(predicate=SMS.instances))
+
+        r = requests.post(str(instances))
+        instance = rdflib.Graph().parse(data=r.text, format="n3")
+        experiments = next(instance.objects(predicate=SMS.experiments))
+
+        r = requests.post(str(experiments))
+        simulation = rdflib.Graph().parse(data=r.text, format="n3")
+        result = next(simulation.objects(predicate=SMS.result))
+
+        r = requests.get(str(result), headers={"accept": "text/n3"})
+        assert r.status_code == 200
+        assert (result, SMS.resultOf, None) in rdflib.Graph().parse(
+            data=r.text, format="n3"
+        )
+
+        assert requests.post(f"{standin.origin}/models/_/instances").status_code == 404
+
+    @pytest.mark.parametrize(
+        "standin", [{"latency": 0.2, "failure_rate": 0.5, "seed": 1}], indirect=True
+    )
+    def test_latency_and_failures(self, standin):
+        start = time.monotonic()
+        responses = [requests.get(f"{standin.origin}/") for _ in range(10)]
+
+        assert time.monotonic() - start >= 10 * 0.2
+        statuses = [r.status_code for r in responses]
+        assert statuses.count(503) == standin.n_failures
+        assert 0 < standin.n_failures < 10
+        assert set(statuses) == {501, 503}
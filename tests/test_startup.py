@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Unit tests for the time it takes to import the package and the tasks."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+BASEPATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Dependencies that must only be imported once they are used
+HEAVY = ["rdflib", "requests", "jinja2"]
+
+# Upper bound in seconds for the import itself, generous to avoid flaky tests
+MAX_IMPORT_TIME = 0.5
+
+MEASURE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+duration = time.perf_counter() - start
+print(json.dumps({{"duration": duration, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure_import(module):
+    """Import `module` in a fresh interpreter; return duration and modules loaded."""
+
+    durations = []
+    for _ in range(3):
+        result = subprocess.run(
+            [sys.executable, "-c", MEASURE.format(module=module)],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=BASEPATH,
+        )
+        measurement = json.loads(result.stdout.splitlines()[-1])
+        durations.append(measurement["duration"])
+
+    return min(durations), measurement["modules"]
+
+
+class TestStartup(object):
+    @pytest.mark.parametrize("module", ["agent", "tasks"])
+    def test_defers_heavy_imports(self, module):
+        _, modules = measure_import(module)
+
+        assert [name for name in HEAVY if name in modules] == []
+
+    def test_import_time(self):
+        duration, _ = measure_import("agent")
+
+        assert duration < MAX_IMPORT_TIME
+
+    def test_exports_on_first_access(self):
+        import agent
+        from agent.agent import solve_api_composition_problem
+
+        assert agent.solve_api_composition_problem is solve_api_composition_problem
+        assert "solve_api_composition_problem" in dir(agent)
+        with pytest.raises(AttributeError):
+            agent.does_not_exist
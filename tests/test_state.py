@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Unit tests for checkpointing and resuming the PPA."""
+
+import os
+import shutil
+
+import invoke
+import pytest
+import rdflib
+
+import agent
+from agent.benchmark import generate_problem, record_proofs
+from agent.namespaces import REASON
+from agent.standin import start_standin_server
+from agent.state import DONE, POST_PROOF, SELECT, PPAState
+
+test_data_base_path = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "tests", "data")
+)
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def chain(monkeypatch, tmp_path):
+    """Serve a synthetic chain of two requests; record the proofs solving it."""
+
+    server = start_standin_server()
+    record_proofs(str(tmp_path / "proofs"), server.origin, 2)
+    monkeypatch.setenv("EYE_STUB_DIR", str(tmp_path / "proofs"))
+    monkeypatch.setenv("EYE_CACHE", "0")
+
+    directory = str(tmp_path / "run")
+    H, g, R, B = generate_problem(directory, server.origin, 2)
+    yield server, directory, H, g, R, B
+
+    server.shutdown()
+
+
+def record_calls(monkeypatch):
+    """Record the URLs requested and the proofs generated by the agent."""
+
+    calls = {"requests": [], "proofs": []}
+
+    send_http_request = agent.agent.send_http_request
+    eye_generate_proof = agent.agent.eye_generate_proof
+
+    def send(ground_request, *args, **kwargs):
+        calls["requests"].append(ground_request[1].url)
+        return send_http_request(ground_request, *args, **kwargs)
+
+    def generate(ctx, directory, input_files, agent_goal, prefix, *args):
+        calls["proofs"].append(prefix)
+        return eye_generate_proof(
+            ctx, directory, input_files, agent_goal, prefix, *args
+        )
+
+    monkeypatch.setattr(agent.agent, "send_http_request", send)
+    monkeypatch.setattr(agent.agent, "eye_generate_proof", generate)
+
+    return calls
+
+
+def interrupt(monkeypatch, phase, iteration):
+    """Interrupt the run before executing `phase` of `iteration` for the first time."""
+
+    step = agent.agent.STEPS[phase]
+    interrupted = []
+
+    def interruptible(ctx, state, shapes_and_inputs):
+        if state.iteration == iteration and not interrupted:
+            interrupted.append(state.iteration)
+            raise Interrupted()
+        return step(ctx, state, shapes_and_inputs)
+
+    monkeypatch.setitem(agent.agent.STEPS, phase, interruptible)
+
+
+class TestPPAState(object):
+    def test_save_and_load(self, tmp_path):
+        state = PPAState(str(tmp_path), ["00_init_facts.n3"], "goal.n3", ["images.n3"])
+        state.phase = SELECT
+        state.n_pre = 2
+        state.proof = object()  # not serialisable, must not be stored
+        state.save()
+
+        restored = PPAState.load(str(tmp_path))
+
+        assert restored == state
+        assert restored.proof is None
+
+    def test_relative_iris_survive(self, tmp_path):
+        shapes_and_inputs = rdflib.Graph()
+        shapes_and_inputs.add(
+            (rdflib.URIRef("#rule_00"), REASON.source, rdflib.Variable("shape"))
+        )
+        shapes_and_inputs.serialize(tmp_path / "si.n3", format="n3")
+
+        state = PPAState(str(tmp_path), [], "goal.n3", [], si="si.n3")
+
+        assert set(state.load_shapes_and_inputs()) == set(shapes_and_inputs)
+
+    def test_resume_without_reasoning(self, monkeypatch, tmp_path):
+        # Nothing to replay, so any attempt to generate a proof would fail
+        monkeypatch.setenv("EYE_STUB_DIR", str(tmp_path))
+        ctx = invoke.context.Context()  # empty context
+        shutil.copy(os.path.join(test_data_base_path, "00_pre_proof.n3"), tmp_path)
+
+        state = PPAState(str(tmp_path), [], "goal.n3", [], backend="stub")
+        state.phase = SELECT
+        state.pre_proof = "00_pre_proof.n3"
+        state.n_pre = 0
+        state.save()
+
+        status = agent.resume_api_composition_problem(ctx, str(tmp_path))
+
+        assert status == agent.SUCCESS
+        assert PPAState.load(str(tmp_path)).phase == DONE
+        assert agent.resume_api_composition_problem(ctx, str(tmp_path)) == status
+
+    def test_resume_from_select(self, monkeypatch, chain):
+        server, directory, H, g, R, B = chain
+        ctx = invoke.context.Context()  # empty context
+        calls = record_calls(monkeypatch)
+
+        interrupt(monkeypatch, SELECT, 1)
+        with pytest.raises(Interrupted):
+            agent.solve_api_composition_problem(
+                ctx, directory, [H], g, R, B, backend="stub"
+            )
+
+        state = PPAState.load(directory)
+        assert (state.phase, state.iteration) == (SELECT, 1)
+        assert calls["requests"] == [f"{server.origin}/chain/1/0"]
+        assert calls["proofs"] == ["00_pre", "00_sub"]
+
+        status = agent.resume_api_composition_problem(ctx, directory)
+
+        assert status == agent.SUCCESS
+        assert calls["requests"] == [
+            f"{server.origin}/chain/1/0",
+            f"{server.origin}/chain/2/0",
+        ]
+        assert calls["proofs"] == ["00_pre", "00_sub", "01_sub"]
+        assert server.n_requests == 2
+
+    def test_resume_from_post_proof(self, monkeypatch, chain):
+        server, directory, H, g, R, B = chain
+        ctx = invoke.context.Context()  # empty context
+        calls = record_calls(monkeypatch)
+
+        interrupt(monkeypatch, POST_PROOF, 0)
+        with pytest.raises(Interrupted):
+            agent.solve_api_composition_problem(
+                ctx, directory, [H], g, R, B, backend="stub"
+            )
+
+        state = PPAState.load(directory)
+        assert (state.phase, state.iteration) == (POST_PROOF, 0)
+        assert state.executed == [R[0]]
+        assert calls["requests"] == [f"{server.origin}/chain/1/0"]
+        assert calls["proofs"] == ["00_pre"]
+
+        status = agent.resume_api_composition_problem(ctx, directory)
+
+        assert status == agent.SUCCESS
+        assert calls["requests"] == [
+            f"{server.origin}/chain/1/0",
+            f"{server.origin}/chain/2/0",
+        ]
+        assert calls["proofs"] == ["00_pre", "00_sub", "01_sub"]
+        assert server.n_requests == 2
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+
+# SPDX-FileCopyrightText: 2022 UdS AES <https://www.uni-saarland.de/lehrstuhl/frey.html>
+# SPDX-License-Identifier: MIT
+
+
+"""Unit tests for timing spans and the trace of a run."""
+
+import json
+import os
+import threading
+
+import pytest
+import requests
+
+import agent.tracing
+from agent.agent import parse_http_response
+from agent.standin import start_standin_server
+from agent.tracing import TRACE, Tracer
+
+test_data_base_path = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "tests", "data")
+)
+
+
+def read_trace(directory):
+    with open(directory / TRACE) as fp:
+        return [json.loads(line) for line in fp]
+
+
+@pytest.fixture
+def tracer(monkeypatch, tmp_path):
+    tracer = Tracer(str(tmp_path / "ppa.prom"))
+    monkeypatch.setattr(agent.tracing, "TRACER", tracer)
+    return tracer
+
+
+class TestTracer(object):
+    def test_aggregates_spans_per_iteration(self, tracer, tmp_path):
+        tracer.begin(str(tmp_path), 0)
+        with tracer.span("reasoning") as span:
+            span["proof_triples"] = 10
+
+        def send():
+            with tracer.span("http_request", bytes_sent=100):
+                pass
+
+        threads = [threading.Thread(target=send) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        tracer.begin(str(tmp_path), 0)  # same iteration, next step
+        with tracer.span("reasoning") as span:
+            span["proof_triples"] = 5
+        tracer.begin(str(tmp_path), 1)
+        with tracer.span("reasoning"):
+            pass
+        tracer.end_run("success")
+
+        records = read_trace(tmp_path)
+        assert [r["event"] for r in records] == (
+            ["span"] * 5 + ["iteration", "span", "iteration", "run"]
+        )
+
+        first = records[5]
+        assert first["iteration"] == 0
+        assert first["spans"]["reasoning"]["count"] == 2
+        assert first["spans"]["http_request"]["count"] == 3
+        assert first["proof_triples"] == 15
+        assert first["bytes_sent"] == 300
+        assert records[7]["iteration"] == 1
+        assert records[7]["proof_triples"] == 0
+
+    def test_exports_prometheus_text(self, tracer, tmp_path):
+        tracer.begin(str(tmp_path), 0)
+        with tracer.span("reasoning", proof_triples=7):
+            pass
+        tracer.end_run("failure")
+
+        metrics = (tmp_path / "ppa.prom").read_text()
+        assert 'ppa_span_duration_seconds_count{span="reasoning"} 1\n' in metrics
+        assert "ppa_proof_triples_total 7\n" in metrics
+        assert "ppa_iterations_total 1\n" in metrics
+        assert 'ppa_runs_total{status="failure"} 1\n' in metrics
+
+    def test_can_be_disabled(self, tracer, tmp_path, monkeypatch):
+        monkeypatch.setenv("AGENT_TRACE", "0")
+
+        tracer.begin(str(tmp_path), 0)
+        with tracer.span("reasoning"):
+            pass
+        tracer.end_run("success")
+
+        assert not (tmp_path / TRACE).exists()
+        assert tracer.durations["reasoning"][0] == 1
+
+    def test_counts_bytes_received(self, tracer, tmp_path):
+        server = start_standin_server(payload_size=300 * 1024)
+        try:
+            with open(os.path.join(test_data_base_path, "example.png"), "rb") as fp:
+                image = requests.post(
+                    f"{server.origin}/images",
+                    data=fp.read(),
+                    headers={"accept": "text/n3"},
+                )
+            thumbnail = image.headers["location"] + "/thumbnail"
+
+            tracer.begin(str(tmp_path), 0)
+            response = requests.get(
+                thumbnail, headers={"accept": "image/png"}, stream=True
+            )
+            parse_http_response(response, str(tmp_path))
+            tracer.end_run("success")
+        finally:
+            server.shutdown()
+
+        (span,) = [r for r in read_trace(tmp_path) if r["event"] == "span"]
+        assert span["span"] == "parse_http_response"
+        assert span["bytes_received"] == 300 * 1024
@@ -7,7 +7,9 @@
 
 """Unit tests for utitily functions."""
 
+import http.server
 import os
+import time
 
 import invoke
 import pytest
@@ -15,6 +17,10 @@ import rdflib
 import requests
 
 import agent
+from agent.cost import CostModel
+from agent.namespaces import HTTP, NAMESPACE_MANAGER
+from agent.proof import ProofIndex
+from agent.state import PRE_PROOF, PPAState
 
 test_data_base_path = os.path.normpath(
     os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "tests", "data")
@@ -114,3 +120,198 @@ class TestUtitityFunctions(object):
             assert actual.url == expected[index].url
             assert actual.headers == expected[index].headers
             assert actual.data == expected[index].data
+
+    def test_select_independent_requests(self):
+        ground_requests = [
+            ("images.n3", requests.Request("GET", "http://example.com/images/1")),
+            ("images.n3", requests.Request("GET", "http://example.com/images/1")),
+            ("images.n3", requests.Request("GET", "http://example.com/images/2")),
+            ("thumbnail.n3", requests.Request("GET", "http://example.com/images/3")),
+        ]
+
+        selected = agent.agent.select_independent_requests(ground_requests, 2)
+
+        assert [request.url for _, request in selected] == [
+            "http://example.com/images/1",
+            "http://example.com/images/2",
+        ]
+
+    def test_execute_http_requests_concurrently(
+        self, monkeypatch, tmp_path, serve_http
+    ):
+        monkeypatch.setattr(agent.cost, "COST_MODEL", CostModel())
+
+        class SlowHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(0.5)
+                self.send_response(200)
+                self.send_header("content-type", "text/plain")
+                self.end_headers()
+                self.wfile.write(b"slow")
+
+            def log_message(self, *args):
+                pass
+
+        origin = serve_http(SlowHandler)
+
+        (tmp_path / "00_init_facts.n3").write_text("<#a> <#b> <#c>.\n")
+        state = PPAState(str(tmp_path), ["00_init_facts.n3"], "goal.n3", [])
+        selected_requests = [
+            ("images.n3", requests.Request("GET", f"{origin}/images/{i}"))
+            for i in range(4)
+        ]
+
+        shapes_and_inputs = rdflib.Graph()
+        shapes_and_inputs.namespace_manager = NAMESPACE_MANAGER
+
+        start = time.monotonic()
+        agent_knowledge = agent.agent.execute_http_requests(
+            state, selected_requests, shapes_and_inputs
+        )
+        duration = time.monotonic() - start
+
+        assert agent_knowledge == ["00_init_facts.n3", "00_sub_facts.n3"]
+        facts = rdflib.Graph().parse(tmp_path / agent_knowledge[-1], format="n3")
+        assert duration < 4 * 0.5
+        assert len(list(facts.triples((None, HTTP.resp, None)))) == 4
+
+    def test_keep_rules_of_helpful_requests(self, monkeypatch, tmp_path):
+        def proof(*rules):
+            text = "@prefix r: <http://www.w3.org/2000/10/swap/reason#>.\n"
+            for rule in rules:
+                text += (
+                    f"[] r:rule [ r:because [ r:source <file:///mnt/{rule}> ] ];\n"
+                    f"  r:gives {{ <#{rule}> <#applied> true }}.\n"
+                )
+            return ProofIndex(rdflib.Graph().parse(data=text, format="n3"))
+
+        R = ["a.n3", "b.n3", "c.n3", "d.n3"]
+        for rule in R:
+            (tmp_path / rule).write_text(
+                f"{{ ?x <#{rule}> ?y }} => {{ ?y <#p> ?x }}.\n"
+            )
+
+        # Of two requests sent concurrently, only the one stemming from a.n3 helped
+        state = PPAState(str(tmp_path), [], "goal.n3", R, backend="stub")
+        state.proof = proof("a.n3", "b.n3", "c.n3")
+        state.executed = ["a.n3", "b.n3"]
+
+        assert agent.agent.useless_requests(state, proof("b.n3", "c.n3", "d.n3")) == [
+            "b.n3"
+        ]
+        assert agent.agent.useless_requests(state, proof("a.n3", "b.n3", "c.n3")) == [
+            "a.n3",
+            "b.n3",
+        ]
+
+        # No progress overall, yet only b.n3 is dropped from R
+        monkeypatch.setattr(
+            agent.agent, "prepare_eye_input_files", lambda *args: ([], None)
+        )
+        monkeypatch.setattr(
+            agent.agent,
+            "eye_generate_proof",
+            lambda *args: (agent.SUCCESS, proof("b.n3", "c.n3", "d.n3")),
+        )
+        state.n_pre = 3
+        agent.agent.generate_post_proof(invoke.context.Context(), state, None)
+
+        assert state.R == ["a.n3", "c.n3", "d.n3"]
+        assert state.phase == PRE_PROOF
+
+    def test_stream_binary_bodies(self, monkeypatch, tmp_path, serve_http):
+        monkeypatch.setattr(agent.cost, "COST_MODEL", CostModel())
+        payload = os.urandom(300 * 1024)
+        uploaded = []
+
+        class BinaryHandler(http.server.BaseHTTPRequestHandler):
+            def do_PUT(self):
+                uploaded.append(self.rfile.read(int(self.headers["content-length"])))
+                self.send_response(204)
+                self.end_headers()
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("content-type", "image/png")
+                self.send_header("content-length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        origin = serve_http(BinaryHandler)
+
+        image = tmp_path / "model.fmu"
+        image.write_bytes(payload)
+        shapes_and_inputs = rdflib.Graph()
+        shapes_and_inputs.namespace_manager = NAMESPACE_MANAGER
+        body, media_type = agent.agent.read_request_body(
+            rdflib.URIRef(f"file://{image}"), shapes_and_inputs
+        )
+        assert media_type == "application/octet-stream"
+        assert isinstance(body, agent.agent.FileBody)  # streamed from disk
+        assert body.fp is None  # not opened before sending
+
+        (tmp_path / "00_init_facts.n3").write_text("<#a> <#b> <#c>.\n")
+        state = PPAState(str(tmp_path), ["00_init_facts.n3"], "goal.n3", [])
+        selected_requests = [
+            (
+                "models.n3",
+                requests.Request(
+                    "PUT",
+                    f"{origin}/models/1",
+                    headers={"content-type": media_type},
+                    data=body,
+                ),
+            ),
+            ("thumbnail.n3", requests.Request("GET", f"{origin}/images/1/thumbnail")),
+        ]
+        agent_knowledge = agent.agent.execute_http_requests(
+            state, selected_requests, shapes_and_inputs
+        )
+
+        assert body.fp is None
+        assert uploaded == [payload]
+
+        stored = tmp_path / "00_sub_1_get_thumbnail.png"
+        assert stored.read_bytes() == payload
+
+        facts = rdflib.Graph().parse(tmp_path / agent_knowledge[-1], format="n3")
+        bodies = set(facts.objects(None, HTTP.body))
+        assert bodies == {
+            rdflib.URIRef(f"file://{image}"),
+            rdflib.URIRef(f"file://{stored}"),
+        }
+        assert facts.value(
+            rdflib.URIRef(f"file://{stored}"), rdflib.DCTERMS.extent
+        ).toPython() == len(payload)
+
+    def test_logs_parsed_bodies_lazily(self, monkeypatch):
+        serialized = []
+        serialize = rdflib.Dataset.serialize
+
+        def counting_serialize(self, *args, **kwargs):
+            serialized.append(kwargs.get("format"))
+            return serialize(self, *args, **kwargs)
+
+        monkeypatch.setattr(rdflib.Dataset, "serialize", counting_serialize)
+        request = requests.Request(
+            "PUT",
+            "http://example.com/models/1",
+            headers={"content-type": "text/n3"},
+            data="<#a> <#b> <#c>.",
+        ).prepare()
+
+        triples = agent.agent.parse_http_body(rdflib.BNode(), request)
+        assert len(triples) == 2
+        assert serialized == []
+
+        messages = []
+        sink = agent.logger.add(messages.append, level="TRACE")
+        try:
+            agent.agent.parse_http_body(rdflib.BNode(), request)
+        finally:
+            agent.logger.remove(sink)
+        assert serialized == ["application/trig"]
+        assert any("Triples parsed from message body" in m for m in messages)